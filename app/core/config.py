@@ -34,16 +34,170 @@ class Settings(BaseSettings):
 
     # Wake Word
     wake_word: str = "dadd-e"
+    wake_command_timeout: float = 8.0
+    transcript_queue_size: int = 32
+    transcript_queue_policy: str = "drop_oldest"  # drop_oldest or drop_newest
+    transcript_coalesce_interim: bool = True
+    speculative_intent: bool = True
+    speculative_min_stability: float = 1.0
+    speculative_min_words: int = 2
+
+    # Local fast-path intent classifier (LLM only below the threshold)
+    intent_local_enabled: bool = True
+    intent_local_threshold: float = 0.85
+    intent_log_path: str = ".cache/intents.jsonl"
+    intent_holdout_ratio: float = 0.2
+    intent_retrain_every: int = 50
+
+    # Semantic intent cache (embedding nearest-neighbour over LLM classifications)
+    intent_cache_enabled: bool = True
+    intent_cache_threshold: float = 0.92
+    intent_cache_capacity: int = 10000
+    intent_cache_ttl: float = 7 * 24 * 3600
+    intent_cache_dimensions: int = 256
+    intent_cache_path: str = ".cache/intent_index.npz"
+    intent_cache_batch_window_ms: float = 5.0
+    intent_cache_save_interval: float = 300.0  # Seconds between saves (0 = only at shutdown)
+
+    # Conversation history sent to the LLM (older turns are summarized)
+    conversation_token_budget: int = 1200
+    conversation_max_turns: int = 12
+    conversation_summary_max_tokens: int = 200
+
+    # Micro-batched LLM intent classification across sessions
+    intent_batch_enabled: bool = False
+    intent_batch_max_size: int = 16
+    intent_batch_max_wait_ms: float = 5.0
+
+    # Exact-match OpenAI response cache + single-flight (memory, redis or none)
+    response_cache_backend: str = "memory"
+    response_cache_max_entries: int = 2048
+    # Only temperature-0 calls and response_cache_sampled_calls are stored; the others
+    # (conversational replies, vision) are only coalesced while in flight. Repeated
+    # frames of the same scene are reused by the scene cache instead.
+    response_cache_ttls: dict[str, float] = {
+        "classify_intent": 3600.0,
+        "decompose_task": 3600.0,
+    }
+    # Call types cached even though they sample at a non-zero temperature
+    response_cache_sampled_calls: list[str] = ["classify_intent", "decompose_task"]
 
     # Models
     openai_model: str = "gpt-4o"
     vision_model: str = "gpt-4o"
     embedding_model: str = "text-embedding-3-large"
 
+    # Model routing: call type -> candidate models, preferred tier first
+    # (call types without a route use openai_model / vision_model)
+    model_routes: dict[str, list[str]] = {
+        "classify_intent": ["gpt-4o-mini", "gpt-4o"],
+        "classify_intent_batch": ["gpt-4o-mini", "gpt-4o"],
+        "summarize_conversation": ["gpt-4o-mini", "gpt-4o"],
+    }
+    hedge_requests: bool = True
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+    hedge_default_deadline_ms: float = 3000.0
+    hedge_min_deadline_ms: float = 250.0
+    # Deadlines until a route has samples, for call types slower than the default
+    hedge_deadlines_ms: dict[str, float] = {
+        "analyze_image": 8000.0,
+        "analyze_image_structured": 10000.0,
+        "describe_sequence": 12000.0,
+        "analyze_image_stream": 4000.0,
+        "analyze_image_structured_stream": 4000.0,
+    }
+    # Call types with one model that are still worth hedging to that model (short text calls)
+    hedge_same_model: list[str] = ["generate_response", "generate_response_stream"]
+    route_max_error_rate: float = 0.5
+    route_error_cooldown: float = 30.0
+    route_latency_switch_factor: float = 2.0
+
     # Deepgram Voice Configuration
     deepgram_tts_voice: str = "aura-asteria-en"
     deepgram_tts_model: str = "aura-asteria-en"
 
+    # Shared HTTP client pool
+    http_timeout: float = 30.0
+    http_connect_timeout: float = 5.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 60.0
+    warm_connections: bool = True
+
+    # TTS audio cache
+    tts_cache_enabled: bool = True
+    tts_cache_memory_bytes: int = 16 * 1024 * 1024
+    tts_cache_dir: str = ".cache/tts"
+    tts_cache_disk_bytes: int = 256 * 1024 * 1024
+
+    # Sentence-pipelined synthesis for long replies
+    tts_pipeline_min_chars: int = 160
+    tts_pipeline_concurrency: int = 3
+
+    # Voice command replies
+    voice_dispatch_actions: bool = True
+    voice_reply_voice: str = "nova"
+    voice_reply_speed: float = 1.0
+    voice_reply_format: str = "mp3"  # mp3, opus, aac, flac, wav, pcm
+    voice_audio_chunk_bytes: int = 4096
+
+    # Voice activity detection (gates audio sent to Deepgram)
+    vad_enabled: bool = True
+    vad_frame_ms: int = 20
+    vad_energy_threshold_db: float = -45.0
+    vad_noise_margin_db: float = 10.0
+    vad_zcr_max: float = 0.35
+    vad_hangover_ms: int = 300
+    vad_preroll_ms: int = 200
+    deepgram_keepalive_interval: float = 5.0
+
+    # Image preprocessing before vision upload
+    image_preprocess_enabled: bool = True
+    image_output_format: str = "jpeg"  # jpeg or webp
+    image_low_max_side: int = 512  # "low" detail is a single 512px tile
+    image_low_quality: int = 70
+    image_high_max_side: int = 1536
+    image_high_quality: int = 85
+
+    # Scene-change cache: reuse vision results while the view is unchanged
+    scene_cache_enabled: bool = True
+    scene_cache_ttl: float = 30.0
+    scene_cache_max_distance: int = 5  # dHash bits, low detail
+    scene_cache_max_distance_high: int = 2  # dHash bits, high detail (text)
+    scene_cache_per_user: int = 8
+
+    # Local blur/exposure gate: unusable frames get "hold still" instead of a vision call
+    quality_gate_enabled: bool = True
+    quality_min_sharpness: float = 40.0  # variance of the Laplacian at 256px
+    quality_max_dark_fraction: float = 0.9
+    quality_max_bright_fraction: float = 0.6
+    quality_min_contrast: float = 12.0  # flatter frames (a wall, blank paper) aren't "blurry"
+
+    # Multi-frame uploads (/vision/batch)
+    vision_batch_concurrency: int = 4  # model calls in flight per request
+    vision_batch_max_images: int = 32
+    # Keyframes per "what just happened" request (/vision/sequence)
+    vision_sequence_max_frames: int = 8
+
+    # Composio calls run on a bounded thread pool, limited per app
+    integration_max_workers: int = 16
+    integration_app_concurrency: dict[str, int] = {
+        "slack": 4,
+        "gmail": 4,
+        "googledrive": 4,
+        "googlecalendar": 4,
+        "notion": 2,
+    }
+    integration_default_concurrency: int = 4
+    integration_timeout: float = 15.0  # seconds per action
+
+    # Independent /actions/complex-task subtasks run concurrently, up to this many
+    complex_task_max_concurrency: int = 4
+
+    # Event-loop lag probe (0 disables)
+    loop_lag_interval_ms: float = 250.0
+
     # Feature Flags
     enable_vision: bool = True
     enable_voice_stt: bool = True
@@ -0,0 +1,258 @@
+"""
+App-scoped service container
+
+Builds every backend service once at startup, shares pooled keep-alive HTTP
+clients between them and hands them to routers through FastAPI dependencies.
+"""
+import asyncio
+from typing import Optional, TypeVar
+import httpx
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from openai import AsyncOpenAI
+from deepgram import Deepgram
+from app.core.config import Settings, get_settings
+from app.core.metrics import monitor_loop_lag
+from app.services.vision import SceneCache, VisionService
+from app.services.intent_classifier import LocalIntentClassifier
+from app.services.semantic_cache import SemanticIntentCache
+from app.services.model_router import ModelRouter
+from app.services.response_cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+)
+from app.services.tts import TTSAudioCache, TTSService
+from app.services.voice import VoiceService
+from app.services.integrations import IntegrationService
+from app.services.database import DatabaseService
+
+
+class ServiceContainer:
+    """Holds shared clients and long-lived service instances for the app"""
+
+    def __init__(self, settings: Optional[Settings] = None) -> None:
+        self.settings = settings or get_settings()
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.openai_client: Optional[AsyncOpenAI] = None
+        self.deepgram_client: Optional[Deepgram] = None
+        self.vision: Optional[VisionService] = None
+        self.intent_cache: Optional[SemanticIntentCache] = None
+        self.response_cache: Optional[ResponseCache] = None
+        self.tts: Optional[TTSService] = None
+        self.integrations: Optional[IntegrationService] = None
+        self.database: Optional[DatabaseService] = None
+        self._lag_task: Optional[asyncio.Task[None]] = None
+        self._save_task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        """Create shared clients and services, then warm upstream connections"""
+        settings = self.settings
+
+        if settings.loop_lag_interval_ms > 0:
+            self._lag_task = asyncio.create_task(monitor_loop_lag(settings.loop_lag_interval_ms))
+
+        # One pooled keep-alive client shared by OpenAI and TTS
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+        )
+        self.openai_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=self.http_client,
+        )
+
+        intent_classifier = None
+        if settings.intent_local_enabled:
+            intent_classifier = LocalIntentClassifier(
+                threshold=settings.intent_local_threshold,
+                log_path=settings.intent_log_path or None,
+                holdout_ratio=settings.intent_holdout_ratio,
+                retrain_every=settings.intent_retrain_every,
+            )
+        if settings.intent_cache_enabled:
+            self.intent_cache = SemanticIntentCache(
+                self.openai_client,
+                model=settings.embedding_model,
+                dimensions=settings.intent_cache_dimensions or None,
+                threshold=settings.intent_cache_threshold,
+                capacity=settings.intent_cache_capacity,
+                ttl=settings.intent_cache_ttl,
+                path=settings.intent_cache_path or None,
+                batch_window_ms=settings.intent_cache_batch_window_ms,
+            )
+            self.intent_cache.load()
+            if settings.intent_cache_save_interval > 0:
+                self._save_task = asyncio.create_task(
+                    self.intent_cache.autosave(settings.intent_cache_save_interval)
+                )
+        self.response_cache = self._build_response_cache()
+        self.vision = VisionService(
+            client=self.openai_client,
+            intent_classifier=intent_classifier,
+            intent_cache=self.intent_cache,
+            response_cache=self.response_cache,
+            scene_cache=SceneCache(
+                ttl=settings.scene_cache_ttl,
+                max_distance=settings.scene_cache_max_distance,
+                max_distance_high=settings.scene_cache_max_distance_high,
+                per_user=settings.scene_cache_per_user,
+            )
+            if settings.scene_cache_enabled
+            else None,
+            model_router=ModelRouter(
+                settings.model_routes,
+                hedge=settings.hedge_requests,
+                hedge_percentile=settings.hedge_percentile,
+                hedge_min_samples=settings.hedge_min_samples,
+                hedge_default_deadline_ms=settings.hedge_default_deadline_ms,
+                hedge_min_deadline_ms=settings.hedge_min_deadline_ms,
+                hedge_deadlines_ms=settings.hedge_deadlines_ms,
+                hedge_same_model=settings.hedge_same_model,
+                max_error_rate=settings.route_max_error_rate,
+                error_cooldown=settings.route_error_cooldown,
+                latency_switch_factor=settings.route_latency_switch_factor,
+            ),
+        )
+        tts_cache = None
+        if settings.tts_cache_enabled:
+            tts_cache = TTSAudioCache(
+                memory_bytes=settings.tts_cache_memory_bytes,
+                disk_dir=settings.tts_cache_dir or None,
+                disk_bytes=settings.tts_cache_disk_bytes,
+            )
+        self.tts = TTSService(http_client=self.http_client, cache=tts_cache)
+
+        self.deepgram_client = Deepgram(settings.deepgram_api_key)
+
+        # Optional services: keep running without them, routes report 503
+        try:
+            self.integrations = IntegrationService()
+        except Exception as e:
+            print(f"⚠️  Integration service not available: {e}")
+
+        try:
+            self.database = DatabaseService()
+        except Exception as e:
+            print(f"⚠️  Database service not available: {e}")
+
+        if settings.warm_connections:
+            await self.warm()
+
+    def _build_response_cache(self) -> Optional[ResponseCache]:
+        """Response cache on the configured backend (falls back to in-process)"""
+        settings = self.settings
+        if settings.response_cache_backend == "none":
+            return None
+
+        backend: CacheBackend
+        if settings.response_cache_backend == "redis":
+            try:
+                backend = RedisCacheBackend(settings.redis_url, settings.redis_password)
+            except ImportError as e:
+                print(f"⚠️  {e} Using the in-process response cache.")
+                backend = MemoryCacheBackend(settings.response_cache_max_entries)
+        else:
+            backend = MemoryCacheBackend(settings.response_cache_max_entries)
+
+        return ResponseCache(
+            backend,
+            ttls=settings.response_cache_ttls,
+            sampled_calls=set(settings.response_cache_sampled_calls),
+        )
+
+    async def warm(self) -> None:
+        """Open TLS connections to upstream APIs so the first request doesn't pay for them"""
+        if not self.http_client:
+            return
+
+        async def _touch(url: str, headers: dict[str, str]) -> None:
+            try:
+                await self.http_client.get(url, headers=headers, timeout=5.0)
+            except Exception as e:
+                print(f"⚠️  Could not warm {url}: {e}")
+
+        targets = [
+            (
+                "https://api.openai.com/v1/models",
+                {"Authorization": f"Bearer {self.settings.openai_api_key}"},
+            ),
+        ]
+        await asyncio.gather(*(_touch(url, headers) for url, headers in targets))
+        print("🔥 Upstream connections warmed")
+
+    async def close(self) -> None:
+        """Persist caches and close shared clients"""
+        if self._lag_task:
+            self._lag_task.cancel()
+        self._lag_task = None
+        if self._save_task:
+            self._save_task.cancel()
+        self._save_task = None
+        if self.vision:
+            await self.vision.close()
+        if self.integrations:
+            self.integrations.close()
+        if self.intent_cache:
+            self.intent_cache.save()
+        if self.response_cache:
+            await self.response_cache.close()
+        self.response_cache = None
+        if self.http_client:
+            try:
+                await self.http_client.aclose()
+            except Exception as e:
+                print(f"Error closing HTTP client: {e}")
+        self.http_client = None
+        self.openai_client = None
+
+    def new_voice_service(self) -> VoiceService:
+        """Create a per-connection voice service sharing the Deepgram client"""
+        return VoiceService(client=self.deepgram_client)
+
+
+S = TypeVar("S")
+
+
+def get_container(connection: HTTPConnection) -> ServiceContainer:
+    """Get the app-scoped service container (works for HTTP and WebSocket routes)"""
+    container: Optional[ServiceContainer] = getattr(connection.app.state, "services", None)
+    if container is None:
+        raise HTTPException(status_code=503, detail="Services are not initialized")
+    return container
+
+
+def _require(service: Optional[S], name: str) -> S:
+    if service is None:
+        raise HTTPException(status_code=503, detail=f"{name} service is not available")
+    return service
+
+
+def get_vision_service(connection: HTTPConnection) -> VisionService:
+    """Dependency: shared VisionService"""
+    return _require(get_container(connection).vision, "Vision")
+
+
+def get_tts_service(connection: HTTPConnection) -> TTSService:
+    """Dependency: shared TTSService"""
+    return _require(get_container(connection).tts, "TTS")
+
+
+def get_integration_service(connection: HTTPConnection) -> IntegrationService:
+    """Dependency: shared IntegrationService"""
+    return _require(get_container(connection).integrations, "Integration")
+
+
+def get_optional_database_service(connection: HTTPConnection) -> Optional[DatabaseService]:
+    """Dependency: shared DatabaseService, or None when the database is unavailable"""
+    return get_container(connection).database
+
+
+def get_voice_service(connection: HTTPConnection) -> VoiceService:
+    """Dependency: new per-connection VoiceService on the shared Deepgram client"""
+    return get_container(connection).new_voice_service()
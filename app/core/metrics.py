@@ -0,0 +1,157 @@
+"""
+In-process latency and counter metrics
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Optional
+
+
+# Upper bounds (ms) of histogram buckets, Prometheus-style cumulative "le" buckets
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyStat:
+    """Running latency summary with percentiles over a recent window"""
+
+    def __init__(self, window: int = 1024, buckets: Optional[tuple[float, ...]] = None) -> None:
+        """
+        Args:
+            window: Samples kept for percentiles
+            buckets: Histogram bucket upper bounds in ms (None for no histogram)
+        """
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets) if buckets else []
+
+    def observe(self, value_ms: float) -> None:
+        """Record one sample in milliseconds"""
+        self.count += 1
+        self.total += value_ms
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+        self.recent.append(value_ms)
+        if self.buckets:
+            for i, bound in enumerate(self.buckets):
+                if value_ms <= bound:
+                    self.bucket_counts[i] += 1
+
+    def percentile(self, q: float) -> float:
+        """Percentile (0-100) of the recent window"""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def snapshot(self) -> dict[str, float]:
+        """Serialize for the /metrics endpoint"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2),
+            "min_ms": round(self.min, 2),
+            "max_ms": round(self.max, 2),
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            **({"histogram": self.histogram()} if self.buckets else {}),
+        }
+
+    def histogram(self) -> dict[str, int]:
+        """Cumulative bucket counts keyed by upper bound"""
+        counts = {f"le_{bound:g}": n for bound, n in zip(self.buckets or (), self.bucket_counts)}
+        counts["le_inf"] = self.count
+        return counts
+
+
+class MetricsRegistry:
+    """Named latency stats, counters and gauges shared across the app"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, LatencyStat] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+
+    def observe(self, name: str, value_ms: float) -> None:
+        """Record a latency sample"""
+        with self._lock:
+            stat = self.latencies.get(name)
+            if stat is None:
+                stat = self.latencies[name] = LatencyStat()
+            stat.observe(value_ms)
+
+    def observe_histogram(self, name: str, value_ms: float) -> None:
+        """Record a latency sample into a stat that also keeps histogram buckets"""
+        with self._lock:
+            stat = self.latencies.get(name)
+            if stat is None:
+                stat = self.latencies[name] = LatencyStat(buckets=HISTOGRAM_BUCKETS_MS)
+            stat.observe(value_ms)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> float:
+        """Current value of a counter (0 if never incremented)"""
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def add_gauge(self, name: str, delta: float) -> None:
+        """Adjust a gauge by a delta (for totals maintained by many owners)"""
+        with self._lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+
+    def latency(self, name: str) -> LatencyStat:
+        """Get (or create) a latency stat"""
+        with self._lock:
+            stat = self.latencies.get(name)
+            if stat is None:
+                stat = self.latencies[name] = LatencyStat()
+            return stat
+
+    def snapshot(self) -> dict[str, Any]:
+        """Serialize every metric"""
+        with self._lock:
+            return {
+                "latency": {name: stat.snapshot() for name, stat in sorted(self.latencies.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    return MetricsRegistry()
+
+
+async def monitor_loop_lag(interval_ms: float = 250.0, name: str = "event_loop.lag") -> None:
+    """
+    Measure how late the event loop wakes from a sleep, until cancelled
+
+    Anything that blocks the loop (synchronous I/O, heavy CPU work) shows up as
+    lag, so this is what a blocking call costs every other connection.
+    """
+    metrics = get_metrics()
+    interval = interval_ms / 1000
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        metrics.observe(name, max((time.perf_counter() - started - interval) * 1000, 0.0))
@@ -2,20 +2,44 @@
 Dadd-E FastAPI Application
 Main entry point for the productivity assistant backend
 """
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
+from app.core.container import ServiceContainer
+from app.core.metrics import get_metrics
 from app.routers import voice, vision, actions, tts
 
 # Get settings
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build shared services on startup and close their clients on shutdown"""
+    print(f"🚀 Starting {settings.app_name}")
+    print(f"📡 Wake word: {settings.wake_word}")
+    print(f"🔧 Debug mode: {settings.debug}")
+
+    services = ServiceContainer(settings)
+    await services.start()
+    app.state.services = services
+
+    try:
+        yield
+    finally:
+        print(f"👋 Shutting down {settings.app_name}")
+        await services.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="Real-time productivity assistant using Omi glasses",
     version="0.1.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -53,15 +77,7 @@ async def health_check() -> dict[str, str]:
     }
 
 
-@app.on_event("startup")
-async def startup_event() -> None:
-    """Startup event handler"""
-    print(f"🚀 Starting {settings.app_name}")
-    print(f"📡 Wake word: {settings.wake_word}")
-    print(f"🔧 Debug mode: {settings.debug}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event() -> None:
-    """Shutdown event handler"""
-    print(f"👋 Shutting down {settings.app_name}")
+@app.get("/metrics")
+async def metrics() -> dict[str, Any]:
+    """Latency, counter and gauge metrics"""
+    return get_metrics().snapshot()
@@ -1,31 +1,96 @@
 """
 Action endpoints for executing tasks via Composio integrations
 """
-from fastapi import APIRouter, HTTPException
+import json
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.core.container import (
+    get_integration_service,
+    get_optional_database_service,
+    get_vision_service,
+)
 from app.services.integrations import IntegrationService
 from app.services.vision import VisionService
 from app.services.database import DatabaseService
+from app.services.task_graph import TaskGraphExecutor, TaskStep, parse_plan, run_plan
+from app.services.tts import iter_sentences
 from app.models.schemas import ActionRequest, ActionResponse, IntentType
 
 router = APIRouter(prefix="/actions", tags=["actions"])
 
+# Intents that are served by Composio integrations
+INTEGRATION_INTENTS = {
+    IntentType.CHECK_SLACK,
+    IntentType.SEND_EMAIL,
+    IntentType.SEARCH_DRIVE,
+    IntentType.CREATE_TASK,
+    IntentType.CHECK_CALENDAR,
+}
+
+
+def intent_from_label(label: str) -> IntentType:
+    """
+    Map a classifier label to an IntentType
+
+    Args:
+        label: Intent name as returned by classify_intent ("CHECK_SLACK" or "check_slack")
+
+    Returns:
+        Matching IntentType, or UNKNOWN
+    """
+    try:
+        return IntentType(str(label).strip().lower())
+    except ValueError:
+        return IntentType.UNKNOWN
+
 
 @router.post("/execute", response_model=ActionResponse)
-async def execute_action(request: ActionRequest) -> ActionResponse:
+async def execute_action(
+    request: ActionRequest,
+    integration_service: IntegrationService = Depends(get_integration_service),
+    vision_service: VisionService = Depends(get_vision_service),
+    db_service: Optional[DatabaseService] = Depends(get_optional_database_service),
+) -> ActionResponse:
     """
     Execute an action based on user intent
 
     Args:
         request: Action request with intent and parameters
+        integration_service: Shared Composio integration service
+        vision_service: Shared OpenAI service
+        db_service: Shared database service (logging is skipped if None)
 
     Returns:
         Action execution result
     """
-    try:
-        integration_service = IntegrationService()
-        vision_service = VisionService()
-        db_service = DatabaseService()
+    return await perform_action(request, integration_service, vision_service, db_service)
+
+
+async def perform_action(
+    request: ActionRequest,
+    integration_service: Optional[IntegrationService],
+    vision_service: VisionService,
+    db_service: Optional[DatabaseService],
+    on_sentence: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> ActionResponse:
+    """
+    Execute an action in-process (shared by the HTTP endpoints and the voice socket)
+
+    Args:
+        request: Action request with intent and parameters
+        integration_service: Composio integration service
+        vision_service: OpenAI service
+        db_service: Database service (logging is skipped if None)
+        on_sentence: If given, general-query replies are streamed from the LLM and
+            each finished sentence is passed here as soon as it is complete
 
+    Returns:
+        Action execution result
+    """
+    try:
         result_message = ""
         result_data = {}
 
@@ -145,21 +210,36 @@ async def execute_action(request: ActionRequest) -> ActionResponse:
 
         else:
             # For general queries or unknown intents
-            response_text = await vision_service.generate_response(
-                request.parameters.get("text", ""),
-                context=request.context,
-            )
+            if on_sentence is None:
+                response_text = await vision_service.generate_response(
+                    request.parameters.get("text", ""),
+                    context=request.context,
+                )
+            else:
+                # Hand each sentence over while the model is still generating
+                sentences = []
+                tokens = vision_service.generate_response_stream(
+                    request.parameters.get("text", ""),
+                    context=request.context,
+                )
+                # A barge-in cancels this task: close the upstream stream with it
+                async with aclosing(tokens):
+                    async for sentence in iter_sentences(tokens):
+                        sentences.append(sentence)
+                        await on_sentence(sentence)
+                response_text = " ".join(sentences)
             result_message = response_text
 
         # Log action to database
-        await db_service.log_action(
-            {
-                "user_id": request.user_id,
-                "action_type": request.intent.value,
-                "parameters": request.parameters,
-                "result": result_message,
-            }
-        )
+        if db_service:
+            await db_service.log_action(
+                {
+                    "user_id": request.user_id,
+                    "action_type": request.intent.value,
+                    "parameters": request.parameters,
+                    "result": result_message,
+                }
+            )
 
         return ActionResponse(
             success=True,
@@ -167,15 +247,69 @@ async def execute_action(request: ActionRequest) -> ActionResponse:
             data=result_data if result_data else None,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error executing action: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Planner action names -> intents
+SUBTASK_INTENTS = {
+    "check_slack": IntentType.CHECK_SLACK,
+    "send_email": IntentType.SEND_EMAIL,
+    "search_drive": IntentType.SEARCH_DRIVE,
+    "create_task": IntentType.CREATE_TASK,
+    "check_calendar": IntentType.CHECK_CALENDAR,
+}
+
+
+def _plan_executor(
+    user_id: str,
+    integration_service: IntegrationService,
+    vision_service: VisionService,
+    db_service: Optional[DatabaseService],
+) -> TaskGraphExecutor:
+    """Executor that runs each plan step through perform_action"""
+
+    async def run_step(step: TaskStep, parameters: dict[str, Any]) -> dict[str, Any]:
+        request = ActionRequest(
+            intent=SUBTASK_INTENTS.get(step.action, IntentType.GENERAL_QUERY),
+            user_id=user_id,
+            parameters=parameters,
+        )
+        try:
+            result = await perform_action(
+                request, integration_service, vision_service, db_service
+            )
+        except HTTPException as e:
+            return {"success": False, "message": str(e.detail)}
+        # Later steps reference these fields, e.g. ${find_doc.files.0.webViewLink}
+        return {**(result.data or {}), "success": result.success, "message": result.message}
+
+    return TaskGraphExecutor(run_step, get_settings().complex_task_max_concurrency)
+
+
+async def _plan_task(vision_service: VisionService, task_description: str) -> list[TaskStep]:
+    """Decompose a task into steps, or raise HTTPException if that fails"""
+    subtasks = await vision_service.decompose_task(task_description)
+    if not subtasks:
+        raise HTTPException(
+            status_code=422, detail="Could not understand the task. Please try rephrasing."
+        )
+    try:
+        return parse_plan(subtasks)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid task plan: {e}")
+
+
 @router.post("/complex-task")
 async def execute_complex_task(
     user_id: str,
     task_description: str,
+    integration_service: IntegrationService = Depends(get_integration_service),
+    vision_service: VisionService = Depends(get_vision_service),
+    db_service: Optional[DatabaseService] = Depends(get_optional_database_service),
 ) -> ActionResponse:
     """
     Execute a complex multi-step task
@@ -183,70 +317,57 @@ async def execute_complex_task(
     Example: "Check my Slack for messages from Sai about proposal,
     find the proposal doc in Drive, and email it to him"
 
+    Independent subtasks run concurrently; a subtask that uses another's
+    result (the Drive link for the email) waits for it.
+
     Args:
         user_id: User ID
         task_description: Natural language description of the task
+        integration_service: Shared Composio integration service
+        vision_service: Shared OpenAI service
+        db_service: Shared database service (logging is skipped if None)
 
     Returns:
         Execution result
     """
     try:
-        vision_service = VisionService()
-        integration_service = IntegrationService()
-        db_service = DatabaseService()
-
-        # Decompose task into subtasks
-        subtasks = await vision_service.decompose_task(task_description)
+        steps = await _plan_task(vision_service, task_description)
+    except HTTPException as e:
+        return ActionResponse(success=False, message=str(e.detail))
 
-        if not subtasks:
-            return ActionResponse(
-                success=False,
-                message="Could not understand the task. Please try rephrasing.",
-            )
+    try:
+        executor = _plan_executor(user_id, integration_service, vision_service, db_service)
+        events, summary = await run_plan(executor, steps)
 
+        # Report in plan order, not completion order
+        by_id = {event["id"]: event for event in events}
         results = []
-
-        # Execute each subtask
-        for subtask in subtasks:
-            action = subtask.get("action", "")
-            description = subtask.get("description", "")
-            params = subtask.get("parameters", {})
-
-            # Map action to intent
-            intent_map = {
-                "check_slack": IntentType.CHECK_SLACK,
-                "send_email": IntentType.SEND_EMAIL,
-                "search_drive": IntentType.SEARCH_DRIVE,
-                "create_task": IntentType.CREATE_TASK,
-            }
-
-            intent = intent_map.get(action, IntentType.GENERAL_QUERY)
-
-            # Execute subtask
-            request = ActionRequest(
-                intent=intent,
-                user_id=user_id,
-                parameters=params,
-            )
-
-            result = await execute_action(request)
+        for step in steps:
+            event = by_id[step.id]
             results.append(
                 {
-                    "description": description,
-                    "result": result.message,
-                    "success": result.success,
+                    "id": step.id,
+                    "description": step.description,
+                    "depends_on": step.depends_on,
+                    "result": event.get("message") or event.get("reason", ""),
+                    "success": event["type"] == "step_finished" and event["success"],
                 }
             )
 
         # Create summary
-        summary = f"Completed {len(subtasks)} tasks:\n"
+        summary_text = f"Completed {len(steps)} tasks:\n"
         for i, r in enumerate(results, 1):
-            summary += f"{i}. {r['description']}: {r['result']}\n"
+            summary_text += f"{i}. {r['description']}: {r['result']}\n"
 
         return ActionResponse(
             success=True,
-            message=summary,
-            data={"subtasks": results},
+            message=summary_text,
+            data={
+                "subtasks": results,
+                "wall_ms": summary["wall_ms"],
+                "critical_path_ms": summary["critical_path_ms"],
+                "sum_ms": summary["sum_ms"],
+            },
         )
 
     except Exception as e:
@@ -254,20 +375,72 @@ async def execute_complex_task(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/complex-task/stream")
+async def execute_complex_task_stream(
+    user_id: str,
+    task_description: str,
+    integration_service: IntegrationService = Depends(get_integration_service),
+    vision_service: VisionService = Depends(get_vision_service),
+    db_service: Optional[DatabaseService] = Depends(get_optional_database_service),
+) -> StreamingResponse:
+    """
+    Execute a complex multi-step task, streaming per-step progress as Server-Sent Events
+
+    Args:
+        user_id: User ID
+        task_description: Natural language description of the task
+        integration_service: Shared Composio integration service
+        vision_service: Shared OpenAI service
+        db_service: Shared database service (logging is skipped if None)
+
+    Returns:
+        A "plan" event with the steps and dependencies, "step_started",
+        "step_finished" and "step_skipped" events as they happen, then "done"
+        with timings (or an "error" event)
+    """
+    steps = await _plan_task(vision_service, task_description)
+    executor = _plan_executor(user_id, integration_service, vision_service, db_service)
+
+    async def stream() -> AsyncIterator[str]:
+        plan = [
+            {
+                "id": step.id,
+                "action": step.action,
+                "description": step.description,
+                "depends_on": step.depends_on,
+            }
+            for step in steps
+        ]
+        yield f"event: plan\ndata: {json.dumps({'steps': plan})}\n\n"
+        try:
+            async for event in executor.run(steps):
+                if event["type"] == "done":
+                    event = {k: v for k, v in event.items() if k != "outputs"}
+                yield f"event: {event.pop('type')}\ndata: {json.dumps(event, default=str)}\n\n"
+        except Exception as e:
+            print(f"Error executing complex task: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
 @router.get("/connected-apps")
-async def get_connected_apps(user_id: str) -> dict[str, list[str]]:
+async def get_connected_apps(
+    user_id: str,
+    integration_service: IntegrationService = Depends(get_integration_service),
+) -> dict[str, list[str]]:
     """
     Get list of connected apps for a user
 
     Args:
         user_id: User ID
+        integration_service: Shared Composio integration service
 
     Returns:
         List of connected app names
     """
     try:
-        integration_service = IntegrationService()
-        apps = integration_service.get_connected_accounts(user_id)
+        apps = await integration_service.get_connected_accounts(user_id)
 
         return {
             "user_id": user_id,
@@ -1,11 +1,13 @@
 """
 Text-to-Speech endpoints
 """
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from app.services.tts import TTSService
-import io
+from app.core.container import get_tts_service
+from app.core.config import get_settings
+from app.services.tts import AUDIO_MEDIA_TYPES, PIPELINE_FORMATS, TTSService
+from typing import Any, AsyncIterator
 
 router = APIRouter(prefix="/tts", tags=["tts"])
 
@@ -15,39 +17,87 @@ class TTSRequest(BaseModel):
     text: str
     voice: str = "alloy"  # alloy, echo, fable, onyx, nova, shimmer
     speed: float = 1.0
+    format: str = "mp3"  # mp3, opus, aac, flac, wav, pcm
+    stream: bool = True  # Relay audio chunks as they are synthesized
 
 
 @router.post("/speak")
-async def text_to_speech(request: TTSRequest):
+async def text_to_speech(
+    request: TTSRequest,
+    tts_service: TTSService = Depends(get_tts_service),
+):
     """
     Convert text to speech and return audio
 
     Args:
-        request: TTS request with text, voice, and speed
+        request: TTS request with text, voice, speed, format and stream flag
+        tts_service: Shared TTS service
 
     Returns:
-        Audio file (MP3 format)
+        Audio in the requested format, streamed as it is synthesized
+        (long inputs are synthesized sentence by sentence)
     """
-    try:
-        tts_service = TTSService()
-        audio_data = await tts_service.speak(
-            text=request.text,
-            voice=request.voice,
-            speed=request.speed
+    if request.format not in AUDIO_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Choose from: {list(AUDIO_MEDIA_TYPES)}",
         )
 
-        # Return audio as streaming response
-        return StreamingResponse(
-            io.BytesIO(audio_data),
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": f"attachment; filename=speech.mp3"
-            }
-        )
+    media_type = AUDIO_MEDIA_TYPES[request.format]
+    headers = {"Content-Disposition": f"attachment; filename=speech.{request.format}"}
+
+    try:
+        if not request.stream:
+            audio_data = await tts_service.speak(
+                text=request.text,
+                voice=request.voice,
+                speed=request.speed,
+                response_format=request.format,
+            )
+            return Response(audio_data, media_type=media_type, headers=headers)
+
+        settings = get_settings()
+        pipelined = request.format in PIPELINE_FORMATS
+        if pipelined and len(request.text) >= settings.tts_pipeline_min_chars:
+            # Long input: synthesize sentence by sentence, several at a time
+            chunks = tts_service.stream_pipelined(
+                text=request.text,
+                voice=request.voice,
+                speed=request.speed,
+                response_format=request.format,
+                concurrency=settings.tts_pipeline_concurrency,
+            )
+        else:
+            chunks = tts_service.stream(
+                text=request.text,
+                voice=request.voice,
+                speed=request.speed,
+                response_format=request.format,
+            )
+        # Pull the first chunk here so upstream errors still map to an HTTP error
+        first_chunk = await anext(chunks, b"")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS error: {str(e)}")
 
+    async def relay() -> AsyncIterator[bytes]:
+        if first_chunk:
+            yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(relay(), media_type=media_type, headers=headers)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    tts_service: TTSService = Depends(get_tts_service),
+) -> dict[str, Any]:
+    """Hit/miss/bytes-saved statistics for the TTS audio cache"""
+    if tts_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **tts_service.cache.stats()}
+
 
 @router.get("/voices")
 async def get_available_voices():
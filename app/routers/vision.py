@@ -1,8 +1,15 @@
 """
 Vision endpoints for image analysis
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.vision import VisionService
+import json
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.core.config import get_settings
+from app.core.container import get_optional_database_service, get_vision_service
+from app.services.vision import SCENE_PROMPT, SEQUENCE_PROMPT, VisionService
 from app.services.database import DatabaseService
 from app.models.schemas import VisionResponse
 
@@ -13,7 +20,10 @@ router = APIRouter(prefix="/vision", tags=["vision"])
 async def analyze_scene(
     user_id: str,
     image: UploadFile = File(...),
-    prompt: str = "What do you see in this image?",
+    prompt: str = SCENE_PROMPT,
+    structured: bool = True,
+    vision_service: VisionService = Depends(get_vision_service),
+    db_service: Optional[DatabaseService] = Depends(get_optional_database_service),
 ) -> VisionResponse:
     """
     Analyze an image from the Omi glasses camera
@@ -22,34 +32,37 @@ async def analyze_scene(
         user_id: User ID
         image: Image file to analyze
         prompt: Question about the image
+        structured: Fill objects and text_detected from the same model call
+        vision_service: Shared OpenAI service
+        db_service: Shared database service (logging is skipped if None)
 
     Returns:
         Vision analysis result
     """
     try:
-        vision_service = VisionService()
-        db_service = DatabaseService()
-
         # Read image data
         image_data = await image.read()
 
         # Analyze image
-        result = await vision_service.analyze_image(image_data, prompt)
-
-        # Log to database
-        await db_service.log_vision_analysis(
-            {
-                "user_id": user_id,
-                "prompt": prompt,
-                "description": result["description"],
-                "model": result["model"],
-            }
+        result = await vision_service.analyze_image(
+            image_data, prompt, user_id=user_id, structured=structured
         )
 
+        # Log to database (frames rejected by the quality gate never reached a model)
+        if db_service and not result.get("rejected"):
+            await db_service.log_vision_analysis(
+                {
+                    "user_id": user_id,
+                    "prompt": prompt,
+                    "description": result["description"],
+                    "model": result["model"],
+                }
+            )
+
         return VisionResponse(
             description=result["description"],
-            objects=[],  # Can be enhanced with object detection
-            text_detected=None,  # Can be enhanced with OCR
+            objects=result.get("objects", []),
+            text_detected=result.get("text_detected"),
         )
 
     except Exception as e:
@@ -57,10 +70,121 @@ async def analyze_scene(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream_analysis(
+    vision_service: VisionService,
+    image_data: bytes,
+    prompt: str,
+    user_id: str,
+    finished: dict,
+    structured: bool = True,
+) -> AsyncIterator[str]:
+    # "delta" events carry description text; "result" the full VisionResponse
+    try:
+        # Closing the generator on disconnect closes the upstream stream too
+        events = vision_service.analyze_image_stream(
+            image_data, prompt, user_id=user_id, structured=structured
+        )
+        async with aclosing(events):
+            async for event in events:
+                if event["type"] == "delta":
+                    yield _sse("delta", json.dumps({"text": event["text"]}))
+                    continue
+                result = event["result"]
+                finished.update(result)
+                response = VisionResponse(
+                    description=result["description"],
+                    objects=result.get("objects", []),
+                    text_detected=result.get("text_detected"),
+                )
+                yield _sse("result", response.model_dump_json())
+    except Exception as e:
+        print(f"Error streaming image analysis: {e}")
+        yield _sse("error", json.dumps({"detail": str(e)}))
+
+
+@router.post("/analyze/stream")
+async def analyze_scene_stream(
+    user_id: str,
+    image: UploadFile = File(...),
+    prompt: str = SCENE_PROMPT,
+    vision_service: VisionService = Depends(get_vision_service),
+    db_service: Optional[DatabaseService] = Depends(get_optional_database_service),
+) -> StreamingResponse:
+    """
+    Analyze an image, streaming the description as Server-Sent Events
+
+    Args:
+        user_id: User ID
+        image: Image file to analyze
+        prompt: Question about the image
+        vision_service: Shared OpenAI service
+        db_service: Shared database service (logging is skipped if None)
+
+    Returns:
+        "delta" events with description text, then one "result" event with
+        the VisionResponse (or an "error" event)
+    """
+    image_data = await image.read()
+    finished: dict = {}
+
+    async def log_analysis() -> None:
+        # Runs once the stream has been sent, off the response path
+        if not db_service or not finished or finished.get("rejected"):
+            return
+        try:
+            await db_service.log_vision_analysis(
+                {
+                    "user_id": user_id,
+                    "prompt": prompt,
+                    "description": finished["description"],
+                    "model": finished["model"],
+                }
+            )
+        except Exception as e:
+            print(f"Error logging vision analysis: {e}")
+
+    return StreamingResponse(
+        _stream_analysis(vision_service, image_data, prompt, user_id, finished),
+        media_type="text/event-stream",
+        background=BackgroundTask(log_analysis),
+    )
+
+
+@router.post("/describe/stream")
+async def describe_scene_stream(
+    user_id: str,
+    image: UploadFile = File(...),
+    vision_service: VisionService = Depends(get_vision_service),
+) -> StreamingResponse:
+    """
+    Describe what's in front of the user, streaming the description as Server-Sent Events
+
+    Args:
+        user_id: User ID
+        image: Image from glasses camera
+        vision_service: Shared OpenAI service
+
+    Returns:
+        "delta" events with description text, then one "result" event
+    """
+    image_data = await image.read()
+    return StreamingResponse(
+        _stream_analysis(
+            vision_service, image_data, SCENE_PROMPT, user_id, {}, structured=False
+        ),
+        media_type="text/event-stream",
+    )
+
+
 @router.post("/describe")
 async def describe_scene(
     user_id: str,
     image: UploadFile = File(...),
+    vision_service: VisionService = Depends(get_vision_service),
 ) -> dict[str, str]:
     """
     Simple endpoint to describe what's in front of the user
@@ -68,22 +192,17 @@ async def describe_scene(
     Args:
         user_id: User ID
         image: Image from glasses camera
+        vision_service: Shared OpenAI service
 
     Returns:
         Description of the scene
     """
     try:
-        vision_service = VisionService()
-
         # Read image data
         image_data = await image.read()
 
-        # Analyze with default prompt
-        result = await vision_service.analyze_image(
-            image_data,
-            "Describe what you see in this image in 2-3 sentences. "
-            "Focus on the main objects, people, and context.",
-        )
+        # Plain low-detail description; reuses a /read-text result for the same frame
+        result = await vision_service.analyze_image(image_data, SCENE_PROMPT, user_id=user_id)
 
         return {
             "user_id": user_id,
@@ -95,10 +214,54 @@ async def describe_scene(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/burst")
+async def describe_burst(
+    user_id: str,
+    images: list[UploadFile] = File(...),
+    prompt: str = Form(SCENE_PROMPT),
+    vision_service: VisionService = Depends(get_vision_service),
+) -> dict[str, Any]:
+    """
+    Describe the scene from the sharpest of a few frames captured a moment apart
+
+    Args:
+        user_id: User ID
+        images: Burst of frames from the glasses camera
+        prompt: Question about the scene
+        vision_service: Shared OpenAI service
+
+    Returns:
+        Description, the index of the frame used, and "rejected" if none was usable
+    """
+    settings = get_settings()
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(images) > settings.vision_sequence_max_frames:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.vision_sequence_max_frames} frames per burst",
+        )
+
+    try:
+        frames = [await image.read() for image in images]
+        result = await vision_service.analyze_burst(frames, prompt, user_id=user_id)
+        return {
+            "user_id": user_id,
+            "description": result["description"],
+            "frame": result["frame"],
+            "rejected": result.get("rejected"),
+        }
+
+    except Exception as e:
+        print(f"Error describing burst: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/read-text")
 async def read_text(
     user_id: str,
     image: UploadFile = File(...),
+    vision_service: VisionService = Depends(get_vision_service),
 ) -> dict[str, str]:
     """
     Extract and read text from an image
@@ -106,28 +269,134 @@ async def read_text(
     Args:
         user_id: User ID
         image: Image containing text
+        vision_service: Shared OpenAI service
 
     Returns:
         Extracted text
     """
     try:
-        vision_service = VisionService()
-
         # Read image data
         image_data = await image.read()
 
-        # Analyze with OCR-focused prompt
+        # OCR needs the high-detail image; the structured result also serves /describe
         result = await vision_service.analyze_image(
-            image_data,
-            "Extract and list all visible text from this image. "
-            "Maintain the original formatting and order.",
+            image_data, SCENE_PROMPT, detail="high", user_id=user_id, structured=True
         )
 
         return {
             "user_id": user_id,
-            "text": result["description"],
+            "text": result.get("text_detected") or "",
         }
 
     except Exception as e:
         print(f"Error reading text: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch")
+async def analyze_batch(
+    user_id: str,
+    images: list[UploadFile] = File(...),
+    prompts: Optional[list[str]] = Form(None),
+    structured: bool = True,
+    merge_duplicates: bool = True,
+    format: str = "ndjson",
+    vision_service: VisionService = Depends(get_vision_service),
+) -> StreamingResponse:
+    """
+    Analyze several frames in one request, streaming results as they finish
+
+    Args:
+        user_id: User ID
+        images: Image files to analyze
+        prompts: One prompt per image (form field repeated); missing ones
+            default to a scene description, a single prompt applies to all
+        structured: Include objects and text_detected
+        merge_duplicates: Analyze near-identical frames with the same prompt once
+        format: "ndjson" (one JSON object per line) or "sse"
+        vision_service: Shared OpenAI service
+
+    Returns:
+        Streamed per-image results in completion order, each with its "index"
+    """
+    settings = get_settings()
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(images) > settings.vision_batch_max_images:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.vision_batch_max_images} images per batch",
+        )
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    prompts = prompts or []
+    if len(prompts) > len(images):
+        raise HTTPException(status_code=400, detail="More prompts than images")
+    if len(prompts) == 1:
+        prompts = prompts * len(images)
+
+    # Read every upload now: the files are closed once the response starts
+    items = [
+        (await image.read(), prompts[index] if index < len(prompts) else SCENE_PROMPT)
+        for index, image in enumerate(images)
+    ]
+
+    async def stream() -> AsyncIterator[str]:
+        results = vision_service.analyze_batch(
+            items,
+            user_id=user_id,
+            structured=structured,
+            concurrency=settings.vision_batch_concurrency,
+            merge_duplicates=merge_duplicates,
+            max_distance=settings.scene_cache_max_distance,
+            max_distance_high=settings.scene_cache_max_distance_high,
+        )
+        async for item in results:
+            line = json.dumps(item)
+            yield f"data: {line}\n\n" if format == "sse" else line + "\n"
+        if format == "sse":
+            yield "event: done\ndata: {}\n\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+
+@router.post("/sequence")
+async def describe_sequence(
+    user_id: str,
+    images: list[UploadFile] = File(...),
+    prompt: str = Form(SEQUENCE_PROMPT),
+    ages: Optional[list[float]] = Form(None),
+    vision_service: VisionService = Depends(get_vision_service),
+) -> dict[str, Any]:
+    """
+    Answer a question about the last few seconds from a few keyframes
+
+    Args:
+        user_id: User ID
+        images: Keyframes, oldest first
+        prompt: Question about what happened
+        ages: Seconds since each keyframe was captured (form field repeated)
+        vision_service: Shared OpenAI service
+
+    Returns:
+        Description of what happened across the frames
+    """
+    settings = get_settings()
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(images) > settings.vision_sequence_max_frames:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.vision_sequence_max_frames} frames per sequence",
+        )
+
+    try:
+        frames = [await image.read() for image in images]
+        result = await vision_service.describe_sequence(frames, prompt, ages)
+        return {"user_id": user_id, **result}
+
+    except Exception as e:
+        print(f"Error describing sequence: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
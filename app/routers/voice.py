@@ -1,98 +1,156 @@
 """
 Voice endpoints for audio transcription
 """
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.voice import VoiceService
-from app.services.vision import VisionService
-from app.services.database import DatabaseService
-from app.services.tts import TTSService
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from app.models.schemas import ActionRequest, ActionResponse, IntentType
+from app.routers.actions import INTEGRATION_INTENTS, intent_from_label, perform_action
+from app.services.tts import PIPELINE_FORMATS
+from app.services.voice import TranscriptEvent, VoiceService
+from app.services.wake_session import SpeculativeClassifier, WakeUpdate, WakeWordSession
+from app.services.vad import VoiceActivityDetector
+from app.services.conversation import ConversationWindow
 from app.core.config import get_settings
-import tempfile
-import os
+from app.core.container import ServiceContainer, get_container, get_voice_service
+from app.core.metrics import get_metrics
+from typing import Any, AsyncIterator, Optional
+import asyncio
+import time
 
 router = APIRouter(prefix="/voice", tags=["voice"])
 
 
+async def stream_audio(
+    websocket: WebSocket,
+    chunks: AsyncIterator[bytes],
+    text: str,
+    audio_format: str,
+) -> tuple[int, Optional[float]]:
+    """
+    Relay synthesized audio to the client as binary frames while it is generated
+
+    The frames are bracketed by audio_start / audio_end JSON messages;
+    audio_start is only sent once the first chunk exists.
+
+    Args:
+        websocket: WebSocket connection
+        chunks: Audio chunks from TTSService.stream
+        text: Text being spoken
+        audio_format: Audio format of the chunks
+
+    Returns:
+        (bytes sent, monotonic time of the first chunk or None)
+    """
+    sent = 0
+    first_at: Optional[float] = None
+    try:
+        async for chunk in chunks:
+            if first_at is None:
+                first_at = time.monotonic()
+                await websocket.send_json(
+                    {"type": "audio_start", "format": audio_format, "text": text}
+                )
+            await websocket.send_bytes(chunk)
+            sent += len(chunk)
+    except Exception as e:
+        print(f"⚠️  Could not stream reply audio: {e}")
+    finally:
+        # Closing the iterator cancels outstanding synthesis (e.g. on barge-in)
+        await chunks.aclose()
+        if first_at is not None:
+            await websocket.send_json({"type": "audio_end", "bytes": sent})
+    return sent, first_at
+
+
 @router.websocket("/transcribe")
-async def transcribe_audio(websocket: WebSocket, user_id: str) -> None:
+async def transcribe_audio(
+    websocket: WebSocket,
+    user_id: str,
+    services: ServiceContainer = Depends(get_container),
+) -> None:
     """
     WebSocket endpoint for real-time audio transcription
 
     Args:
         websocket: WebSocket connection
         user_id: User ID for session management
+        services: App-scoped service container
     """
     await websocket.accept()
     settings = get_settings()
-    voice_service = VoiceService()
-    tts_service = TTSService()
-
-    # Lazy-load services only when needed (after wake word detection)
-    vision_service = None
-    db_service = None
-
-    try:
-        # Buffer for wake word detection
-        transcription_buffer: list[str] = []
-        wake_word_detected = False
-
-        async def handle_transcript(text: str) -> None:
-            """Handle transcribed text"""
-            nonlocal wake_word_detected, vision_service, db_service
-
-            # Add to buffer
-            transcription_buffer.append(text)
-
-            # Keep only last 5 transcripts
-            if len(transcription_buffer) > 5:
-                transcription_buffer.pop(0)
-
-            # Check for wake word
-            full_text = " ".join(transcription_buffer)
-            if voice_service.detect_wake_word(full_text, settings.wake_word):
-                wake_word_detected = True
-                await websocket.send_json(
-                    {"type": "wake_word", "message": "Wake word detected!"}
-                )
+    voice_service = services.new_voice_service()
+
+    # Shared services built at startup (may be None if unavailable)
+    vision_service = services.vision
+    db_service = services.database
+    integration_service = services.integrations
+    tts_service = services.tts
+
+    # Local VAD gate so silence never leaves the server
+    vad: Optional[VoiceActivityDetector] = None
+    if settings.vad_enabled:
+        vad = VoiceActivityDetector(
+            frame_ms=settings.vad_frame_ms,
+            energy_threshold_db=settings.vad_energy_threshold_db,
+            noise_margin_db=settings.vad_noise_margin_db,
+            zcr_max=settings.vad_zcr_max,
+            hangover_ms=settings.vad_hangover_ms,
+            preroll_ms=settings.vad_preroll_ms,
+        )
 
-                # Speak confirmation - send TTS URL for client to fetch
-                backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
-                await websocket.send_json({
-                    "type": "audio_response",
-                    "text": "Yes?",
-                    "tts_params": {"text": "Yes?", "voice": "nova", "speed": 1.1}
-                })
+    # Wake word → command → one classification per utterance
+    wake_session = WakeWordSession(
+        settings.wake_word, command_timeout=settings.wake_command_timeout
+    )
+
+    metrics = get_metrics()
+
+    # Recent turns for follow-up questions; older ones are summarized in the background
+    conversation = ConversationWindow(
+        vision_service.summarize_conversation if vision_service is not None else None,
+        budget_tokens=settings.conversation_token_budget,
+        max_turns=settings.conversation_max_turns,
+    )
+
+    async def classify(command: str) -> dict[str, Any]:
+        return await vision_service.classify_intent(command, context={"user_id": user_id})
+
+    # Classify stable partial commands before the final transcript lands
+    speculative: Optional[SpeculativeClassifier] = None
+    if settings.speculative_intent and vision_service is not None:
+        speculative = SpeculativeClassifier(
+            classify,
+            min_stability=settings.speculative_min_stability,
+            min_words=settings.speculative_min_words,
+        )
 
-            # Send transcription to client
-            await websocket.send_json(
-                {
-                    "type": "transcription",
-                    "text": text,
-                    "wake_word_active": wake_word_detected,
-                }
-            )
+    # At most one command in flight; a newer wake word cancels it
+    command_task: Optional[asyncio.Task[None]] = None
 
-            # If wake word is active, process the command
-            if wake_word_detected:
-                # Lazy-load services when wake word is first detected
+    try:
+        async def process_command(command: str, ended_at: float, command_id: int) -> None:
+            """Classify a complete command utterance once and report it"""
+            try:
                 if vision_service is None:
-                    try:
-                        vision_service = VisionService()
-                    except Exception as e:
-                        print(f"⚠️  Vision service not available: {e}")
-                        await websocket.send_json({"type": "error", "message": f"Vision unavailable: {e}"})
-                        return
-
-                if db_service is None:
-                    try:
-                        db_service = DatabaseService()
-                    except Exception as e:
-                        print(f"⚠️  Database service not available: {e}")
-                        # Continue without database
-
-                # Classify intent
-                intent_result = await vision_service.classify_intent(
-                    text, context={"user_id": user_id}
+                    print("⚠️  Vision service not available")
+                    await websocket.send_json({"type": "error", "message": "Vision unavailable"})
+                    return
+
+                # Classify intent (reusing a matching speculative result)
+                reused = False
+                if speculative is not None:
+                    intent_result, reused = await speculative.resolve(command)
+                else:
+                    intent_result = await classify(command)
+
+                done = time.monotonic()
+                wake_to_intent_ms = (done - wake_session.armed_at) * 1000
+                end_to_intent_ms = (done - ended_at) * 1000
+                metrics.observe("voice.wake_to_intent", wake_to_intent_ms)
+                metrics.observe("voice.utterance_end_to_intent", end_to_intent_ms)
+                metrics.incr(
+                    "voice.intent_speculative_reused"
+                    if reused
+                    else "voice.intent_classified_on_final"
                 )
 
                 await websocket.send_json(
@@ -101,6 +159,12 @@ async def transcribe_audio(websocket: WebSocket, user_id: str) -> None:
                         "intent": intent_result["intent"],
                         "confidence": intent_result["confidence"],
                         "entities": intent_result["entities"],
+                        "text": command,
+                        "speculative": reused,
+                        "latency_ms": {
+                            "wake_to_intent": round(wake_to_intent_ms, 1),
+                            "utterance_end_to_intent": round(end_to_intent_ms, 1),
+                        },
                     }
                 )
 
@@ -112,12 +176,230 @@ async def transcribe_audio(websocket: WebSocket, user_id: str) -> None:
                                 "user_id": user_id,
                                 "action_type": "voice_command",
                                 "intent": intent_result["intent"],
-                                "text": text,
+                                "text": command,
                             }
                         )
                     except Exception as e:
                         print(f"⚠️  Could not log to database: {e}")
 
+                # Run the action and speak the reply on this socket
+                if settings.voice_dispatch_actions:
+                    await respond_to_command(
+                        command,
+                        intent_result,
+                        {"utterance_end_to_intent": end_to_intent_ms},
+                        ended_at,
+                    )
+            finally:
+                wake_session.complete(command_id)
+
+        async def respond_to_command(
+            command: str,
+            intent_result: dict[str, Any],
+            stages: dict[str, float],
+            ended_at: float,
+        ) -> None:
+            """Execute the classified intent in-process and stream the spoken reply"""
+            intent = intent_from_label(intent_result.get("intent", ""))
+            if intent == IntentType.DESCRIBE_SCENE:
+                # The camera frames are on the device: it answers (and speaks) from them
+                metrics.incr("voice.describe_scene_deferred")
+                return
+            parameters = dict(intent_result.get("entities") or {})
+            parameters.setdefault("text", command)
+
+            # General queries stream LLM sentences straight into TTS, so the first
+            # sentence plays while the model is still generating
+            sentences: Optional[asyncio.Queue[Optional[str]]] = None
+            speaker: Optional[asyncio.Task[tuple[int, Optional[float]]]] = None
+            speech_started = time.monotonic()
+            if (
+                tts_service is not None
+                and intent not in INTEGRATION_INTENTS
+                and settings.voice_reply_format in PIPELINE_FORMATS
+            ):
+                sentences = asyncio.Queue()
+
+                async def queued_sentences() -> AsyncIterator[str]:
+                    while (sentence := await sentences.get()) is not None:
+                        yield sentence
+
+                speaker = asyncio.create_task(
+                    stream_audio(
+                        websocket,
+                        tts_service.stream_sentences(
+                            queued_sentences(),
+                            voice=settings.voice_reply_voice,
+                            speed=settings.voice_reply_speed,
+                            response_format=settings.voice_reply_format,
+                            concurrency=settings.tts_pipeline_concurrency,
+                            chunk_size=settings.voice_audio_chunk_bytes,
+                        ),
+                        "",
+                        settings.voice_reply_format,
+                    )
+                )
+
+            async def on_sentence(sentence: str) -> None:
+                await sentences.put(sentence)
+
+            try:
+                # Action
+                started = time.monotonic()
+                if intent in INTEGRATION_INTENTS and integration_service is None:
+                    result = ActionResponse(
+                        success=False, message="Sorry, app integrations aren't available right now."
+                    )
+                else:
+                    try:
+                        result = await perform_action(
+                            ActionRequest(
+                                intent=intent,
+                                user_id=user_id,
+                                parameters=parameters,
+                                context=conversation.context(),
+                            ),
+                            integration_service,
+                            vision_service,
+                            db_service,
+                            on_sentence=on_sentence if sentences is not None else None,
+                        )
+                    except HTTPException as e:
+                        result = ActionResponse(success=False, message=f"Sorry, {e.detail}")
+                stages["action"] = (time.monotonic() - started) * 1000
+                if result.success and result.message:
+                    conversation.add("user", command)
+                    conversation.add("assistant", result.message)
+
+                await websocket.send_json(
+                    {
+                        "type": "action_result",
+                        "intent": intent.value,
+                        "success": result.success,
+                        "message": result.message,
+                        "data": result.data,
+                    }
+                )
+
+                first_at: Optional[float] = None
+                if speaker is not None:
+                    await sentences.put(None)
+                    sent, first_at = await speaker
+                    speaker = None
+                    if not sent and result.message:
+                        # Nothing was streamed (e.g. the action failed): speak the message
+                        speech_started = time.monotonic()
+                        first_at = None
+
+                # Speech, relayed chunk by chunk as it is synthesized
+                if first_at is None and tts_service is not None and result.message:
+                    if (
+                        len(result.message) >= settings.tts_pipeline_min_chars
+                        and settings.voice_reply_format in PIPELINE_FORMATS
+                    ):
+                        # Long replies: synthesize sentence by sentence, in parallel
+                        chunks = tts_service.stream_pipelined(
+                            result.message,
+                            voice=settings.voice_reply_voice,
+                            speed=settings.voice_reply_speed,
+                            response_format=settings.voice_reply_format,
+                            concurrency=settings.tts_pipeline_concurrency,
+                            chunk_size=settings.voice_audio_chunk_bytes,
+                        )
+                    else:
+                        chunks = tts_service.stream(
+                            result.message,
+                            voice=settings.voice_reply_voice,
+                            speed=settings.voice_reply_speed,
+                            response_format=settings.voice_reply_format,
+                            chunk_size=settings.voice_audio_chunk_bytes,
+                        )
+                    _, first_at = await stream_audio(
+                        websocket, chunks, result.message, settings.voice_reply_format
+                    )
+
+                if first_at is not None:
+                    stages["tts_first_byte"] = (first_at - speech_started) * 1000
+                    stages["first_audio"] = (first_at - ended_at) * 1000
+                    stages["tts_stream"] = (time.monotonic() - speech_started) * 1000
+                stages["end_to_end"] = (time.monotonic() - ended_at) * 1000
+                for stage, value in stages.items():
+                    metrics.observe(f"voice.stage.{stage}", value)
+                await websocket.send_json(
+                    {
+                        "type": "latency",
+                        "stages_ms": {stage: round(value, 1) for stage, value in stages.items()},
+                    }
+                )
+            finally:
+                if speaker is not None:
+                    speaker.cancel()
+
+        def start_command(command: str, ended_at: float) -> None:
+            """Run a command off the transcript queue so transcripts keep flowing"""
+            nonlocal command_task
+            cancel_command()
+            command_task = asyncio.create_task(
+                process_command(command, ended_at, wake_session.commands_dispatched)
+            )
+
+        def cancel_command() -> bool:
+            """Cancel the command in flight, if any"""
+            if command_task is not None and not command_task.done():
+                command_task.cancel()
+                return True
+            return False
+
+        async def apply_update(update: WakeUpdate, ended_at: Optional[float] = None) -> None:
+            """Send wake/timeout notifications and start any completed command"""
+            if update.armed:
+                await websocket.send_json(
+                    {"type": "wake_word", "message": "Wake word detected!"}
+                )
+
+                # Speak confirmation - send TTS params for client to fetch
+                await websocket.send_json({
+                    "type": "audio_response",
+                    "text": "Yes?",
+                    "tts_params": {"text": "Yes?", "voice": "nova", "speed": 1.1}
+                })
+
+            if update.superseded and cancel_command():
+                metrics.incr("voice.command_superseded")
+                await websocket.send_json({"type": "command_cancelled"})
+
+            if update.timed_out:
+                if speculative is not None:
+                    speculative.cancel()
+                await websocket.send_json({"type": "wake_timeout"})
+
+            if update.command:
+                start_command(update.command, ended_at or time.monotonic())
+
+        async def handle_transcript(event: TranscriptEvent) -> None:
+            """Handle a transcript event"""
+            update = wake_session.feed(event, now=event.received_at)
+
+            if speculative is not None and not update.command:
+                candidate = wake_session.candidate(event)
+                if candidate:
+                    speculative.maybe_start(candidate, event)
+
+            # Send transcription to client
+            await websocket.send_json(
+                {
+                    "type": "transcription",
+                    "text": event.text,
+                    "is_final": event.is_final,
+                    "speech_final": event.speech_final,
+                    "stability": round(event.stability, 2),
+                    "wake_word_active": wake_session.active,
+                    "phase": wake_session.phase.value,
+                }
+            )
+
+            await apply_update(update, ended_at=event.received_at)
+
         # Start transcription
         await voice_service.start_transcription(
             on_transcript=handle_transcript,
@@ -126,15 +408,41 @@ async def transcribe_audio(websocket: WebSocket, user_id: str) -> None:
 
         # Receive and process audio data
         audio_count = 0
+        last_upstream = time.monotonic()
         while True:
             audio_data = await websocket.receive_bytes()
             audio_count += 1
 
             # Log every 50 chunks to see if audio is flowing
             if audio_count % 50 == 0:
-                print(f"📡 Received {audio_count} audio chunks ({len(audio_data)} bytes in last chunk)")
+                print(
+                    f"📡 Received {audio_count} audio chunks "
+                    f"({len(audio_data)} bytes in last chunk)"
+                )
 
-            await voice_service.send_audio(audio_data)
+            # Expire a wake word that was never followed by a command
+            if wake_session.active:
+                update = wake_session.tick()
+                if update.command or update.timed_out:
+                    await apply_update(update)
+
+            if vad is None:
+                await voice_service.send_audio(audio_data)
+                continue
+
+            # Forward only speech (plus pre-roll) to Deepgram
+            speech, segment_ended = vad.process(audio_data)
+            now = time.monotonic()
+            if speech:
+                await voice_service.send_audio(speech)
+                last_upstream = now
+            elif now - last_upstream >= settings.deepgram_keepalive_interval:
+                await voice_service.send_keep_alive()
+                last_upstream = now
+
+            if segment_ended:
+                await voice_service.finalize()
+                await websocket.send_json({"type": "vad_stats", **vad.stats.to_dict()})
 
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for user {user_id}")
@@ -142,23 +450,38 @@ async def transcribe_audio(websocket: WebSocket, user_id: str) -> None:
         print(f"Error in transcription: {e}")
         await websocket.send_json({"type": "error", "message": str(e)})
     finally:
+        if command_task is not None and not command_task.done():
+            command_task.cancel()
+        if vad is not None:
+            print(f"🔇 VAD stats for {user_id}: {vad.stats.to_dict()}")
+        print(f"🎯 Commands classified for {user_id}: {wake_session.commands_dispatched}")
+        if speculative is not None:
+            speculative.cancel()
+            print(
+                f"⚡ Speculative intents for {user_id}: "
+                f"{speculative.hits} reused, {speculative.misses} discarded"
+            )
+        await conversation.close()
         await voice_service.stop_transcription()
         await websocket.close()
 
 
 @router.get("/wake-word-test")
-async def test_wake_word(text: str) -> dict[str, str | bool]:
+async def test_wake_word(
+    text: str,
+    voice_service: VoiceService = Depends(get_voice_service),
+) -> dict[str, str | bool]:
     """
     Test wake word detection
 
     Args:
         text: Text to test
+        voice_service: Voice service on the shared Deepgram client
 
     Returns:
         Dictionary with detection result
     """
     settings = get_settings()
-    voice_service = VoiceService()
 
     detected = voice_service.detect_wake_word(text, settings.wake_word)
 
@@ -170,18 +493,21 @@ async def test_wake_word(text: str) -> dict[str, str | bool]:
 
 
 @router.post("/text-to-speech")
-async def text_to_speech(text: str) -> dict[str, str]:
+async def text_to_speech(
+    text: str,
+    voice_service: VoiceService = Depends(get_voice_service),
+) -> dict[str, str]:
     """
     Convert text to speech using Deepgram TTS
 
     Args:
         text: Text to convert to speech
+        voice_service: Voice service on the shared Deepgram client
 
     Returns:
         Base64 encoded audio data
     """
     try:
-        voice_service = VoiceService()
         audio_bytes = await voice_service.text_to_speech(text)
 
         # Encode to base64 for JSON transport
@@ -195,6 +521,5 @@ async def text_to_speech(text: str) -> dict[str, str]:
         }
 
     except Exception as e:
-        from fastapi import HTTPException
         print(f"Error in TTS endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
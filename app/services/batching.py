@@ -0,0 +1,120 @@
+"""
+Micro-batching scheduler for upstream calls
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+from app.core.metrics import get_metrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Gathers items submitted within a short window into one batched call
+
+    The first item of a batch opens a window of max_wait_ms; the batch is
+    flushed when the window closes or max_size items are waiting, whichever
+    comes first. Results are fanned back out to each waiting caller in order.
+    A cancelled caller simply doesn't receive its result; the batch still runs.
+    If the batch itself is cancelled (e.g. by close() at shutdown), its callers
+    are cancelled too rather than left waiting.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[T]], Awaitable[list[R]]],
+        max_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "batch",
+    ) -> None:
+        """
+        Args:
+            process: Coroutine function returning one result per item, in order
+            max_size: Maximum items per batch
+            max_wait_ms: Longest an item waits for the batch to fill
+            name: Metric name prefix
+        """
+        self.process = process
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.metrics = get_metrics()
+        self.batches = 0
+        self.items = 0
+
+        self._pending: list[tuple[T, asyncio.Future[R], float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def close(self) -> None:
+        """Cancel queued and running batches; their callers get CancelledError"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queued, self._pending = self._pending, []
+        for _, future, _ in queued:
+            if not future.done():
+                future.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future, time.monotonic()))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(0, self._flush)
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future[R], float]]) -> None:
+        started = time.monotonic()
+        for _, _, queued_at in batch:
+            self.metrics.observe(f"{self.name}.wait", (started - queued_at) * 1000)
+
+        try:
+            results = await self.process([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            # Cancelled mid-call: the waiters would otherwise hang forever
+            for _, future, _ in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.metrics.observe(f"{self.name}.call", (time.monotonic() - started) * 1000)
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        self.batches += 1
+        self.items += len(batch)
+        self.metrics.incr(f"{self.name}.batches")
+        self.metrics.incr(f"{self.name}.items", len(batch))
+        self.metrics.set_gauge(f"{self.name}.avg_size", round(self.items / self.batches, 2))
@@ -0,0 +1,130 @@
+"""
+Token-budgeted conversation history with a rolling summary
+"""
+import asyncio
+import math
+from typing import Any, Awaitable, Callable, Optional
+from app.core.metrics import get_metrics
+
+# Fixed per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate tokens locally, without a tokenizer download or API call
+
+    Conservative for English: ~4 characters or ~0.75 words per token,
+    whichever gives more.
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 1.3))
+
+
+def message_tokens(message: dict[str, Any]) -> int:
+    """Tokens used by one chat message"""
+    return count_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def fit_history(
+    history: list[dict[str, Any]], budget: int, max_turns: int = 0
+) -> list[dict[str, Any]]:
+    """
+    Keep the newest messages that fit within a token budget
+
+    Args:
+        history: Chat messages, oldest first
+        budget: Maximum total tokens
+        max_turns: Maximum messages kept (0 for no limit)
+
+    Returns:
+        The newest suffix of history within both limits
+    """
+    kept = 0
+    used = 0
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if used + cost > budget or (max_turns and kept >= max_turns):
+            break
+        used += cost
+        kept += 1
+    return history[len(history) - kept:]
+
+
+class ConversationWindow:
+    """
+    Recent turns verbatim, everything older folded into a rolling summary
+
+    Turns that fall out of the token budget (or the turn limit) are queued for
+    summarization, which runs in a background task and folds them into the
+    existing summary incrementally. Building a prompt never waits for it: the
+    last finished summary is used, so summarization stays off the request path.
+    """
+
+    def __init__(
+        self,
+        summarize: Optional[Callable[[str, list[dict[str, Any]]], Awaitable[str]]] = None,
+        budget_tokens: int = 1200,
+        max_turns: int = 12,
+    ) -> None:
+        """
+        Args:
+            summarize: Coroutine function (summary so far, folded turns) -> new summary;
+                older turns are simply dropped when None
+            budget_tokens: Token budget for the verbatim turns
+            max_turns: Maximum verbatim messages
+        """
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self.max_turns = max_turns
+        self.summary = ""
+        self.history: list[dict[str, Any]] = []
+        self.metrics = get_metrics()
+
+        self._folded: list[dict[str, Any]] = []
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def add(self, role: str, content: str) -> None:
+        """Append a turn and fold whatever no longer fits"""
+        if not content:
+            return
+        self.history.append({"role": role, "content": content})
+        recent = fit_history(self.history, self.budget_tokens, self.max_turns)
+        overflow = self.history[:len(self.history) - len(recent)]
+        if not overflow:
+            return
+        self.history = recent
+        if self.summarize is None:
+            return
+        self._folded.extend(overflow)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    def context(self) -> dict[str, Any]:
+        """Context for VisionService.generate_response"""
+        context: dict[str, Any] = {"conversation_history": list(self.history)}
+        if self.summary:
+            context["conversation_summary"] = self.summary
+        return context
+
+    async def _refresh(self) -> None:
+        # Loop so turns folded while a summary was being written aren't lost
+        while self._folded:
+            turns, self._folded = self._folded, []
+            try:
+                self.summary = await self.summarize(self.summary, turns)
+                self.metrics.incr("conversation.summaries")
+            except Exception as e:
+                print(f"⚠️  Could not summarize conversation: {e}")
+                return
+
+    async def close(self) -> None:
+        """Stop any summarization in progress"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
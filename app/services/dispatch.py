@@ -0,0 +1,197 @@
+"""
+Ordered, bounded per-session transcript dispatch
+"""
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+from app.core.metrics import get_metrics
+
+if TYPE_CHECKING:
+    from app.services.voice import TranscriptEvent
+
+
+class OverflowPolicy(str, Enum):
+    """What to do when the queue is full"""
+
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued event (interims first)
+    DROP_NEWEST = "drop_newest"  # Refuse the incoming event
+
+
+class TranscriptDispatcher:
+    """
+    Feeds transcript events to one async handler, in order, from any thread
+
+    Events are handed over with call_soon_threadsafe, so the Deepgram SDK may
+    deliver them from its own callback context. A single worker runs the
+    handler for one event at a time, which keeps replies in arrival order.
+
+    Policies:
+        - Interim hypotheses coalesce: a queued interim is replaced by a newer one.
+        - A final transcript supersedes everything interim before it: queued
+          interims are dropped and an interim still being handled is cancelled.
+        - On overflow, interims are always evicted before finals.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[["TranscriptEvent"], Awaitable[None]],
+        maxsize: int = 32,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        coalesce_interim: bool = True,
+        name: str = "voice.transcripts",
+    ) -> None:
+        """
+        Args:
+            handler: Coroutine function called for each event
+            maxsize: Maximum queued events
+            policy: Overflow policy
+            coalesce_interim: Replace a queued interim with a newer one
+            name: Metric name prefix
+        """
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_interim = coalesce_interim
+        self.name = name
+        self.metrics = get_metrics()
+
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.max_depth = 0
+        self._published_depth = 0
+
+        self._queue: deque[tuple["TranscriptEvent", float]] = deque()
+        self._ready = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task[None]] = None
+        self._current: Optional[asyncio.Task[None]] = None
+        self._current_event: Optional["TranscriptEvent"] = None
+
+    @property
+    def depth(self) -> int:
+        """Number of queued events"""
+        return len(self._queue)
+
+    def start(self) -> None:
+        """Start the worker on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        if self._worker is None:
+            self._worker = self._loop.create_task(self._run())
+
+    def submit(self, event: "TranscriptEvent") -> None:
+        """Queue an event; safe to call from any thread"""
+        if self._loop is None:
+            raise RuntimeError("Dispatcher is not started")
+        self._loop.call_soon_threadsafe(self._enqueue, event)
+
+    async def close(self) -> None:
+        """Stop the worker and drop anything still queued"""
+        for task in (self._current, self._worker):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._worker is not None:
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue.clear()
+        self._publish_depth()
+
+    def stats(self) -> dict[str, int]:
+        """Per-session dispatcher counters"""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
+
+    def _enqueue(self, event: "TranscriptEvent") -> None:
+        now = time.monotonic()
+
+        if event.is_final:
+            # A final supersedes stale interim work
+            stale = [item for item in self._queue if not item[0].is_final]
+            if stale:
+                self._queue = deque(item for item in self._queue if item[0].is_final)
+                self._count_drop(len(stale))
+            if (
+                self._current is not None
+                and self._current_event is not None
+                and not self._current_event.is_final
+                and not self._current.done()
+            ):
+                self._current.cancel()
+                self.cancelled += 1
+                self.metrics.incr(f"{self.name}.cancelled")
+        elif self.coalesce_interim and self._queue and not self._queue[-1][0].is_final:
+            self._queue[-1] = (event, now)
+            self.coalesced += 1
+            self.metrics.incr(f"{self.name}.coalesced")
+            return
+
+        if len(self._queue) >= self.maxsize and not self._make_room():
+            self._count_drop(1)
+            return
+
+        self._queue.append((event, now))
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._publish_depth()
+        self._ready.set()
+
+    def _make_room(self) -> bool:
+        """Evict one queued event according to the policy; False to drop the incoming one"""
+        for index, (queued, _) in enumerate(self._queue):
+            if not queued.is_final:
+                del self._queue[index]
+                self._count_drop(1)
+                return True
+        if self.policy is OverflowPolicy.DROP_NEWEST:
+            return False
+        self._queue.popleft()
+        self._count_drop(1)
+        return True
+
+    def _count_drop(self, count: int) -> None:
+        self.dropped += count
+        self.metrics.incr(f"{self.name}.dropped", count)
+
+    def _publish_depth(self) -> None:
+        # The gauge is the total depth across all sessions
+        delta = len(self._queue) - self._published_depth
+        if delta:
+            self.metrics.add_gauge(f"{self.name}.depth", delta)
+            self._published_depth = len(self._queue)
+
+    async def _run(self) -> None:
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+
+            event, queued_at = self._queue.popleft()
+            self._publish_depth()
+            self.metrics.observe(f"{self.name}.queue_wait", (time.monotonic() - queued_at) * 1000)
+
+            self._current_event = event
+            self._current = asyncio.create_task(self.handler(event))
+            try:
+                await self._current
+            except asyncio.CancelledError:
+                # Our worker being cancelled vs. the handler being superseded
+                if self._worker is not None and self._worker.cancelling():
+                    raise
+            except Exception as e:
+                print(f"⚠️  Error handling transcript: {e}")
+            finally:
+                self._current = None
+                self._current_event = None
+            self.processed += 1
+            self.metrics.incr(f"{self.name}.processed")
@@ -0,0 +1,305 @@
+"""
+Image preprocessing before vision upload
+"""
+import base64
+import io
+import re
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Prompts that need fine detail (reading text) get the high-detail profile
+_HIGH_DETAIL_PROMPT = re.compile(
+    r"\b(text|read|reading|ocr|sign|label|document|menu|receipt|screen|small|fine print|extract)\b",
+    re.IGNORECASE,
+)
+
+_EXIF_ORIENTATION = 0x0112
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes ready for upload, plus what was done to them"""
+
+    data: bytes
+    mime_type: str
+    detail: str  # "low" or "high"
+    width: int = 0
+    height: int = 0
+    original_bytes: int = 0
+    original_format: Optional[str] = None
+    original_size: tuple[int, int] = (0, 0)
+    scene_hash: Optional[int] = None  # 64-bit dHash of the scene
+
+    @property
+    def data_url(self) -> str:
+        """Base64 data URL for the image_url content part"""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pair of a tiny grayscale thumbnail
+
+    Near-identical frames (sensor noise, small head movements, recompression)
+    hash within a few bits of each other; compare with hamming_distance().
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def compute_scene_hash(data: bytes) -> Optional[int]:
+    """
+    dHash straight from encoded bytes, decoding JPEGs at a fraction of full size
+
+    Returns:
+        Hash, or None if the bytes are not a readable image
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format == "JPEG":
+                image.draft("L", (64, 64))
+            return dhash(image)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+@dataclass
+class FrameQuality:
+    """Local blur and exposure measurements of a frame"""
+
+    sharpness: float  # variance of the Laplacian
+    brightness: float  # mean gray level, 0-255
+    dark_fraction: float  # share of near-black pixels
+    bright_fraction: float  # share of clipped highlights
+    contrast: float = 0.0  # standard deviation of the gray levels
+    reason: Optional[str] = None  # "blurry", "too_dark" or "overexposed" when rejected
+
+    @property
+    def ok(self) -> bool:
+        """True if the frame is worth a vision call"""
+        return self.reason is None
+
+
+def assess_quality(
+    data: bytes,
+    min_sharpness: float = 40.0,
+    max_dark_fraction: float = 0.9,
+    max_bright_fraction: float = 0.6,
+    min_contrast: float = 12.0,
+    max_side: int = 256,
+) -> FrameQuality:
+    """
+    Score blur and exposure on a small grayscale copy of a frame
+
+    A low Laplacian variance only means blur when the frame has contrast to
+    lose: a plain wall or a blank sheet is flat however still the camera is,
+    so low-contrast frames are never rejected as blurry. Likewise a bright
+    frame is only overexposed if the clipping left no sharp detail, so a
+    well-lit printed page gets through.
+
+    CPU-bound; run it in a worker thread.
+
+    Args:
+        data: Encoded frame
+        min_sharpness: Laplacian variance below which the frame is blurry
+        max_dark_fraction: Share of pixels below 20 above which it is too dark
+        max_bright_fraction: Share of pixels above 245 above which a frame without
+            sharp detail is overexposed
+        min_contrast: Gray-level standard deviation below which the frame is
+            featureless rather than blurry
+        max_side: Longest side of the copy that is scored
+
+    Returns:
+        Measurements, with the rejection reason if any
+
+    Raises:
+        ValueError: If the bytes are not a readable image
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format == "JPEG":
+                image.draft("L", (max_side, max_side))
+            gray = image.convert("L")
+            gray.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+            pixels = np.asarray(gray, dtype=np.float32)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+
+    # 4-neighbour Laplacian; motion blur flattens it
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    sharpness = float(laplacian.var()) if laplacian.size else 0.0
+    contrast = float(pixels.std())
+
+    histogram = np.bincount(pixels.astype(np.uint8).ravel(), minlength=256)
+    total = max(int(histogram.sum()), 1)
+    dark_fraction = float(histogram[:20].sum() / total)
+    bright_fraction = float(histogram[246:].sum() / total)
+
+    reason = None
+    if dark_fraction > max_dark_fraction:
+        reason = "too_dark"
+    elif bright_fraction > max_bright_fraction and sharpness < min_sharpness:
+        # Clipped highlights with edges left (printed paper) are still readable
+        reason = "overexposed"
+    elif sharpness < min_sharpness and contrast >= min_contrast:
+        reason = "blurry"
+    return FrameQuality(
+        sharpness=round(sharpness, 1),
+        brightness=round(float(pixels.mean()), 1),
+        dark_fraction=round(dark_fraction, 3),
+        bright_fraction=round(bright_fraction, 3),
+        contrast=round(contrast, 1),
+        reason=reason,
+    )
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+def select_detail(prompt: str) -> str:
+    """
+    Pick the OpenAI image detail level for a prompt
+
+    Scene descriptions are fine at "low" (one 512px tile, fixed token cost);
+    reading text needs "high".
+    """
+    return "high" if _HIGH_DETAIL_PROMPT.search(prompt) else "low"
+
+
+def passthrough(data: bytes, detail: str) -> PreparedImage:
+    """Wrap unprocessed bytes, sniffing the format if Pillow can read it"""
+    mime_type = "image/jpeg"
+    size = (0, 0)
+    scene_hash = None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            mime_type = _MIME_TYPES.get(image.format or "", mime_type)
+            size = image.size
+            scene_hash = dhash(image)
+    except (UnidentifiedImageError, OSError):
+        pass
+    return PreparedImage(
+        data=data,
+        mime_type=mime_type,
+        detail=detail,
+        width=size[0],
+        height=size[1],
+        original_bytes=len(data),
+        original_size=size,
+        scene_hash=scene_hash,
+    )
+
+
+def preprocess_image(
+    data: bytes,
+    detail: str,
+    max_side: int,
+    quality: int,
+    output_format: str = "jpeg",
+) -> PreparedImage:
+    """
+    Orient, downscale and re-encode an image for upload
+
+    A low Laplacian variance only means blur when the frame has contrast to
+    lose: a plain wall or a blank sheet is flat however still the camera is,
+    so low-contrast frames are never rejected as blurry. Likewise a bright
+    frame is only overexposed if the clipping left no sharp detail, so a
+    well-lit printed page gets through.
+
+    CPU-bound; run it in a worker thread.
+
+    Args:
+        data: Raw image bytes in any format Pillow reads
+        detail: OpenAI detail level the image is prepared for
+        max_side: Longest side in pixels after downscaling
+        quality: JPEG/WebP quality
+        output_format: "jpeg" or "webp"
+
+    Returns:
+        Prepared image; the original bytes are kept when re-encoding wouldn't
+        make them smaller
+
+    Raises:
+        ValueError: If the bytes are not a readable image
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_format = image.format
+        original_size = image.size
+        if original_format == "JPEG":
+            # Let the decoder skip DCT detail we'd discard when downscaling
+            image.draft("RGB", (max_side, max_side))
+        image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+
+    # Camera frames are often stored sideways with an EXIF rotation tag
+    rotated = image.getexif().get(_EXIF_ORIENTATION, 1) != 1
+    if rotated:
+        image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    resized = max(original_size) > max_side
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    scene_hash = dhash(image)
+
+    pil_format = "WEBP" if output_format.lower() == "webp" else "JPEG"
+    buffer = io.BytesIO()
+    save_options = {"quality": quality}
+    if pil_format == "JPEG":
+        save_options.update(optimize=True, progressive=True)
+    else:
+        save_options["method"] = 4
+    image.save(buffer, format=pil_format, **save_options)
+    encoded = buffer.getvalue()
+
+    if (
+        not resized
+        and not rotated
+        and len(encoded) >= len(data)
+        and original_format in _MIME_TYPES
+    ):
+        # Already small and compact: re-encoding would only cost quality
+        return PreparedImage(
+            data=data,
+            mime_type=_MIME_TYPES[original_format],
+            detail=detail,
+            width=original_size[0],
+            height=original_size[1],
+            original_bytes=len(data),
+            original_format=original_format,
+            original_size=original_size,
+            scene_hash=scene_hash,
+        )
+
+    return PreparedImage(
+        data=encoded,
+        mime_type=f"image/{pil_format.lower()}",
+        detail=detail,
+        width=image.size[0],
+        height=image.size[1],
+        original_bytes=len(data),
+        original_format=original_format,
+        original_size=original_size,
+        scene_hash=scene_hash,
+    )
@@ -1,28 +1,135 @@
 """
 Composio integration service for app connections
 """
-from typing import Any, Optional
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
 from app.core.config import get_settings
+from app.core.metrics import get_metrics
+
+T = TypeVar("T")
 
 
 class IntegrationService:
-    """Service for managing app integrations via Composio"""
+    """
+    Service for managing app integrations via Composio
+
+    The Composio SDK is synchronous, so every action runs on a dedicated,
+    size-bounded thread pool rather than on the event loop. Each app (Slack,
+    Gmail, ...) also has its own concurrency limit, so one slow app can't take
+    every worker. Calls time out after integration_timeout seconds; a timed-out
+    or cancelled call that hasn't started is dropped, one already running in a
+    thread finishes in the background and keeps its app slot until it does.
+    """
 
     def __init__(self) -> None:
         try:
             # Lazy import to avoid dependency issues
-            from composio_openai import ComposioToolSet
+            from composio_openai import Action, ComposioToolSet
+
             settings = get_settings()
             self.toolset = ComposioToolSet(api_key=settings.composio_api_key)
+            self.actions = Action
         except ImportError as e:
             raise ImportError(
-                f"Composio not available: {e}. "
-                "Integration features disabled for now."
+                f"Composio not available: {e}. Integration features disabled for now."
             ) from e
 
-    async def check_slack_messages(
-        self, user_id: str, channel: str = "general"
-    ) -> dict[str, Any]:
+        self.timeout = settings.integration_timeout
+        self.app_concurrency = settings.integration_app_concurrency
+        self.default_concurrency = settings.integration_default_concurrency
+        self.metrics = get_metrics()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.integration_max_workers, thread_name_prefix="composio"
+        )
+        self._app_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def execute_action(
+        self,
+        action: str,
+        params: dict[str, Any],
+        entity_id: str,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Run a Composio action on the integration thread pool
+
+        Args:
+            action: Action name, e.g. "SLACK_CONVERSATIONS_HISTORY"; the prefix
+                before the first underscore is the app
+            params: Action parameters
+            entity_id: Composio entity (user) ID
+            timeout: Seconds to wait (default: integration_timeout)
+
+        Returns:
+            Action result
+
+        Raises:
+            TimeoutError: If the action didn't finish in time
+        """
+        app = action.split("_", 1)[0].lower()
+        return await self._run(
+            app,
+            functools.partial(
+                self.toolset.execute_action,
+                action=getattr(self.actions, action),
+                params=params,
+                entity_id=entity_id,
+            ),
+            timeout or self.timeout,
+        )
+
+    async def _run(self, app: str, call: Callable[[], T], timeout: float) -> T:
+        limit = self._app_limits.get(app)
+        if limit is None:
+            limit = self._app_limits[app] = asyncio.Semaphore(
+                self.app_concurrency.get(app, self.default_concurrency)
+            )
+
+        queued_at = time.monotonic()
+        await limit.acquire()
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self.metrics.observe(f"integrations.{app}.wait", (started - queued_at) * 1000)
+        self.metrics.add_gauge("integrations.in_flight", 1)
+
+        def release(_: Future) -> None:
+            # The slot is held until the thread is done, not just until we stop waiting
+            self.metrics.add_gauge("integrations.in_flight", -1)
+            try:
+                loop.call_soon_threadsafe(limit.release)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        try:
+            future = self._executor.submit(call)
+        except Exception:
+            release(Future())
+            raise
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.incr(f"integrations.{app}.timeouts")
+            raise TimeoutError(f"{app} call timed out after {timeout:g}s") from None
+        except asyncio.CancelledError:
+            self.metrics.incr(f"integrations.{app}.cancelled")
+            raise
+        except Exception:
+            self.metrics.incr(f"integrations.{app}.errors")
+            raise
+        finally:
+            self.metrics.observe(f"integrations.{app}.call", (time.monotonic() - started) * 1000)
+
+    def close(self) -> None:
+        """Drop queued actions and stop the worker threads once running ones finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def check_slack_messages(self, user_id: str, channel: str = "general") -> dict[str, Any]:
         """
         Check Slack messages in a specific channel
 
@@ -34,12 +141,9 @@ class IntegrationService:
             Dictionary containing messages
         """
         try:
-            # Get Slack tools
-            tools = self.toolset.get_tools(apps=[App.SLACK])
-
             # Get messages from channel
-            result = self.toolset.execute_action(
-                action=Action.SLACK_CONVERSATIONS_HISTORY,
+            result = await self.execute_action(
+                action="SLACK_CONVERSATIONS_HISTORY",
                 params={"channel": channel, "limit": 10},
                 entity_id=user_id,
             )
@@ -81,8 +185,8 @@ class IntegrationService:
             if attachment_url:
                 params["attachment_url"] = attachment_url
 
-            result = self.toolset.execute_action(
-                action=Action.GMAIL_SEND_EMAIL,
+            result = await self.execute_action(
+                action="GMAIL_SEND_EMAIL",
                 params=params,
                 entity_id=user_id,
             )
@@ -108,8 +212,8 @@ class IntegrationService:
             Dictionary containing search results
         """
         try:
-            result = self.toolset.execute_action(
-                action=Action.GOOGLEDRIVE_SEARCH_FILES,
+            result = await self.execute_action(
+                action="GOOGLEDRIVE_SEARCH_FILES",
                 params={"query": query, "pageSize": max_results},
                 entity_id=user_id,
             )
@@ -132,8 +236,8 @@ class IntegrationService:
             Shareable URL or None
         """
         try:
-            result = self.toolset.execute_action(
-                action=Action.GOOGLEDRIVE_GET_FILE,
+            result = await self.execute_action(
+                action="GOOGLEDRIVE_GET_FILE",
                 params={"fileId": file_id},
                 entity_id=user_id,
             )
@@ -160,8 +264,8 @@ class IntegrationService:
             Created task information
         """
         try:
-            result = self.toolset.execute_action(
-                action=Action.NOTION_CREATE_PAGE,
+            result = await self.execute_action(
+                action="NOTION_CREATE_PAGE",
                 params={
                     "parent": {"database_id": database_id},
                     "properties": {
@@ -199,8 +303,8 @@ class IntegrationService:
             Dictionary containing calendar events
         """
         try:
-            result = self.toolset.execute_action(
-                action=Action.GOOGLECALENDAR_LIST_EVENTS,
+            result = await self.execute_action(
+                action="GOOGLECALENDAR_LIST_EVENTS",
                 params={"timeMin": time_min, "timeMax": time_max},
                 entity_id=user_id,
             )
@@ -211,7 +315,7 @@ class IntegrationService:
             print(f"Error getting calendar events: {e}")
             return {"error": str(e), "events": []}
 
-    def get_connected_accounts(self, user_id: str) -> list[str]:
+    async def get_connected_accounts(self, user_id: str) -> list[str]:
         """
         Get list of connected accounts for a user
 
@@ -222,7 +326,11 @@ class IntegrationService:
             List of connected app names
         """
         try:
-            connections = self.toolset.get_entity(entity_id=user_id).connected_accounts
+            connections = await self._run(
+                "composio",
+                lambda: self.toolset.get_entity(entity_id=user_id).connected_accounts,
+                self.timeout,
+            )
             return [conn.app for conn in connections]
         except Exception as e:
             print(f"Error getting connected accounts: {e}")
@@ -0,0 +1,613 @@
+"""
+Local fast-path intent classifier
+
+Resolves confident commands ("check my Slack", "what's on my calendar")
+without an LLM round trip. Two tiers run in well under a millisecond:
+
+1. Keyword/regex rules for unambiguous phrasings
+2. A hashed character n-gram TF-IDF + softmax linear model trained from seed
+   examples and utterances the LLM has labelled before
+
+Anything below the confidence threshold falls through to the LLM, whose
+answer is logged as training data for the next retrain.
+"""
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+import numpy as np
+from app.core.metrics import get_metrics
+from app.models.schemas import IntentType
+
+
+# (text, intent) pairs the model always trains on, so it works before any logs exist
+SEED_EXAMPLES: list[tuple[str, IntentType]] = [
+    ("what do you see", IntentType.DESCRIBE_SCENE),
+    ("what's in front of me", IntentType.DESCRIBE_SCENE),
+    ("describe what i'm looking at", IntentType.DESCRIBE_SCENE),
+    ("what am i looking at", IntentType.DESCRIBE_SCENE),
+    ("describe the scene", IntentType.DESCRIBE_SCENE),
+    ("read this sign for me", IntentType.DESCRIBE_SCENE),
+    ("what is this", IntentType.DESCRIBE_SCENE),
+    ("tell me what's around me", IntentType.DESCRIBE_SCENE),
+    ("check my slack", IntentType.CHECK_SLACK),
+    ("any new slack messages", IntentType.CHECK_SLACK),
+    ("what's new in the general channel", IntentType.CHECK_SLACK),
+    ("read my slack messages", IntentType.CHECK_SLACK),
+    ("did anyone message me on slack", IntentType.CHECK_SLACK),
+    ("check the engineering channel", IntentType.CHECK_SLACK),
+    ("what are people saying in random", IntentType.CHECK_SLACK),
+    ("send an email to sarah", IntentType.SEND_EMAIL),
+    ("email john about the meeting", IntentType.SEND_EMAIL),
+    ("write an email to my boss", IntentType.SEND_EMAIL),
+    ("shoot an email to the team saying i'm running late", IntentType.SEND_EMAIL),
+    ("send a message to alex by email", IntentType.SEND_EMAIL),
+    ("reply to that email", IntentType.SEND_EMAIL),
+    ("search my drive for the budget", IntentType.SEARCH_DRIVE),
+    ("find the quarterly report in google drive", IntentType.SEARCH_DRIVE),
+    ("look for the design doc", IntentType.SEARCH_DRIVE),
+    ("where is the onboarding document", IntentType.SEARCH_DRIVE),
+    ("open the slides from last week", IntentType.SEARCH_DRIVE),
+    ("find my resume file", IntentType.SEARCH_DRIVE),
+    ("remind me to call mom", IntentType.CREATE_TASK),
+    ("add a task to review the pr", IntentType.CREATE_TASK),
+    ("create a task for the launch", IntentType.CREATE_TASK),
+    ("make a note that the wifi password is guest", IntentType.CREATE_TASK),
+    ("take a note", IntentType.CREATE_TASK),
+    ("add buy milk to my to do list", IntentType.CREATE_TASK),
+    ("don't let me forget to pay rent", IntentType.CREATE_TASK),
+    ("what's on my calendar", IntentType.CHECK_CALENDAR),
+    ("do i have any meetings today", IntentType.CHECK_CALENDAR),
+    ("what's my schedule tomorrow", IntentType.CHECK_CALENDAR),
+    ("when is my next meeting", IntentType.CHECK_CALENDAR),
+    ("am i free this afternoon", IntentType.CHECK_CALENDAR),
+    ("check my calendar for this week", IntentType.CHECK_CALENDAR),
+    ("what time is my dentist appointment", IntentType.CHECK_CALENDAR),
+    ("what's the weather like", IntentType.GENERAL_QUERY),
+    ("tell me a joke", IntentType.GENERAL_QUERY),
+    ("what time is it", IntentType.GENERAL_QUERY),
+    ("how far is the moon", IntentType.GENERAL_QUERY),
+    ("who wrote pride and prejudice", IntentType.GENERAL_QUERY),
+    ("explain how vaccines work", IntentType.GENERAL_QUERY),
+    ("what's the capital of australia", IntentType.GENERAL_QUERY),
+    ("how do i make pancakes", IntentType.GENERAL_QUERY),
+]
+
+# High-precision phrasings: (intent, pattern, confidence)
+RULES: list[tuple[IntentType, re.Pattern[str], float]] = [
+    (
+        IntentType.DESCRIBE_SCENE,
+        re.compile(
+            r"^(what do you see|what am i (looking at|seeing)|what'?s in front of me"
+            r"|describe (the scene|what i'?m (looking at|seeing)|what you see))\b"
+        ),
+        0.97,
+    ),
+    (
+        IntentType.CHECK_SLACK,
+        re.compile(
+            r"\b(check|read|open|any)\b.*\bslack\b|\bslack (messages|channel)\b"
+            r"|\b(check|read) (the )?#?[\w-]+ channel\b"
+        ),
+        0.95,
+    ),
+    (
+        IntentType.SEND_EMAIL,
+        re.compile(r"^(please )?(send|write|draft|shoot)( an?)? e-?mail\b|^e-?mail \w+"),
+        0.95,
+    ),
+    (
+        IntentType.SEARCH_DRIVE,
+        re.compile(r"\b(search|find|look)\b.*\b(google )?drive\b"),
+        0.94,
+    ),
+    (
+        IntentType.CREATE_TASK,
+        re.compile(
+            r"^(please )?(remind me to|(add|create|make)( a)? (task|todo|to-do|reminder)"
+            r"|(make|take)( a)? note)\b"
+        ),
+        0.95,
+    ),
+    (
+        IntentType.CHECK_CALENDAR,
+        re.compile(
+            r"\b(check|what'?s on|open)\b.*\b(my )?(calendar|schedule)\b"
+            r"|\b(do i have|any) (any )?(meetings|events|appointments)\b"
+            r"|\bwhen is my next (meeting|event|appointment)\b"
+        ),
+        0.95,
+    ),
+]
+
+# Utterances that rules must not short-circuit (negation, chained requests)
+_DEFER_TO_MODEL = re.compile(r"\b(don'?t|do not|never|cancel|instead|and then|after that)\b")
+
+_CHANNEL = re.compile(r"#([\w-]+)|\b([\w-]+) channel\b|\bchannel ([\w-]+)\b")
+_EMAIL_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_EMAIL_TO = re.compile(r"\be-?mail (?:to )?(?!to\b)([a-z][\w'-]*)|\bto ([a-z][\w'-]*)")
+_EMAIL_SUBJECT = re.compile(r"\b(?:about|regarding|re) (.+?)(?: saying\b|$)")
+_EMAIL_BODY = re.compile(r"\b(?:saying|that says|telling (?:him|her|them)) (.+)$")
+_DRIVE_QUERY = re.compile(
+    r"\b(?:search|find|look for|look up)(?: (?:my|the))?(?: google)?(?: drive)?(?: for)? (.+?)"
+    r"(?: (?:in|on|from) (?:my |the )?(?:google )?drive)?$"
+)
+_TASK_TITLE = re.compile(
+    r"\b(?:remind me to|(?:add|create|make)(?: a)? (?:task|todo|to-do|reminder)(?: to| for)?"
+    r"|(?:make|take)(?: a)? note(?: that| to)?|forget to) (.+)$"
+)
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_STOPWORDS = {"my", "the", "a", "an", "me", "please", "it", "about", "that"}
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, drop punctuation (keeping ' # @ . -) and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s'#@.-]", " ", text.lower()).split()).strip(" .")
+
+
+def calendar_range(text: str, now: Optional[datetime] = None) -> dict[str, str]:
+    """
+    Resolve a spoken time range to ISO 8601 bounds
+
+    Args:
+        text: Normalized utterance
+        now: Reference time (defaults to local now)
+
+    Returns:
+        {"time_min": ..., "time_max": ...} or {} if no range was mentioned
+    """
+    now = now or datetime.now().astimezone()
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    if "tomorrow" in text:
+        start, end = day + timedelta(days=1), day + timedelta(days=2)
+    elif "tonight" in text or "this evening" in text:
+        start, end = day.replace(hour=17), day + timedelta(days=1)
+    elif "this afternoon" in text:
+        start, end = day.replace(hour=12), day.replace(hour=17)
+    elif "this morning" in text:
+        start, end = day, day.replace(hour=12)
+    elif "today" in text:
+        start, end = now, day + timedelta(days=1)
+    elif "next week" in text:
+        start = day + timedelta(days=7 - day.weekday())
+        end = start + timedelta(days=7)
+    elif "this week" in text:
+        start, end = now, day + timedelta(days=7 - day.weekday())
+    else:
+        for index, name in enumerate(_WEEKDAYS):
+            if re.search(rf"\b{name}\b", text):
+                ahead = (index - day.weekday()) % 7 or 7
+                start = day + timedelta(days=ahead)
+                end = start + timedelta(days=1)
+                break
+
+    if start is None or end is None:
+        return {}
+    return {"time_min": start.isoformat(), "time_max": end.isoformat()}
+
+
+def extract_entities(
+    text: str, intent: IntentType, now: Optional[datetime] = None
+) -> dict[str, Any]:
+    """
+    Pull simple action parameters out of a normalized utterance
+
+    Args:
+        text: Normalized utterance
+        intent: Classified intent
+        now: Reference time for relative dates
+
+    Returns:
+        Parameters in the shape the action handlers expect
+    """
+    entities: dict[str, Any] = {}
+
+    if intent is IntentType.CHECK_SLACK:
+        match = _CHANNEL.search(text)
+        if match:
+            channel = next(group for group in match.groups() if group)
+            if channel not in _STOPWORDS and channel != "slack":
+                entities["channel"] = channel.lstrip("#")
+
+    elif intent is IntentType.SEND_EMAIL:
+        address = _EMAIL_ADDRESS.search(text)
+        if address:
+            entities["to"] = address.group(0)
+        else:
+            match = _EMAIL_TO.search(text)
+            if match:
+                name = next(group for group in match.groups() if group)
+                if name not in _STOPWORDS:
+                    entities["to"] = name
+        subject = _EMAIL_SUBJECT.search(text)
+        if subject:
+            entities["subject"] = subject.group(1)
+        body = _EMAIL_BODY.search(text)
+        if body:
+            entities["body"] = body.group(1)
+
+    elif intent is IntentType.SEARCH_DRIVE:
+        match = _DRIVE_QUERY.search(text)
+        if match and match.group(1) not in _STOPWORDS:
+            entities["query"] = match.group(1)
+
+    elif intent is IntentType.CREATE_TASK:
+        match = _TASK_TITLE.search(text)
+        if match:
+            entities["title"] = match.group(1)
+
+    elif intent is IntentType.CHECK_CALENDAR:
+        entities.update(calendar_range(text, now))
+
+    return entities
+
+
+class NgramIntentModel:
+    """
+    Hashed character n-gram TF-IDF features with a softmax linear classifier
+
+    Features are word-bounded character n-grams hashed into a fixed number of
+    buckets, so there is no vocabulary to store and unseen words still share
+    sub-word features with training data. Training is full-batch gradient
+    descent in NumPy, which takes milliseconds for a few thousand utterances.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 4096,
+        ngram_range: tuple[int, int] = (2, 4),
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4,
+    ) -> None:
+        """
+        Args:
+            n_features: Number of hash buckets
+            ngram_range: Minimum and maximum n-gram length
+            epochs: Gradient descent iterations
+            learning_rate: Step size
+            l2: Weight decay
+        """
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.labels: list[IntentType] = []
+        self.idf: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        """True once fit() has run"""
+        return self.weights is not None
+
+    def _buckets(self, text: str) -> dict[int, float]:
+        counts: dict[int, float] = {}
+        low, high = self.ngram_range
+        for word in text.split():
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    bucket = zlib.crc32(padded[i:i + n].encode()) % self.n_features
+                    counts[bucket] = counts.get(bucket, 0.0) + 1.0
+        return counts
+
+    def _vectorize(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, count in self._buckets(text).items():
+                matrix[row, bucket] = 1.0 + math.log(count)
+        return matrix
+
+    def _weight(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = matrix * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def fit(self, texts: list[str], labels: list[IntentType]) -> None:
+        """
+        Train on normalized utterances
+
+        Args:
+            texts: Normalized utterances
+            labels: Intent for each utterance
+        """
+        self.labels = sorted(set(labels), key=lambda intent: intent.value)
+        index = {intent: i for i, intent in enumerate(self.labels)}
+        y = np.array([index[label] for label in labels])
+
+        tf = self._vectorize(texts)
+        df = np.count_nonzero(tf, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1.0).astype(np.float32)
+        x = self._weight(tf)
+
+        n, k = len(texts), len(self.labels)
+        onehot = np.zeros((n, k), dtype=np.float32)
+        onehot[np.arange(n), y] = 1.0
+        weights = np.zeros((self.n_features, k), dtype=np.float32)
+        bias = np.zeros(k, dtype=np.float32)
+        for _ in range(self.epochs):
+            logits = x @ weights + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            grad = (probs - onehot) / n
+            weights -= self.learning_rate * (x.T @ grad + self.l2 * weights)
+            bias -= self.learning_rate * grad.sum(axis=0)
+        self.weights, self.bias = weights, bias
+
+    def predict(self, text: str) -> tuple[IntentType, float]:
+        """
+        Classify one normalized utterance
+
+        Returns:
+            (most likely intent, its probability)
+        """
+        if self.weights is None or self.idf is None or self.bias is None:
+            return IntentType.UNKNOWN, 0.0
+        # Sparse dot product: only touch the buckets present in the utterance
+        buckets = self._buckets(text)
+        if not buckets:
+            return IntentType.UNKNOWN, 0.0
+        columns = np.fromiter(buckets.keys(), dtype=np.int64, count=len(buckets))
+        term_frequencies = (1.0 + math.log(count) for count in buckets.values())
+        values = np.fromiter(term_frequencies, dtype=np.float32, count=len(buckets))
+        values *= self.idf[columns]
+        values /= max(float(np.linalg.norm(values)), 1e-12)
+        logits = values @ self.weights[columns] + self.bias
+        logits -= logits.max()
+        probs = np.exp(logits)
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+
+@dataclass
+class ReplayReport:
+    """Fast-path quality on a replay set, measured against the LLM's labels"""
+
+    samples: int = 0
+    hits: int = 0  # Utterances the fast path answered
+    correct: int = 0  # Fast-path answers that matched the LLM
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of utterances that skipped the LLM"""
+        return self.hits / self.samples if self.samples else 0.0
+
+    @property
+    def accuracy(self) -> float:
+        """Agreement with the LLM on the utterances the fast path answered"""
+        return self.correct / self.hits if self.hits else 0.0
+
+    def to_dict(self) -> dict[str, int | float]:
+        """Serialize for logging / metrics"""
+        return {
+            "samples": self.samples,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "accuracy": round(self.accuracy, 3),
+        }
+
+
+class LocalIntentClassifier:
+    """
+    Rules + n-gram model in front of the LLM intent classifier
+
+    Utterances the LLM labels are appended to a JSONL log. On start-up the
+    log is split deterministically into training and held-out replay sets;
+    the model trains on the seeds plus the training split and is scored on
+    the replay split, so the reported accuracy is on utterances it never saw.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        log_path: Optional[str] = None,
+        holdout_ratio: float = 0.2,
+        retrain_every: int = 50,
+    ) -> None:
+        """
+        Args:
+            threshold: Minimum confidence for answering without the LLM
+            log_path: JSONL file of LLM-labelled utterances (None disables logging)
+            holdout_ratio: Share of logged utterances held out for replay scoring
+            retrain_every: Retrain after this many new labelled utterances (0 disables)
+        """
+        self.threshold = threshold
+        self.log_path = Path(log_path) if log_path else None
+        self.holdout_ratio = holdout_ratio
+        self.retrain_every = retrain_every
+        self.model = NgramIntentModel()
+        self.metrics = get_metrics()
+        self.report = ReplayReport()
+
+        self._lock = threading.Lock()
+        self._train: list[tuple[str, IntentType]] = []
+        self._holdout: list[tuple[str, IntentType]] = []
+        self._pending = 0
+        # Log lines waiting for the writer thread
+        self._unwritten: list[str] = []
+        self._writing = False
+
+        self._load_log()
+        self.retrain()
+
+    def _is_holdout(self, text: str) -> bool:
+        # Stable across restarts, so the replay set never leaks into training
+        return zlib.crc32(text.encode()) % 1000 < self.holdout_ratio * 1000
+
+    def _add(self, text: str, intent: IntentType) -> None:
+        (self._holdout if self._is_holdout(text) else self._train).append((text, intent))
+
+    def _load_log(self) -> None:
+        if self.log_path is None or not self.log_path.exists():
+            return
+        try:
+            with self.log_path.open(encoding="utf-8") as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                        self._add(entry["text"], IntentType(entry["intent"]))
+                    except (ValueError, KeyError):
+                        continue
+        except OSError as e:
+            print(f"⚠️  Could not read intent log {self.log_path}: {e}")
+
+    def retrain(self) -> ReplayReport:
+        """Fit the model on seeds + logged utterances and re-score the replay set"""
+        with self._lock:
+            samples = [(normalize_utterance(t), i) for t, i in SEED_EXAMPLES] + list(self._train)
+            holdout = list(self._holdout)
+            self._pending = 0
+
+        started = time.monotonic()
+        model = NgramIntentModel()
+        model.fit([text for text, _ in samples], [intent for _, intent in samples])
+        self.model = model
+        self.metrics.observe("intent.local.train", (time.monotonic() - started) * 1000)
+
+        self.report = self.evaluate(holdout)
+        if self.report.samples:
+            self.metrics.set_gauge("intent.local.replay_hit_rate", self.report.hit_rate)
+            self.metrics.set_gauge("intent.local.replay_accuracy", self.report.accuracy)
+            print(f"🧭 Local intent classifier replay: {self.report.to_dict()}")
+        return self.report
+
+    def predict(self, text: str) -> tuple[IntentType, float, str]:
+        """
+        Best local guess, regardless of the threshold
+
+        Returns:
+            (intent, confidence, tier) where tier is "rules" or "model"
+        """
+        normalized = normalize_utterance(text)
+        if not _DEFER_TO_MODEL.search(normalized):
+            for intent, pattern, confidence in RULES:
+                if pattern.search(normalized):
+                    return intent, confidence, "rules"
+        intent, confidence = self.model.predict(normalized)
+        return intent, confidence, "model"
+
+    def classify(self, text: str) -> Optional[dict[str, Any]]:
+        """
+        Classify without the LLM if confident enough
+
+        Args:
+            text: Command text
+
+        Returns:
+            Result shaped like VisionService.classify_intent, or None to fall back
+        """
+        started = time.monotonic()
+        intent, confidence, tier = self.predict(text)
+        self.metrics.observe("intent.local", (time.monotonic() - started) * 1000)
+
+        if confidence < self.threshold or intent is IntentType.UNKNOWN:
+            self.metrics.incr("intent.local.miss")
+            return None
+
+        self.metrics.incr(f"intent.local.{tier}")
+        return {
+            "intent": intent.name,
+            "confidence": round(confidence, 3),
+            "entities": extract_entities(normalize_utterance(text), intent),
+            "source": f"local_{tier}",
+        }
+
+    def record(self, text: str, result: dict[str, Any]) -> None:
+        """
+        Log an LLM classification as training data
+
+        Args:
+            text: Command text
+            result: LLM classification result
+        """
+        try:
+            intent = IntentType[str(result.get("intent", "")).upper()]
+        except KeyError:
+            return
+        if intent is IntentType.UNKNOWN:
+            return
+
+        normalized = normalize_utterance(text)
+        with self._lock:
+            self._add(normalized, intent)
+            self._pending += 1
+            due = self.retrain_every and self._pending >= self.retrain_every
+
+        if self.log_path is not None:
+            line = json.dumps({"text": normalized, "intent": intent.value}) + "\n"
+            with self._lock:
+                self._unwritten.append(line)
+                start = not self._writing
+                self._writing = True
+            if start:
+                try:
+                    # File I/O in a worker thread, never on the event loop
+                    asyncio.get_running_loop().run_in_executor(None, self._write_log)
+                except RuntimeError:
+                    self._write_log()
+
+        if due:
+            # Off the event loop; the new model is swapped in when it is ready
+            threading.Thread(target=self.retrain, name="intent-retrain", daemon=True).start()
+
+    def _write_log(self) -> None:
+        # Drain the buffer; a single writer at a time keeps the lines in order
+        while True:
+            with self._lock:
+                lines, self._unwritten = self._unwritten, []
+                if not lines:
+                    self._writing = False
+                    return
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.log_path.open("a", encoding="utf-8") as log:
+                    log.write("".join(lines))
+            except OSError as e:
+                print(f"⚠️  Could not write intent log {self.log_path}: {e}")
+
+    def evaluate(self, samples: Iterable[tuple[str, IntentType]]) -> ReplayReport:
+        """
+        Score the fast path against LLM labels
+
+        Args:
+            samples: (utterance, LLM intent) pairs
+
+        Returns:
+            Hit rate and accuracy on the hits
+        """
+        report = ReplayReport()
+        for text, expected in samples:
+            report.samples += 1
+            intent, confidence, _ = self.predict(text)
+            if confidence >= self.threshold and intent is not IntentType.UNKNOWN:
+                report.hits += 1
+                report.correct += intent is expected
+        return report
+
+
+if __name__ == "__main__":
+    # Replay a labelled log: python -m app.services.intent_classifier intents.jsonl
+    import sys
+
+    replay: list[tuple[str, IntentType]] = []
+    with open(sys.argv[1], encoding="utf-8") as replay_file:
+        for line in replay_file:
+            entry = json.loads(line)
+            replay.append((normalize_utterance(entry["text"]), IntentType(entry["intent"])))
+    classifier = LocalIntentClassifier(threshold=float(sys.argv[2]) if len(sys.argv) > 2 else 0.85)
+    print(json.dumps(classifier.evaluate(replay).to_dict(), indent=2))
@@ -0,0 +1,285 @@
+"""
+Latency-aware model routing with hedged requests
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+from app.core.metrics import get_metrics
+
+T = TypeVar("T")
+
+
+@dataclass
+class RouteStats:
+    """EWMA latency and error rate of one (call type, model) route"""
+
+    ewma_ms: Optional[float] = None
+    error_rate: float = 0.0
+    calls: int = 0
+    last_error_at: float = 0.0
+
+    def record(self, latency_ms: Optional[float], alpha: float) -> None:
+        """Fold in one attempt (latency None for a failure)"""
+        self.calls += 1
+        failed = latency_ms is None
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (1.0 if failed else 0.0)
+        if failed:
+            self.last_error_at = time.monotonic()
+            return
+        if self.ewma_ms is None:
+            self.ewma_ms = latency_ms
+        else:
+            self.ewma_ms = (1 - alpha) * self.ewma_ms + alpha * latency_ms
+
+
+class ModelRouter:
+    """
+    Picks a model per call type and hedges slow requests
+
+    Each call type maps to an ordered list of models (preferred tier first).
+    The first model whose EWMA error rate is acceptable serves the request,
+    unless the next healthy tier is currently much faster by EWMA latency. A
+    model skipped for errors gets another try once its cooldown has passed.
+    If it hasn't answered by the route's p95 latency (or fails first), a
+    hedged request goes to the next model in the list and whichever answers
+    first wins; the other is cancelled. A call type with a single model is only
+    hedged (to that same model) when it opts in, since a duplicate of a slow
+    request rarely answers sooner and doubles the cost.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[dict[str, list[str]]] = None,
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        hedge_default_deadline_ms: float = 3000.0,
+        hedge_min_deadline_ms: float = 250.0,
+        hedge_deadlines_ms: Optional[dict[str, float]] = None,
+        hedge_same_model: Optional[list[str]] = None,
+        max_error_rate: float = 0.5,
+        error_cooldown: float = 30.0,
+        latency_switch_factor: float = 2.0,
+        ewma_alpha: float = 0.2,
+    ) -> None:
+        """
+        Args:
+            routes: Call type -> candidate models, preferred first
+            hedge: Send a hedged request when the first is slow
+            hedge_percentile: Latency percentile used as the hedge deadline
+            hedge_min_samples: Samples needed before the percentile is trusted
+            hedge_default_deadline_ms: Deadline until then
+            hedge_min_deadline_ms: Lower bound on the deadline
+            hedge_deadlines_ms: Call type -> deadline until then, overriding the default
+                (vision calls are routinely slower than text)
+            hedge_same_model: Call types hedged to the same model when it is their only one
+            max_error_rate: EWMA error rate above which a model is skipped
+            error_cooldown: Seconds after its last error before a skipped model is retried
+            latency_switch_factor: Prefer the next tier when the preferred one's EWMA
+                latency is this many times slower
+            ewma_alpha: EWMA smoothing factor
+        """
+        self.routes = routes or {}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_deadline = hedge_default_deadline_ms
+        self.hedge_min_deadline = hedge_min_deadline_ms
+        self.hedge_deadlines = hedge_deadlines_ms or {}
+        self.hedge_same_model = set(hedge_same_model or [])
+        self.max_error_rate = max_error_rate
+        self.error_cooldown = error_cooldown
+        self.latency_switch_factor = latency_switch_factor
+        self.ewma_alpha = ewma_alpha
+        self.metrics = get_metrics()
+        self.stats: dict[tuple[str, str], RouteStats] = {}
+
+    def candidates(self, call_type: str, default_model: str) -> list[str]:
+        """
+        Models to try for a call type, healthiest preferred tier first
+
+        Args:
+            call_type: Logical call name
+            default_model: Model used when no route is configured
+
+        Returns:
+            Ordered candidate models (never empty)
+        """
+        models = self.routes.get(call_type) or [default_model]
+        healthy = [m for m in models if self._healthy(self._stats(call_type, m))]
+        unhealthy = [m for m in models if m not in healthy]
+
+        if len(healthy) > 1:
+            preferred = self._stats(call_type, healthy[0]).ewma_ms
+            alternative = self._stats(call_type, healthy[1]).ewma_ms
+            if preferred and alternative and alternative * self.latency_switch_factor < preferred:
+                healthy[0], healthy[1] = healthy[1], healthy[0]
+        return healthy + unhealthy
+
+    def _healthy(self, stats: RouteStats) -> bool:
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        return time.monotonic() - stats.last_error_at >= self.error_cooldown
+
+    def deadline_ms(self, call_type: str, model: str) -> float:
+        """Hedge deadline for a route: its recent p95, once there is enough data"""
+        stat = self.metrics.latencies.get(self._metric(call_type, model))
+        if stat is None or len(stat.recent) < self.hedge_min_samples:
+            return self.hedge_deadlines.get(call_type, self.hedge_default_deadline)
+        return max(stat.percentile(self.hedge_percentile), self.hedge_min_deadline)
+
+    async def call(
+        self,
+        call_type: str,
+        default_model: str,
+        request: Callable[[str], Awaitable[T]],
+    ) -> T:
+        """
+        Run a request on the routed model, hedging if it is slow
+
+        Args:
+            call_type: Logical call name
+            default_model: Model used when no route is configured
+            request: Coroutine function taking the model name
+
+        Returns:
+            Result of the first attempt to succeed
+        """
+        models = self.candidates(call_type, default_model)
+        primary = models[0]
+        backup = models[1] if len(models) > 1 else primary
+
+        first = asyncio.create_task(self._attempt(call_type, primary, request))
+        if not self.hedge or (len(models) == 1 and call_type not in self.hedge_same_model):
+            return await first
+
+        attempts = {first}
+        try:
+            done, _ = await asyncio.wait(
+                attempts, timeout=self.deadline_ms(call_type, primary) / 1000
+            )
+            if first in done and first.exception() is None:
+                return first.result()
+
+            # Slow or failed: fire the hedge and take whichever succeeds first
+            self.metrics.incr(f"llm.route.{call_type}.hedged")
+            attempts.add(asyncio.create_task(self._attempt(call_type, backup, request)))
+            error: Optional[BaseException] = None
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.metrics.incr(f"llm.route.{call_type}.hedge_won")
+                        return task.result()
+                    error = task.exception()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    async def stream(
+        self,
+        call_type: str,
+        default_model: str,
+        request: Callable[[str], Awaitable[Any]],
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Stream a request from the routed model, hedging on time to first chunk
+
+        The route's latency is the time to the first chunk, so streaming call
+        types should have their own names. An error after the first chunk still
+        counts against the model. Every opened stream is closed: hedges that
+        lost, and the winner when the caller stops iterating.
+
+        Args:
+            call_type: Logical call name
+            default_model: Model used when no route is configured
+            request: Coroutine function taking the model name and returning an
+                async-iterable stream with an async close() (e.g. an OpenAI AsyncStream)
+
+        Yields:
+            (model that answered, chunk)
+        """
+        opened: list[Any] = []
+
+        async def first_chunk(model: str) -> tuple[str, Any, Any]:
+            stream = await request(model)
+            opened.append(stream)
+            try:
+                return model, stream, await anext(stream, None)
+            except BaseException:
+                # Unless the caller already closed it after picking a winner
+                if stream in opened:
+                    opened.remove(stream)
+                    await stream.close()
+                raise
+
+        async def close_all(streams: list[Any]) -> None:
+            opened.clear()
+            for other in streams:
+                await other.close()
+
+        try:
+            model, stream, chunk = await self.call(call_type, default_model, first_chunk)
+        except BaseException:
+            await close_all(list(opened))
+            raise
+        # A cancelled hedge may still be waiting on its first chunk: keep only the winner
+        await close_all([other for other in opened if other is not stream])
+
+        async with stream:
+            if chunk is None:
+                return
+            yield model, chunk
+            try:
+                async for chunk in stream:
+                    yield model, chunk
+            except Exception:
+                self._failed(call_type, model)
+                raise
+
+    async def _attempt(
+        self, call_type: str, model: str, request: Callable[[str], Awaitable[T]]
+    ) -> T:
+        started = time.monotonic()
+        stats = self._stats(call_type, model)
+        try:
+            result = await request(model)
+        except asyncio.CancelledError:
+            # A losing hedge says nothing about the model's health
+            raise
+        except Exception:
+            self._failed(call_type, model)
+            raise
+        latency_ms = (time.monotonic() - started) * 1000
+        stats.record(latency_ms, self.ewma_alpha)
+        self.metrics.observe_histogram(self._metric(call_type, model), latency_ms)
+        self._publish(call_type, model, stats)
+        return result
+
+    def _failed(self, call_type: str, model: str) -> None:
+        stats = self._stats(call_type, model)
+        stats.record(None, self.ewma_alpha)
+        self.metrics.incr(f"{self._metric(call_type, model)}.errors")
+        self._publish(call_type, model, stats)
+
+    def _stats(self, call_type: str, model: str) -> RouteStats:
+        key = (call_type, model)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = RouteStats()
+        return stats
+
+    @staticmethod
+    def _metric(call_type: str, model: str) -> str:
+        return f"llm.route.{call_type}.{model}"
+
+    def _publish(self, call_type: str, model: str, stats: RouteStats) -> None:
+        name = self._metric(call_type, model)
+        if stats.ewma_ms is not None:
+            self.metrics.set_gauge(f"{name}.ewma_ms", round(stats.ewma_ms, 1))
+        self.metrics.set_gauge(f"{name}.error_rate", round(stats.error_rate, 3))
@@ -0,0 +1,218 @@
+"""
+Exact-match LLM response cache with single-flight request coalescing
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Protocol
+from app.core.metrics import get_metrics
+
+
+class CacheBackend(Protocol):
+    """Storage for cached responses"""
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value or None"""
+        ...
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """Store a value for ttl seconds"""
+        ...
+
+    async def close(self) -> None:
+        """Release connections"""
+        ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by every worker process"""
+
+    def __init__(self, url: str, password: str = "", prefix: str = "dadde:llm:") -> None:
+        """
+        Args:
+            url: Redis URL
+            password: Redis password (empty for none)
+            prefix: Key namespace
+        """
+        try:
+            # Lazy import: redis ships with the optional database extras
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise ImportError(
+                f"Redis not available: {e}. Install the database extras to use the Redis cache."
+            ) from e
+        self.client = redis_asyncio.from_url(url, password=password or None, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self.client.get(self.prefix + key)
+        except Exception as e:
+            print(f"⚠️  Redis cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        try:
+            await self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+        except Exception as e:
+            print(f"⚠️  Redis cache write failed: {e}")
+
+    async def close(self) -> None:
+        try:
+            await self.client.aclose()
+        except Exception as e:
+            print(f"Error closing Redis client: {e}")
+
+
+def request_key(call_type: str, params: dict[str, Any]) -> str:
+    """
+    Canonical hash of an upstream request
+
+    Args:
+        call_type: Logical call name (e.g. "classify_intent")
+        params: Keyword arguments of the API call (model, messages, ...)
+
+    Returns:
+        Hex digest that is equal for equal requests regardless of key order
+    """
+    canonical = json.dumps(
+        {"call": call_type, "params": params}, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Caches LLM responses by request and coalesces identical in-flight requests
+
+    Every caller of an identical request shares one upstream call
+    (single-flight), so a retrying device or a duplicated final transcript
+    costs one API request. The upstream call runs in its own task: a caller
+    that is cancelled (e.g. a superseded speculative classification) doesn't
+    cancel it for the others.
+
+    Results are only stored for deterministic requests (temperature 0) or for
+    call types explicitly opted in to caching sampled output.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttls: Optional[dict[str, float]] = None,
+        default_ttl: float = 300.0,
+        sampled_calls: Optional[set[str]] = None,
+    ) -> None:
+        """
+        Args:
+            backend: Where responses are stored
+            ttls: Seconds to keep responses, per call type
+            default_ttl: TTL for call types missing from ttls
+            sampled_calls: Call types cached even at a non-zero temperature
+        """
+        self.backend = backend
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.sampled_calls = sampled_calls or set()
+        self.metrics = get_metrics()
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+
+    def cacheable(self, call_type: str, params: dict[str, Any]) -> bool:
+        """True if a response to this request may be stored"""
+        if self.ttls.get(call_type, self.default_ttl) <= 0:
+            return False
+        # The API samples at temperature 1 when none is given
+        return params.get("temperature", 1.0) == 0 or call_type in self.sampled_calls
+
+    async def get_or_create(
+        self,
+        call_type: str,
+        params: dict[str, Any],
+        create: Callable[[], Awaitable[str]],
+    ) -> tuple[str, bool]:
+        """
+        Return a cached response or make (or join) the upstream call
+
+        Args:
+            call_type: Logical call name, used for the TTL and metrics
+            params: Keyword arguments of the API call
+            create: Coroutine function that makes the upstream call
+
+        Returns:
+            (response, True if this caller's request produced it upstream)
+        """
+        key = request_key(call_type, params)
+        cacheable = self.cacheable(call_type, params)
+
+        if cacheable:
+            cached = await self.backend.get(key)
+            if cached is not None:
+                self.metrics.incr(f"llm_cache.{call_type}.hit")
+                return cached, False
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics.incr(f"llm_cache.{call_type}.coalesced")
+            return await asyncio.shield(task), False
+
+        self.metrics.incr(f"llm_cache.{call_type}.miss")
+        task = asyncio.create_task(self._fetch(call_type, key, create, cacheable))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), True
+
+    def _finished(self, key: str, task: asyncio.Task[str]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the error retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(
+        self,
+        call_type: str,
+        key: str,
+        create: Callable[[], Awaitable[str]],
+        cacheable: bool,
+    ) -> str:
+        value = await create()
+        if cacheable and value:
+            await self.backend.set(key, value, self.ttls.get(call_type, self.default_ttl))
+        return value
+
+    async def close(self) -> None:
+        """Close the backend"""
+        await self.backend.close()
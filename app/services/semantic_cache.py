@@ -0,0 +1,327 @@
+"""
+Semantic intent cache backed by embedding nearest-neighbour search
+"""
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+from openai import AsyncOpenAI
+from app.core.metrics import get_metrics
+from app.models.schemas import IntentType
+from app.services.intent_classifier import extract_entities, normalize_utterance
+
+
+class SemanticIntentCache:
+    """
+    Reuses LLM intent classifications for commands that mean the same thing
+
+    Normalized utterances are embedded and kept as unit vectors in one NumPy
+    matrix, so a lookup is a single matrix-vector product and an argmax. A hit
+    above the similarity threshold returns the cached intent; entities are only
+    reused verbatim for an exact normalized match and are otherwise re-extracted
+    from the new wording ("email Bob" must not inherit "email Alice").
+
+    Embedding requests issued within a short window are coalesced into one
+    batched API call. Entries expire after a TTL, the least recently used one is
+    evicted when the index is full, and the index is persisted to disk together
+    with the embedding model and size it was built with.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        dimensions: Optional[int] = 256,
+        threshold: float = 0.92,
+        capacity: int = 10000,
+        ttl: float = 7 * 24 * 3600,
+        path: Optional[str] = None,
+        batch_window_ms: float = 5.0,
+        max_batch: int = 64,
+    ) -> None:
+        """
+        Args:
+            client: Shared OpenAI client
+            model: Embedding model
+            dimensions: Embedding size to request (None for the model default)
+            threshold: Minimum cosine similarity for a hit
+            capacity: Maximum cached utterances
+            ttl: Seconds before an entry expires
+            path: .npz file the index is loaded from and saved to (None disables)
+            batch_window_ms: How long to wait for more texts before embedding
+            max_batch: Maximum texts per embedding request
+        """
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.metrics = get_metrics()
+
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim) unit vectors
+        self._keys: list[str] = []
+        self._results: list[dict[str, Any]] = []
+        self._created = np.zeros(capacity, dtype=np.float64)  # Wall clock, survives restarts
+        self._used = np.zeros(capacity, dtype=np.float64)
+        self._index: dict[str, int] = {}
+        self._dirty = False
+
+        self._pending: list[tuple[str, asyncio.Future[np.ndarray]]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def lookup(self, text: str) -> tuple[Optional[dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Find a cached classification for a command
+
+        Args:
+            text: Command text
+
+        Returns:
+            (cached result or None, the command's embedding for a later store())
+        """
+        started = time.monotonic()
+        key = normalize_utterance(text)
+        now = time.time()
+
+        slot = self._index.get(key)
+        if slot is not None and now - self._created[slot] < self.ttl:
+            self._used[slot] = now
+            self.metrics.incr("intent.semantic.exact_hit")
+            return dict(self._results[slot]), None
+
+        try:
+            vector = await self._embed(key)
+        except Exception as e:
+            print(f"⚠️  Could not embed command for the intent cache: {e}")
+            return None, None
+
+        result = None
+        if self._keys and self._vectors.shape[1] == vector.shape[0]:
+            n = len(self._keys)
+            scores = self._vectors[:n] @ vector
+            scores[now - self._created[:n] >= self.ttl] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self._used[best] = now
+                result = dict(self._results[best])
+                intent = IntentType.__members__.get(result["intent"])
+                result["entities"] = extract_entities(key, intent) if intent else {}
+                result["similarity"] = round(float(scores[best]), 3)
+
+        self.metrics.observe("intent.semantic.lookup", (time.monotonic() - started) * 1000)
+        self.metrics.incr("intent.semantic.hit" if result else "intent.semantic.miss")
+        return result, vector
+
+    def store(self, text: str, result: dict[str, Any], vector: Optional[np.ndarray]) -> None:
+        """
+        Cache an LLM classification
+
+        Args:
+            text: Command text
+            result: Classification result
+            vector: Embedding returned by lookup() (nothing is stored without one)
+        """
+        if vector is None or str(result.get("intent", "")).upper() == "UNKNOWN":
+            return
+        key = normalize_utterance(text)
+        now = time.time()
+        entry = {
+            "intent": str(result.get("intent", "")).upper(),
+            "confidence": result.get("confidence", 0.0),
+            "entities": result.get("entities") or {},
+        }
+
+        if self._vectors is not None and self._vectors.shape[1] != vector.shape[0]:
+            # The embedding size changed under us: vectors of both sizes can't be compared
+            print("⚠️  Embedding size changed, clearing the intent cache")
+            self._clear()
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+        slot = self._index.get(key)
+        if slot is None:
+            if len(self._keys) < self.capacity:
+                slot = len(self._keys)
+                self._keys.append(key)
+                self._results.append(entry)
+            else:
+                slot = self._evict(now)
+                del self._index[self._keys[slot]]
+                self._keys[slot] = key
+                self._results[slot] = entry
+            self._index[key] = slot
+        else:
+            self._results[slot] = entry
+
+        self._vectors[slot] = vector
+        self._created[slot] = now
+        self._used[slot] = now
+        self._dirty = True
+        self.metrics.set_gauge("intent.semantic.size", len(self._keys))
+
+    def _clear(self) -> None:
+        self._vectors = None
+        self._keys = []
+        self._results = []
+        self._index = {}
+        self._created[:] = 0
+        self._used[:] = 0
+        self._dirty = True
+
+    def _evict(self, now: float) -> int:
+        """Slot to overwrite: an expired entry if any, else the least recently used"""
+        n = len(self._keys)
+        expired = np.flatnonzero(now - self._created[:n] >= self.ttl)
+        self.metrics.incr("intent.semantic.evicted")
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self._used[:n]))
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Queue a text for the next batched embedding request"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[np.ndarray] = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self.batch_window)
+        return await future
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        task = asyncio.ensure_future(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._schedule_flush(0)
+        if not batch:
+            return
+
+        started = time.monotonic()
+        try:
+            kwargs: dict[str, Any] = {"model": self.model, "input": [text for text, _ in batch]}
+            if self.dimensions:
+                kwargs["dimensions"] = self.dimensions
+            response = await self.client.embeddings.create(**kwargs)
+            vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.metrics.observe("intent.semantic.embed", (time.monotonic() - started) * 1000)
+        self.metrics.incr("intent.semantic.embed_requests")
+        self.metrics.incr("intent.semantic.embedded", len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def load(self) -> None:
+        """
+        Restore the index saved by save(), dropping expired entries
+
+        An index built with a different embedding model or size is discarded:
+        its vectors aren't comparable with new embeddings.
+        """
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                vectors = data["vectors"]
+                created = data["created"]
+                used = data["used"]
+                meta = json.loads(str(data["meta"]))
+        except Exception as e:
+            print(f"⚠️  Could not load intent cache {self.path}: {e}")
+            return
+
+        if meta.get("model") != self.model or meta.get("dimensions") != self.dimensions:
+            print(f"⚠️  Discarding intent cache {self.path}: built with another embedding")
+            return
+
+        now = time.time()
+        # Most recently used first, so a smaller capacity keeps the hottest entries
+        order = [i for i in np.argsort(-used) if now - created[i] < self.ttl][:self.capacity]
+        if not order:
+            return
+        self._vectors = np.zeros((self.capacity, vectors.shape[1]), dtype=np.float32)
+        for slot, i in enumerate(order):
+            self._vectors[slot] = vectors[i]
+            self._created[slot] = created[i]
+            self._used[slot] = used[i]
+            self._keys.append(meta["keys"][i])
+            self._results.append(meta["results"][i])
+            self._index[meta["keys"][i]] = slot
+        self.metrics.set_gauge("intent.semantic.size", len(self._keys))
+        print(f"🧠 Loaded {len(self._keys)} cached intents from {self.path}")
+
+    def save(self) -> None:
+        """Write the index to disk if it changed"""
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            self._write(snapshot)
+
+    async def autosave(self, interval: float) -> None:
+        """
+        Save the index every `interval` seconds, until cancelled
+
+        The arrays are copied on the event loop and written in a worker thread,
+        so a crash loses at most one interval of learned intents.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            snapshot = self._snapshot()
+            if snapshot is not None:
+                await asyncio.to_thread(self._write, snapshot)
+
+    def _snapshot(self) -> Optional[dict[str, np.ndarray]]:
+        """Copy of the index to write, or None if nothing changed"""
+        if self.path is None or not self._dirty or self._vectors is None:
+            return None
+        n = len(self._keys)
+        meta = {
+            "model": self.model,
+            "dimensions": self.dimensions,
+            "keys": self._keys,
+            "results": self._results,
+        }
+        self._dirty = False
+        return {
+            "vectors": self._vectors[:n].copy(),
+            "created": self._created[:n].copy(),
+            "used": self._used[:n].copy(),
+            "meta": np.array(json.dumps(meta)),
+        }
+
+    def _write(self, snapshot: dict[str, np.ndarray]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp.npz")
+            np.savez(tmp, **snapshot)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            self._dirty = True
+            print(f"⚠️  Could not save intent cache {self.path}: {e}")
@@ -0,0 +1,253 @@
+"""
+Dependency-aware execution of multi-step task plans
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from app.core.metrics import get_metrics
+
+# "${step_id.path.to.value}" inside a parameter refers to an earlier step's output
+REFERENCE = re.compile(r"\$\{([A-Za-z0-9_-]+)((?:\.[A-Za-z0-9_-]+)*)\}")
+
+
+@dataclass
+class TaskStep:
+    """One subtask of a plan"""
+
+    id: str
+    action: str
+    description: str = ""
+    parameters: dict[str, Any] = field(default_factory=dict)
+    depends_on: list[str] = field(default_factory=list)
+
+
+def references(value: Any) -> set[str]:
+    """Step IDs referenced anywhere inside a parameter value"""
+    if isinstance(value, str):
+        return {match.group(1) for match in REFERENCE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(references(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(references(v) for v in value))
+    return set()
+
+
+def parse_plan(subtasks: list[dict[str, Any]]) -> list[TaskStep]:
+    """
+    Build steps from planner output
+
+    Dependencies are the union of each step's "depends_on" and the steps its
+    parameters reference. Steps without an "id" are numbered "step1", "step2", ...
+
+    Args:
+        subtasks: Planner subtasks (action, description, parameters, id, depends_on)
+
+    Returns:
+        Steps, in planner order
+
+    Raises:
+        ValueError: On duplicate IDs, unknown dependencies or a cycle
+    """
+    steps: list[TaskStep] = []
+    for index, subtask in enumerate(subtasks, 1):
+        parameters = subtask.get("parameters") or {}
+        step = TaskStep(
+            id=str(subtask.get("id") or f"step{index}"),
+            action=str(subtask.get("action", "")),
+            description=str(subtask.get("description", "")),
+            parameters=parameters,
+        )
+        declared = [str(d) for d in subtask.get("depends_on") or []]
+        step.depends_on = sorted(set(declared) | references(parameters))
+        steps.append(step)
+
+    by_id = {step.id: step for step in steps}
+    if len(by_id) != len(steps):
+        raise ValueError("Duplicate step IDs in plan")
+    for step in steps:
+        unknown = [d for d in step.depends_on if d not in by_id]
+        if unknown:
+            raise ValueError(f"Step {step.id} depends on unknown steps: {', '.join(unknown)}")
+
+    # Kahn's algorithm: peel off steps with no pending dependencies until none are left
+    remaining = {step.id: set(step.depends_on) for step in steps}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return steps
+
+
+def resolve_references(value: Any, outputs: dict[str, dict[str, Any]]) -> Any:
+    """
+    Substitute step outputs into a parameter value
+
+    A string that is exactly one reference takes the referenced value as is
+    (a list stays a list); references inside longer strings are formatted in.
+    Path segments index dicts by key and lists by position.
+
+    Raises:
+        ValueError: If a referenced value doesn't exist
+    """
+    if isinstance(value, dict):
+        return {k: resolve_references(v, outputs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, outputs) for v in value]
+    if not isinstance(value, str):
+        return value
+
+    def lookup(match: re.Match[str]) -> Any:
+        try:
+            current: Any = outputs[match.group(1)]
+            for segment in match.group(2).split(".")[1:]:
+                current = current[int(segment)] if isinstance(current, list) else current[segment]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f"Reference {match.group(0)} not found in earlier results") from None
+        return current
+
+    whole = REFERENCE.fullmatch(value)
+    if whole:
+        return lookup(whole)
+    return REFERENCE.sub(lambda match: str(lookup(match)), value)
+
+
+class TaskGraphExecutor:
+    """
+    Runs plan steps as soon as their dependencies finish
+
+    Independent steps run concurrently (up to max_concurrency), so the wall
+    time is bounded by the plan's critical path rather than the sum of its
+    steps. Each step's output is kept for references from later steps; a step
+    whose dependency failed is skipped.
+    """
+
+    def __init__(
+        self,
+        run_step: Callable[[TaskStep, dict[str, Any]], Awaitable[dict[str, Any]]],
+        max_concurrency: int = 4,
+    ) -> None:
+        """
+        Args:
+            run_step: Coroutine function (step, resolved parameters) -> output dict;
+                "success": False in the output marks the step as failed
+            max_concurrency: Steps running at once
+        """
+        self.run_step = run_step
+        self.max_concurrency = max_concurrency
+        self.metrics = get_metrics()
+
+    async def run(self, steps: list[TaskStep]) -> AsyncIterator[dict[str, Any]]:
+        """
+        Execute a plan, yielding progress events
+
+        Yields:
+            {"type": "step_started" | "step_finished" | "step_skipped", "id": ..., ...}
+            as they happen, then {"type": "done", "outputs": ..., "wall_ms": ...,
+            "critical_path_ms": ..., "sum_ms": ...}
+        """
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(max(self.max_concurrency, 1))
+        events: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        finished = {step.id: asyncio.Event() for step in steps}
+        succeeded: dict[str, bool] = {}
+        outputs: dict[str, dict[str, Any]] = {}
+        elapsed: dict[str, float] = {}
+
+        async def execute(step: TaskStep) -> None:
+            try:
+                for dependency in step.depends_on:
+                    await finished[dependency].wait()
+                failed = [d for d in step.depends_on if not succeeded.get(d)]
+                if failed:
+                    succeeded[step.id] = False
+                    await events.put(
+                        {
+                            "type": "step_skipped",
+                            "id": step.id,
+                            "reason": f"depends on failed step {', '.join(failed)}",
+                        }
+                    )
+                    return
+
+                async with semaphore:
+                    step_started = time.monotonic()
+                    await events.put(
+                        {"type": "step_started", "id": step.id, "action": step.action}
+                    )
+                    try:
+                        parameters = resolve_references(step.parameters, outputs)
+                        output = await self.run_step(step, parameters)
+                    except Exception as e:
+                        output = {"success": False, "message": str(e)}
+                    elapsed[step.id] = (time.monotonic() - step_started) * 1000
+
+                outputs[step.id] = output
+                succeeded[step.id] = bool(output.get("success", True))
+                self.metrics.observe(f"task_graph.step.{step.action}", elapsed[step.id])
+                await events.put(
+                    {
+                        "type": "step_finished",
+                        "id": step.id,
+                        "success": succeeded[step.id],
+                        "message": output.get("message", ""),
+                        "elapsed_ms": round(elapsed[step.id], 1),
+                    }
+                )
+            finally:
+                finished[step.id].set()
+
+        tasks = [asyncio.create_task(execute(step)) for step in steps]
+        try:
+            done = 0
+            while done < len(steps):
+                event = await events.get()
+                if event["type"] != "step_started":
+                    done += 1
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        wall_ms = (time.monotonic() - started) * 1000
+        self.metrics.observe("task_graph.wall", wall_ms)
+        yield {
+            "type": "done",
+            "outputs": outputs,
+            "wall_ms": round(wall_ms, 1),
+            "critical_path_ms": round(self._critical_path(steps, elapsed), 1),
+            "sum_ms": round(sum(elapsed.values()), 1),
+        }
+
+    @staticmethod
+    def _critical_path(steps: list[TaskStep], elapsed: dict[str, float]) -> float:
+        # Longest chain of measured step times (the plan is acyclic)
+        by_id = {step.id: step for step in steps}
+        finish: dict[str, float] = {}
+
+        def finish_time(step_id: str) -> float:
+            if step_id not in finish:
+                start = max((finish_time(d) for d in by_id[step_id].depends_on), default=0.0)
+                finish[step_id] = start + elapsed.get(step_id, 0.0)
+            return finish[step_id]
+
+        return max((finish_time(step.id) for step in steps), default=0.0)
+
+
+async def run_plan(
+    executor: TaskGraphExecutor, steps: list[TaskStep]
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    """Run a plan to completion; returns (step events, the final "done" event)"""
+    events: list[dict[str, Any]] = []
+    summary: Optional[dict[str, Any]] = None
+    async for event in executor.run(steps):
+        if event["type"] == "done":
+            summary = event
+        elif event["type"] != "step_started":
+            events.append(event)
+    return events, summary
@@ -2,18 +2,355 @@
 Text-to-Speech service using OpenAI
 """
 import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 import httpx
 from app.core.config import get_settings
+from app.core.metrics import get_metrics
+
+
+SPEECH_URL = "https://api.openai.com/v1/audio/speech"
+
+# OpenAI speech output formats and their media types (pcm is 24 kHz 16-bit mono)
+AUDIO_MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    "pcm": "audio/L16;rate=24000;channels=1",
+}
+
+
+# Formats whose encoded segments can be played back-to-back when concatenated
+PIPELINE_FORMATS = {"mp3", "opus", "aac", "pcm"}
+
+
+def split_speech_units(text: str, max_chars: int = 200, min_chars: int = 20) -> list[str]:
+    """
+    Split text into sentence/clause units for pipelined synthesis
+
+    Sentences and lines are split first; a sentence longer than max_chars is
+    split again at clause punctuation (then whitespace), and fragments shorter
+    than min_chars are merged into their neighbour so each upstream call
+    carries a natural-sounding phrase.
+
+    Args:
+        text: Text to split
+        max_chars: Preferred maximum unit length
+        min_chars: Minimum unit length before merging
+
+    Returns:
+        Units in speaking order
+    """
+    sentences = [
+        part.strip()
+        for part in re.split(r"(?<=[.!?])\s+|\n+", text)
+        if part and part.strip()
+    ]
+
+    units: list[str] = []
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            window = sentence[:max_chars]
+            cut = max(window.rfind(", "), window.rfind("; "), window.rfind(": "))
+            if cut < min_chars:
+                cut = window.rfind(" ")
+            if cut < min_chars:
+                cut = max_chars - 1
+            units.append(sentence[:cut + 1].strip())
+            sentence = sentence[cut + 1:].strip()
+        if sentence:
+            units.append(sentence)
+
+    merged: list[str] = []
+    for unit in units:
+        if merged and (len(merged[-1]) < min_chars or len(unit) < min_chars) and (
+            len(merged[-1]) + len(unit) + 1 <= max_chars
+        ):
+            merged[-1] = f"{merged[-1]} {unit}"
+        else:
+            merged.append(unit)
+    return merged
+
+
+class SentenceSplitter:
+    """
+    Incrementally cuts a token stream into speakable sentences
+
+    Feed LLM tokens as they arrive; complete sentences are returned as soon as
+    their terminating punctuation is followed by whitespace, and a run-on
+    sentence is cut at a clause boundary once it passes max_chars.
+    """
+
+    _boundary = re.compile(r"(?<=[.!?])\s+|\n+")
+
+    def __init__(self, max_chars: int = 200, min_chars: int = 20) -> None:
+        """
+        Args:
+            max_chars: Length at which a sentence is cut at a clause boundary
+            min_chars: Shortest sentence emitted on its own
+        """
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, token: str) -> list[str]:
+        """Add a token and return any sentences it completed"""
+        self._buffer += token
+        sentences: list[str] = []
+
+        while True:
+            cut = None
+            for match in self._boundary.finditer(self._buffer):
+                if match.start() >= self.min_chars:
+                    cut = match
+                    break
+            if cut is None:
+                break
+            sentences.append(self._buffer[:cut.start()].strip())
+            self._buffer = self._buffer[cut.end():]
+
+        if len(self._buffer) > self.max_chars:
+            window = self._buffer[:self.max_chars]
+            index = max(window.rfind(", "), window.rfind("; "), window.rfind(": "))
+            if index >= self.min_chars:
+                sentences.append(window[:index + 1].strip())
+                self._buffer = self._buffer[index + 1:].lstrip()
+
+        return [sentence for sentence in sentences if sentence]
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left at the end of the stream"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+async def iter_sentences(
+    tokens: AsyncIterator[str], max_chars: int = 200, min_chars: int = 20
+) -> AsyncIterator[str]:
+    """
+    Turn an async token stream into an async stream of speakable sentences
+
+    Args:
+        tokens: Async iterator of text fragments
+        max_chars: Length at which a sentence is cut at a clause boundary
+        min_chars: Shortest sentence emitted on its own
+
+    Yields:
+        Sentences in order
+    """
+    splitter = SentenceSplitter(max_chars=max_chars, min_chars=min_chars)
+    async for token in tokens:
+        for sentence in splitter.feed(token):
+            yield sentence
+    rest = splitter.flush()
+    if rest:
+        yield rest
+
+
+class TTSAudioCache:
+    """
+    Content-addressed cache for synthesized audio
+
+    Entries are keyed by a hash of (text, voice, model, speed, format). A small
+    in-memory LRU sits in front of a size-bounded directory of audio files;
+    disk reads and writes run in worker threads.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = 16 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            memory_bytes: Budget for the in-memory tier
+            disk_dir: Directory for the disk tier (None disables it)
+            disk_bytes: Budget for the disk tier
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        # Keys being written to disk, so concurrent misses write (and count) once
+        self._writing: set[str] = set()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+        if self.disk_dir is not None:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(text: str, voice: str, model: str, speed: float, fmt: str = "mp3") -> str:
+        """Hash the synthesis parameters into a cache key"""
+        payload = json.dumps(
+            {"text": text, "voice": voice, "model": model, "speed": round(speed, 3), "format": fmt},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk LRU from file modification times"""
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.disk_dir.glob("*.audio"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_size += size
+        except OSError as e:
+            print(f"⚠️  TTS disk cache unavailable: {e}")
+            self.disk_dir = None
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.audio"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Look up audio in memory, then on disk"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_saved += len(data)
+            return data
+
+        if self.disk_dir is not None and key in self._disk:
+            path = self._path(key)
+            try:
+                data = await asyncio.to_thread(self._read_file, path)
+            except OSError:
+                self._forget_disk(key)
+                data = None
+            if data is not None:
+                self._disk.move_to_end(key)
+                self.disk_hits += 1
+                self.bytes_saved += len(data)
+                self._remember(key, data)
+                return data
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Store audio in both tiers"""
+        self._remember(key, data)
+        if self.disk_dir is None or len(data) > self.disk_bytes:
+            return
+        if key in self._disk or key in self._writing:
+            return
+        self._writing.add(key)
+        try:
+            await asyncio.to_thread(self._write_file, self._path(key), data)
+        except OSError as e:
+            print(f"⚠️  Could not write TTS cache entry: {e}")
+            return
+        finally:
+            self._writing.discard(key)
+        if key in self._disk:
+            return
+        self._disk[key] = len(data)
+        self._disk_size += len(data)
+
+        stale = []
+        while self._disk_size > self.disk_bytes and self._disk:
+            old_key, _ = next(iter(self._disk.items()))
+            self._forget_disk(old_key)
+            stale.append(self._path(old_key))
+            self.evictions += 1
+        if stale:
+            await asyncio.to_thread(self._delete_files, stale)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _forget_disk(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+    @staticmethod
+    def _read_file(path: Path) -> bytes:
+        data = path.read_bytes()
+        os.utime(path)  # Keep LRU order across restarts
+        return data
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes) -> None:
+        temp = path.with_suffix(".tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+
+    @staticmethod
+    def _delete_files(paths: list[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+            "disk_evictions": self.evictions,
+        }
 
 
 class TTSService:
     """Service for converting text to speech using OpenAI TTS"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[TTSAudioCache] = None,
+    ) -> None:
+        """
+        Args:
+            http_client: Shared pooled HTTP client (a short-lived one is used per call if omitted)
+            cache: Audio cache (synthesis is uncached if omitted)
+        """
         settings = get_settings()
         self.api_key = settings.openai_api_key
+        self.http_client = http_client
+        self.cache = cache
+        self.metrics = get_metrics()
         self.voice = "alloy"  # Options: alloy, echo, fable, onyx, nova, shimmer
         self.model = "tts-1"  # tts-1 (faster) or tts-1-hd (higher quality)
 
@@ -22,6 +359,7 @@ class TTSService:
         text: str,
         voice: Optional[str] = None,
         speed: float = 1.0,
+        response_format: str = "mp3",
     ) -> bytes:
         """
         Convert text to speech
@@ -30,33 +368,267 @@ class TTSService:
             text: Text to convert to speech
             voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
             speed: Speed of speech (0.25 to 4.0)
+            response_format: Audio format (mp3, opus, aac, flac, wav, pcm)
 
         Returns:
-            Audio data as bytes (MP3 format)
+            Audio data as bytes
         """
         try:
+            key = None
+            if self.cache is not None:
+                key = TTSAudioCache.make_key(
+                    text, voice or self.voice, self.model, speed, response_format
+                )
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    return cached
+
             # Use httpx directly to avoid AsyncOpenAI version conflicts
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/audio/speech",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "voice": voice or self.voice,
-                        "input": text,
-                        "speed": speed
-                    },
-                    timeout=30.0
+            payload = self._payload(text, voice, speed, response_format)
+            if self.http_client is not None:
+                audio = await self._post_speech(self.http_client, payload)
+            else:
+                async with httpx.AsyncClient() as client:
+                    audio = await self._post_speech(client, payload)
+
+            if key is not None:
+                await self.cache.put(key, audio)
+            return audio
+
+        except Exception as e:
+            print(f"❌ TTS error: {e}")
+            raise
+
+    async def stream(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        response_format: str = "mp3",
+        chunk_size: int = 4096,
+    ) -> AsyncIterator[bytes]:
+        """
+        Convert text to speech, yielding audio chunks as they arrive upstream
+
+        Cache hits are replayed in chunks; a completed upstream stream is
+        written to the cache.
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            speed: Speed of speech (0.25 to 4.0)
+            response_format: Audio format (mp3, opus, aac, flac, wav, pcm)
+            chunk_size: Bytes per yielded chunk
+
+        Yields:
+            Audio bytes
+        """
+        started = time.monotonic()
+        key = None
+        if self.cache is not None:
+            key = TTSAudioCache.make_key(
+                text, voice or self.voice, self.model, speed, response_format
+            )
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self.metrics.observe(
+                    "tts.time_to_first_byte.cached", (time.monotonic() - started) * 1000
                 )
+                for offset in range(0, len(cached), chunk_size):
+                    yield cached[offset:offset + chunk_size]
+                return
+
+        payload = self._payload(text, voice, speed, response_format)
+        client = self.http_client or httpx.AsyncClient()
+        received: list[bytes] = []
+        try:
+            async with client.stream(
+                "POST",
+                SPEECH_URL,
+                headers=self._headers(),
+                json=payload,
+                timeout=30.0,
+            ) as response:
+                if response.is_error:
+                    await response.aread()
                 response.raise_for_status()
-                return response.content
+
+                first = True
+                async for chunk in response.aiter_bytes(chunk_size):
+                    if first:
+                        self.metrics.observe(
+                            "tts.time_to_first_byte", (time.monotonic() - started) * 1000
+                        )
+                        first = False
+                    if key is not None:
+                        received.append(chunk)
+                    yield chunk
+
+            self.metrics.observe("tts.stream_total", (time.monotonic() - started) * 1000)
+            if key is not None:
+                await self.cache.put(key, b"".join(received))
 
         except Exception as e:
-            print(f"❌ TTS error: {e}")
+            print(f"❌ TTS stream error: {e}")
             raise
+        finally:
+            if client is not self.http_client:
+                await client.aclose()
+
+    async def stream_pipelined(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        response_format: str = "mp3",
+        concurrency: int = 3,
+        chunk_size: int = 4096,
+        cancel: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize long text sentence by sentence, several at a time, in order
+
+        Units are synthesized concurrently (bounded by a semaphore) and each is
+        emitted as soon as it and every unit before it are ready. Closing the
+        iterator, cancelling the consuming task or setting `cancel` (barge-in)
+        cancels all outstanding synthesis.
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            speed: Speed of speech (0.25 to 4.0)
+            response_format: Audio format; must be one of PIPELINE_FORMATS
+            concurrency: Maximum concurrent upstream synthesis calls
+            chunk_size: Bytes per yielded chunk
+            cancel: Event that stops playback when set
+
+        Yields:
+            Audio bytes
+        """
+        units = split_speech_units(text)
+
+        async def source() -> AsyncIterator[str]:
+            for unit in units:
+                yield unit
+
+        async for chunk in self.stream_sentences(
+            source(),
+            voice=voice,
+            speed=speed,
+            response_format=response_format,
+            concurrency=concurrency,
+            chunk_size=chunk_size,
+            cancel=cancel,
+        ):
+            yield chunk
+
+    async def stream_sentences(
+        self,
+        sentences: AsyncIterator[str],
+        voice: Optional[str] = None,
+        speed: float = 1.0,
+        response_format: str = "mp3",
+        concurrency: int = 3,
+        chunk_size: int = 4096,
+        cancel: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize sentences from an async source as soon as each one arrives
+
+        Synthesis of a sentence starts when the source yields it (bounded by a
+        semaphore), so audio for the first sentence can play while later ones
+        are still being produced, e.g. by a streaming LLM. Audio is emitted in
+        source order.
+
+        Args:
+            sentences: Async iterator of speakable text units
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            speed: Speed of speech (0.25 to 4.0)
+            response_format: Audio format; must be one of PIPELINE_FORMATS
+            concurrency: Maximum concurrent upstream synthesis calls
+            chunk_size: Bytes per yielded chunk
+            cancel: Event that stops playback when set
+
+        Yields:
+            Audio bytes
+        """
+        if response_format not in PIPELINE_FORMATS:
+            raise ValueError(f"Pipelined format must be one of: {sorted(PIPELINE_FORMATS)}")
+
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        pending: asyncio.Queue[Optional[asyncio.Task[bytes]]] = asyncio.Queue()
+        tasks: list[asyncio.Task[bytes]] = []
+
+        async def synthesize(unit: str) -> bytes:
+            async with semaphore:
+                if cancel is not None and cancel.is_set():
+                    return b""
+                return await self.speak(unit, voice, speed, response_format)
+
+        async def produce() -> None:
+            try:
+                async for unit in sentences:
+                    if unit.strip():
+                        task = asyncio.create_task(synthesize(unit.strip()))
+                        tasks.append(task)
+                        await pending.put(task)
+            finally:
+                await pending.put(None)
+
+        producer = asyncio.create_task(produce())
+        first = True
+        try:
+            while True:
+                task = await pending.get()
+                if task is None or (cancel is not None and cancel.is_set()):
+                    break
+                audio = await task
+                if first and audio:
+                    self.metrics.observe(
+                        "tts.pipeline.first_segment", (time.monotonic() - started) * 1000
+                    )
+                    first = False
+                for offset in range(0, len(audio), chunk_size):
+                    yield audio[offset:offset + chunk_size]
+            # Surface errors from the sentence source
+            await producer
+            self.metrics.observe("tts.pipeline.total", (time.monotonic() - started) * 1000)
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(
+        self, text: str, voice: Optional[str], speed: float, response_format: str
+    ) -> dict[str, Any]:
+        if response_format not in AUDIO_MEDIA_TYPES:
+            raise ValueError(f"Invalid format. Choose from: {list(AUDIO_MEDIA_TYPES)}")
+        return {
+            "model": self.model,
+            "voice": voice or self.voice,
+            "input": text,
+            "speed": speed,
+            "response_format": response_format,
+        }
+
+    async def _post_speech(self, client: httpx.AsyncClient, payload: dict[str, Any]) -> bytes:
+        """POST to the OpenAI speech endpoint and return the audio body"""
+        response = await client.post(
+            SPEECH_URL,
+            headers=self._headers(),
+            json=payload,
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return response.content
 
     async def speak_and_save(
         self,
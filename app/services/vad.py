@@ -0,0 +1,182 @@
+"""
+Voice activity detection for 16 kHz linear16 PCM streams
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+
+@dataclass
+class VADStats:
+    """Per-session byte and frame counters"""
+
+    bytes_in: int = 0
+    bytes_sent: int = 0
+    bytes_pending: int = 0
+    speech_frames: int = 0
+    silence_frames: int = 0
+    segments: int = 0
+
+    @property
+    def bytes_suppressed(self) -> int:
+        """Bytes received but never forwarded upstream"""
+        return self.bytes_in - self.bytes_sent - self.bytes_pending
+
+    def to_dict(self) -> dict[str, int | float]:
+        """Serialize for logging / WebSocket reporting"""
+        suppressed = self.bytes_suppressed
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_sent": self.bytes_sent,
+            "bytes_suppressed": suppressed,
+            "suppressed_ratio": round(suppressed / self.bytes_in, 3) if self.bytes_in else 0.0,
+            "speech_frames": self.speech_frames,
+            "silence_frames": self.silence_frames,
+            "segments": self.segments,
+        }
+
+
+class VoiceActivityDetector:
+    """
+    Energy + zero-crossing-rate VAD with hangover smoothing and pre-roll
+
+    Incoming chunks of any size are split into fixed frames. Each frame is
+    scored with NumPy across the whole chunk at once; a frame counts as speech
+    when its level clears an adaptive noise floor and its zero-crossing rate is
+    below the hiss/fricative-noise ceiling. Speech is held for a hangover period
+    after the last voiced frame, and a few frames of audio from before the onset
+    are replayed so word starts are not clipped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        energy_threshold_db: float = -45.0,
+        noise_margin_db: float = 10.0,
+        zcr_max: float = 0.35,
+        hangover_ms: int = 300,
+        preroll_ms: int = 200,
+    ) -> None:
+        """
+        Args:
+            sample_rate: PCM sample rate in Hz
+            frame_ms: Analysis frame length in milliseconds
+            energy_threshold_db: Absolute minimum frame level (dBFS) for speech
+            noise_margin_db: Required level above the tracked noise floor
+            zcr_max: Maximum zero-crossing rate (crossings per sample) for speech
+            hangover_ms: How long speech is held after the last voiced frame
+            preroll_ms: How much audio before speech onset is forwarded
+        """
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_max = zcr_max
+        self.hangover_frames = max(hangover_ms // frame_ms, 0)
+        self.noise_floor_db: Optional[float] = None
+        self.stats = VADStats()
+
+        self._remainder = b""
+        self._preroll: deque[bytes] = deque(maxlen=max(preroll_ms // frame_ms, 0))
+        # Frames since the last voiced frame (large = silence)
+        self._since_voiced = self.hangover_frames + 1
+        self.in_speech = False
+
+    def _score(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return per-frame level (dBFS) and zero-crossing rate"""
+        samples = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(samples * samples, axis=1))
+        level_db = 20.0 * np.log10(rms + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+        return level_db, zcr
+
+    def _smooth(self, voiced: np.ndarray) -> np.ndarray:
+        """Apply hangover: a frame is speech if a voiced frame occurred within the hangover"""
+        n = voiced.shape[0]
+        idx = np.arange(n)
+        # Index of the most recent voiced frame at or before each position,
+        # carrying in the distance from the previous chunk as a negative index
+        last = np.where(voiced, idx, -self._since_voiced)
+        last = np.maximum.accumulate(last)
+        since = idx - last
+        self._since_voiced = int(since[-1]) + 1 if n else self._since_voiced
+        return since <= self.hangover_frames
+
+    def _update_noise_floor(self, level_db: np.ndarray, speech: np.ndarray) -> None:
+        quiet = level_db[~speech]
+        if quiet.size == 0:
+            return
+        observed = float(np.median(quiet))
+        if self.noise_floor_db is None:
+            self.noise_floor_db = observed
+        else:
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * observed
+
+    def process(self, pcm: bytes) -> tuple[bytes, bool]:
+        """
+        Run a PCM chunk through the gate
+
+        Args:
+            pcm: Little-endian 16-bit mono PCM bytes
+
+        Returns:
+            (bytes to forward upstream, True if a speech segment ended in this chunk)
+        """
+        self.stats.bytes_in += len(pcm)
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if usable == 0:
+            self._update_pending()
+            return b"", False
+
+        frames = np.frombuffer(data[:usable], dtype="<i2").reshape(-1, self.frame_samples)
+        level_db, zcr = self._score(frames)
+
+        threshold = self.energy_threshold_db
+        if self.noise_floor_db is not None:
+            threshold = max(threshold, self.noise_floor_db + self.noise_margin_db)
+        voiced = (level_db > threshold) & (zcr < self.zcr_max)
+        speech = self._smooth(voiced)
+        self._update_noise_floor(level_db, voiced)
+
+        n_speech = int(np.count_nonzero(speech))
+        self.stats.speech_frames += n_speech
+        self.stats.silence_frames += speech.shape[0] - n_speech
+
+        out: list[bytes] = []
+        segment_ended = False
+        fb = self.frame_bytes
+        for i, is_speech in enumerate(speech.tolist()):
+            frame = data[i * fb:(i + 1) * fb]
+            if is_speech:
+                if not self.in_speech:
+                    self.in_speech = True
+                    self.stats.segments += 1
+                    out.extend(self._preroll)
+                    self._preroll.clear()
+                out.append(frame)
+            else:
+                if self.in_speech:
+                    self.in_speech = False
+                    segment_ended = True
+                self._preroll.append(frame)
+
+        forwarded = b"".join(out)
+        self.stats.bytes_sent += len(forwarded)
+        self._update_pending()
+        return forwarded, segment_ended
+
+    def _update_pending(self) -> None:
+        self.stats.bytes_pending = len(self._remainder) + sum(len(f) for f in self._preroll)
+
+    def reset(self) -> None:
+        """Forget stream state (stats are kept)"""
+        self._remainder = b""
+        self._preroll.clear()
+        self._since_voiced = self.hangover_frames + 1
+        self.in_speech = False
+        self._update_pending()
@@ -1,23 +1,465 @@
 """
 OpenAI vision and LLM service
 """
-import base64
-from typing import Any, Optional
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Optional
 from openai import AsyncOpenAI
 from app.core.config import get_settings
+from app.core.metrics import get_metrics
 from app.models.schemas import IntentType
+from app.services.intent_classifier import LocalIntentClassifier
+from app.services.semantic_cache import SemanticIntentCache
+from app.services.response_cache import ResponseCache
+from app.services.batching import MicroBatcher
+from app.services.conversation import fit_history
+from app.services.model_router import ModelRouter
+from app.services.image_preprocess import (
+    FrameQuality,
+    PreparedImage,
+    assess_quality,
+    compute_scene_hash,
+    hamming_distance,
+    passthrough,
+    preprocess_image,
+    select_detail,
+)
+
+INTENT_SYSTEM_PROMPT = """You are an intent classifier for Dadd-E, a productivity assistant.
+Classify the user's intent into one of these categories:
+- DESCRIBE_SCENE: User wants to know what's in front of them
+- CHECK_SLACK: User wants to check Slack messages
+- SEND_EMAIL: User wants to send an email
+- SEARCH_DRIVE: User wants to search Google Drive
+- CREATE_TASK: User wants to create a task/note
+- CHECK_CALENDAR: User wants to check calendar
+- GENERAL_QUERY: General question or conversation
+- UNKNOWN: Cannot determine intent
+
+Respond in JSON format:
+{
+  "intent": "INTENT_NAME",
+  "confidence": 0.95,
+  "entities": {"key": "value"}
+}"""
+
+INTENT_BATCH_INSTRUCTIONS = """
+
+You will receive several independent utterances as {"utterances": [{"id": 0, "text": "..."}]}.
+Classify each one on its own and respond with one result per id:
+{"results": [{"id": 0, "intent": "INTENT_NAME", "confidence": 0.95, "entities": {}}]}"""
+
+# Default scene prompt; a /read-text analysis of a frame also serves /analyze and /describe
+SCENE_PROMPT = (
+    "Describe what you see in this image in 2-3 sentences. "
+    "Focus on the main objects, people, and context."
+)
+
+# Spoken instead of a description when a frame fails the quality gate
+HOLD_STILL_MESSAGES = {
+    "blurry": "The image is too blurry to make out. Hold still for a moment and try again.",
+    "too_dark": "It's too dark to see anything. Try facing a light or turning one on.",
+    "overexposed": "The image is washed out. Try turning away from the bright light.",
+}
+
+# Default question for a sequence of recent keyframes
+SEQUENCE_PROMPT = "What just happened? Describe what changed across these frames in 2-3 sentences."
+
+SEQUENCE_INSTRUCTIONS = """The images are keyframes from the camera of a wearer's smart glasses,
+oldest first, each labelled with how long ago it was captured.
+Answer the user's question about what happened across them; focus on what changed
+and on what is in view now. Don't describe each frame separately."""
+
+STRUCTURED_VISION_INSTRUCTIONS = """Analyze the image for a wearer of smart glasses.
+- description: answer the user's request about the image
+- objects: the main objects and people visible, as short lowercase nouns, most prominent first
+- text_detected: all legible text, keeping the original formatting and order, or null if none"""
+
+STRUCTURED_VISION_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "scene_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "description": {"type": "string"},
+                "objects": {"type": "array", "items": {"type": "string"}},
+                "text_detected": {"type": ["string", "null"]},
+            },
+            "required": ["description", "objects", "text_detected"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+# decompose_task few-shot plan: two independent lookups, then a step using one's result
+DECOMPOSE_EXAMPLE_STEPS = [
+    {
+        "id": "check_slack",
+        "action": "check_slack",
+        "description": "Check Slack for Sai's message",
+        "parameters": {"channel": "general"},
+        "depends_on": [],
+    },
+    {
+        "id": "find_doc",
+        "action": "search_drive",
+        "description": "Find proposal doc",
+        "parameters": {"query": "proposal"},
+        "depends_on": [],
+    },
+    {
+        "id": "email_doc",
+        "action": "send_email",
+        "description": "Email the doc to Sai",
+        "parameters": {
+            "to": "sai",
+            "subject": "Proposal",
+            "attachment_url": "${find_doc.files.0.webViewLink}",
+        },
+        "depends_on": ["find_doc"],
+    },
+]
+DECOMPOSE_EXAMPLE = (
+    '{"subtasks": [\n'
+    + ",\n".join(f"  {json.dumps(step)}" for step in DECOMPOSE_EXAMPLE_STEPS)
+    + "\n]}"
+)
+
+
+@dataclass
+class SceneEntry:
+    """One analyzed frame"""
+
+    digest: str  # SHA-256 of the raw upload
+    scene_hash: Optional[int]  # dHash of the frame
+    prompt: str
+    detail: str
+    result: dict[str, Any]
+    created_at: float
+
+
+async def _single_model(model: str, stream: Any) -> AsyncIterator[tuple[str, Any]]:
+    """Chunks of an unrouted stream, closing it when iteration stops"""
+    async with stream:
+        async for chunk in stream:
+            yield model, chunk
+
+
+@dataclass
+class _VisionRequest:
+    """A frame that missed the caches and passed the gate, ready for the model"""
+
+    prompt: str
+    structured: bool
+    detail: str
+    user_id: Optional[str]
+    cache_prompt: str
+    digest: str
+    image: PreparedImage
+
+
+class _JsonFieldStream:
+    """Decodes one top-level string field of a JSON object as it streams in"""
+
+    def __init__(self, field: str) -> None:
+        self._key = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add raw output; returns the newly decoded part of the field"""
+        self._buffer += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._key.search(self._buffer)
+            if match is None:
+                return ""
+            self._pos = match.end()
+
+        buffer, i, out = self._buffer, self._pos, []
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char == "\\":
+                # Wait for the whole escape sequence (both halves of a surrogate pair)
+                length = 6 if buffer[i + 1:i + 2] == "u" else 2
+                if length == 6 and buffer[i + 2:i + 4].lower() in ("d8", "d9", "da", "db"):
+                    length = 12
+                if i + length > len(buffer):
+                    break
+                out.append(json.loads(f'"{buffer[i:i + length]}"'))
+                i += length
+                continue
+            out.append(char)
+            i += 1
+        self._pos = i
+        return "".join(out)
+
+
+class SceneCache:
+    """
+    Per-user cache of vision results for frames of an unchanged scene
+
+    A frame hits when its bytes are identical to an earlier frame, or when its
+    perceptual hash is within max_distance bits of one, for the same prompt
+    and detail level. A high-detail entry also serves low-detail requests, and
+    a structured entry serves plain requests with the same prompt (it carries
+    the description too). High-detail requests (reading text) use a stricter
+    distance, since small changes matter there. Entries expire after a TTL;
+    each user keeps a few recent frames and the least recently used user is
+    dropped when the cache holds too many.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_distance: int = 5,
+        max_distance_high: int = 2,
+        per_user: int = 8,
+        max_users: int = 1024,
+    ) -> None:
+        """
+        Args:
+            ttl: Seconds a result stays valid
+            max_distance: Hamming distance for a "same scene" match at low detail
+            max_distance_high: Hamming distance at high detail
+            per_user: Frames remembered per user
+            max_users: Users tracked before the least recently used is dropped
+        """
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_distance_high = max_distance_high
+        self.per_user = per_user
+        self.max_users = max_users
+        self.metrics = get_metrics()
+        self.hits = 0
+        self.lookups = 0
+        self._users: OrderedDict[str, OrderedDict[str, SceneEntry]] = OrderedDict()
+
+    def _entries(self, user_id: str) -> Optional[OrderedDict[str, SceneEntry]]:
+        entries = self._users.get(user_id)
+        if entries is None:
+            return None
+        self._users.move_to_end(user_id)
+        now = time.monotonic()
+        for digest in [d for d, e in entries.items() if now - e.created_at >= self.ttl]:
+            del entries[digest]
+        return entries
+
+    def get_exact(
+        self, user_id: str, digest: str, prompt: str, detail: str
+    ) -> Optional[dict[str, Any]]:
+        """Result for byte-identical content, if cached"""
+        entries = self._entries(user_id)
+        entry = entries.get(digest) if entries else None
+        if entry is None or not self._serves(entry, prompt, detail):
+            return None
+        entries.move_to_end(digest)
+        return self._hit("exact", entry, 0)
+
+    def get_similar(
+        self, user_id: str, scene_hash: Optional[int], prompt: str, detail: str
+    ) -> Optional[dict[str, Any]]:
+        """Result for the closest perceptually matching frame, if close enough"""
+        entries = self._entries(user_id)
+        if not entries or scene_hash is None:
+            return None
+        limit = self.max_distance_high if detail == "high" else self.max_distance
+        best: Optional[tuple[int, SceneEntry]] = None
+        for entry in entries.values():
+            if entry.scene_hash is None or not self._serves(entry, prompt, detail):
+                continue
+            distance = hamming_distance(scene_hash, entry.scene_hash)
+            if distance <= limit and (best is None or distance < best[0]):
+                best = (distance, entry)
+        if best is None:
+            return None
+        entries.move_to_end(best[1].digest)
+        return self._hit("similar", best[1], best[0])
+
+    @staticmethod
+    def _serves(entry: SceneEntry, prompt: str, detail: str) -> bool:
+        if entry.prompt not in (prompt, f"structured:{prompt}"):
+            return False
+        return entry.detail == detail or entry.detail == "high"
+
+    def miss(self) -> None:
+        """Count a lookup that went to the model"""
+        self.lookups += 1
+        self.metrics.incr("vision.scene_cache.miss")
+        self._publish()
+
+    def put(self, user_id: str, entry: SceneEntry) -> None:
+        """Remember a freshly analyzed frame"""
+        entries = self._users.get(user_id)
+        if entries is None:
+            entries = self._users[user_id] = OrderedDict()
+        self._users.move_to_end(user_id)
+        entries[entry.digest] = entry
+        entries.move_to_end(entry.digest)
+        while len(entries) > self.per_user:
+            entries.popitem(last=False)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def _hit(self, kind: str, entry: SceneEntry, distance: int) -> dict[str, Any]:
+        self.lookups += 1
+        self.hits += 1
+        self.metrics.incr(f"vision.scene_cache.{kind}_hit")
+        self._publish()
+        return {**entry.result, "cached": True, "scene_distance": distance}
+
+    def _publish(self) -> None:
+        self.metrics.set_gauge("vision.scene_cache.hit_rate", round(self.hits / self.lookups, 3))
 
 
 class VisionService:
     """Service for vision analysis and LLM reasoning using OpenAI"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        intent_classifier: Optional[LocalIntentClassifier] = None,
+        intent_cache: Optional[SemanticIntentCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        model_router: Optional[ModelRouter] = None,
+        scene_cache: Optional[SceneCache] = None,
+    ) -> None:
+        """
+        Args:
+            client: Shared OpenAI client (a private one is created if omitted)
+            intent_classifier: Local fast path tried before the LLM intent classifier
+            intent_cache: Semantic cache of earlier LLM classifications
+            response_cache: Exact-match cache / single-flight layer for completions
+            model_router: Picks the model per call type and hedges slow requests
+            scene_cache: Reuses results for frames of an unchanged scene
+        """
         settings = get_settings()
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self.client = client or AsyncOpenAI(api_key=settings.openai_api_key)
+        self.intent_classifier = intent_classifier
+        self.intent_cache = intent_cache
+        self.response_cache = response_cache
+        self.model_router = model_router
+        self.scene_cache = scene_cache
         self.settings = settings
+        self.metrics = get_metrics()
+
+        # Concurrent LLM classifications share one request (and one system prompt)
+        self.intent_batcher: Optional[
+            MicroBatcher[
+                tuple[str, Optional[dict[str, Any]]], tuple[Optional[dict[str, Any]], bool]
+            ]
+        ] = None
+        if settings.intent_batch_enabled:
+            self.intent_batcher = MicroBatcher(
+                self._classify_batch,
+                max_size=settings.intent_batch_max_size,
+                max_wait_ms=settings.intent_batch_max_wait_ms,
+                name="intent.batch",
+            )
+
+    async def close(self) -> None:
+        """Cancel in-flight intent batches"""
+        if self.intent_batcher is not None:
+            await self.intent_batcher.close()
+
+    async def _complete(
+        self, call_type: str, trace: Optional[dict[str, str]] = None, **params: Any
+    ) -> tuple[str, bool]:
+        """
+        Run a chat completion through the response cache and model router
+
+        Args:
+            call_type: Logical call name (selects the cache TTL and model route)
+            trace: Receives the "model" that answered, when the call goes upstream
+            **params: chat.completions.create arguments; "model" is the default
+                when no route is configured for the call type
+
+        Returns:
+            (message content, True if this call went upstream)
+        """
+
+        async def request(model: str) -> tuple[str, str]:
+            response = await self.client.chat.completions.create(**{**params, "model": model})
+            # Per-call-type token usage, for comparing cost across modes
+            self.metrics.incr(f"llm.{call_type}.calls")
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.metrics.incr(f"llm.{call_type}.prompt_tokens", usage.prompt_tokens)
+                self.metrics.incr(f"llm.{call_type}.completion_tokens", usage.completion_tokens)
+            return model, response.choices[0].message.content or ""
+
+        async def create() -> str:
+            if self.model_router is None:
+                model, content = await request(params["model"])
+            else:
+                model, content = await self.model_router.call(call_type, params["model"], request)
+            if trace is not None:
+                trace["model"] = model
+            return content
+
+        if self.response_cache is None:
+            return await create(), True
+        return await self.response_cache.get_or_create(call_type, params, create)
+
+    async def _stream_completion(
+        self, call_type: str, **params: Any
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Stream a chat completion through the model router
+
+        Args:
+            call_type: Logical call name (selects the model route)
+            **params: chat.completions.create arguments; "model" is the default
+                when no route is configured for the call type
+
+        Yields:
+            (model that answered, chunk)
+        """
+
+        async def request(model: str) -> Any:
+            return await self.client.chat.completions.create(
+                **{**params, "model": model, "stream": True}
+            )
+
+        if self.model_router is None:
+            model = params["model"]
+            chunks = _single_model(model, await request(model))
+        else:
+            chunks = self.model_router.stream(call_type, params["model"], request)
+        async with aclosing(chunks):
+            async for model, chunk in chunks:
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    self.metrics.incr(f"llm.{call_type}.prompt_tokens", usage.prompt_tokens)
+                    self.metrics.incr(
+                        f"llm.{call_type}.completion_tokens", usage.completion_tokens
+                    )
+                yield model, chunk
+        self.metrics.incr(f"llm.{call_type}.calls")
 
     async def analyze_image(
-        self, image_data: bytes, prompt: str = "What do you see in this image?"
+        self,
+        image_data: bytes,
+        prompt: str = "What do you see in this image?",
+        detail: Optional[str] = None,
+        user_id: Optional[str] = None,
+        structured: bool = False,
+        gate: bool = True,
     ) -> dict[str, Any]:
         """
         Analyze an image using GPT-4 Vision
@@ -25,44 +467,508 @@ class VisionService:
         Args:
             image_data: Raw image bytes
             prompt: Question to ask about the image
+            detail: "low" or "high" (chosen from the prompt when omitted)
+            user_id: Wearer; enables reuse of results while the scene is unchanged
+            structured: Also return the visible objects and text, in the same call
+            gate: Check blur and exposure first (quality_gate_enabled)
 
         Returns:
             Dictionary containing description and extracted information
+            (plus "objects" and "text_detected" when structured); blurry or
+            badly exposed frames get a "hold still" message and "rejected"
         """
         try:
-            # Encode image to base64
-            base64_image = base64.b64encode(image_data).decode("utf-8")
+            early, request = await self._begin_analysis(
+                image_data, prompt, detail, user_id, structured, gate
+            )
+            if request is None:
+                return early
 
             # Call GPT-4 Vision
-            response = await self.client.chat.completions.create(
-                model=self.settings.vision_model,
-                messages=[
+            started = time.monotonic()
+            analysis: dict[str, Any] = {}
+            trace: dict[str, str] = {}
+            if structured:
+                raw, _ = await self._complete(
+                    "analyze_image_structured",
+                    trace,
+                    model=self.settings.vision_model,
+                    messages=self._vision_messages(request),
+                    response_format=STRUCTURED_VISION_FORMAT,
+                    max_tokens=800,
+                )
+                analysis = json.loads(raw) if raw else {}
+                description = analysis.get("description", "")
+            else:
+                description, _ = await self._complete(
+                    "analyze_image",
+                    trace,
+                    model=self.settings.vision_model,
+                    messages=self._vision_messages(request),
+                    max_tokens=500,
+                )
+            model = trace.get("model", self.settings.vision_model)
+            return self._finish_analysis(request, model, description, analysis, started)
+
+        except Exception as e:
+            print(f"Error analyzing image: {e}")
+            raise
+
+    async def analyze_image_stream(
+        self,
+        image_data: bytes,
+        prompt: str = SCENE_PROMPT,
+        user_id: Optional[str] = None,
+        structured: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Analyze an image, yielding the description as the model writes it
+
+        Args:
+            image_data: Raw image bytes
+            prompt: Question to ask about the image
+            user_id: Wearer; enables reuse of results while the scene is unchanged
+            structured: Also return the visible objects and text, in the same call
+
+        Yields:
+            {"type": "delta", "text": ...} fragments of the description, then
+            {"type": "result", "result": ...} with the same dictionary
+            analyze_image returns (cached and rejected frames arrive as a single
+            delta)
+        """
+        early, request = await self._begin_analysis(
+            image_data, prompt, None, user_id, structured, True
+        )
+        if request is None:
+            yield {"type": "delta", "text": early["description"]}
+            yield {"type": "result", "result": early}
+            return
+
+        # Its own route: a stream's latency is the time to its first chunk
+        call_type = "analyze_image_structured_stream" if structured else "analyze_image_stream"
+        params: dict[str, Any] = {
+            "model": self.settings.vision_model,
+            "messages": self._vision_messages(request),
+            "max_tokens": 800 if structured else 500,
+            "stream_options": {"include_usage": True},
+        }
+        if structured:
+            params["response_format"] = STRUCTURED_VISION_FORMAT
+
+        started = time.monotonic()
+        produced = False
+        model = self.settings.vision_model
+        parts: list[str] = []
+        # Structured output is JSON: relay just the description field as it grows
+        field = _JsonFieldStream("description") if structured else None
+        async with aclosing(self._stream_completion(call_type, **params)) as chunks:
+            async for model, chunk in chunks:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                parts.append(token)
+                text = field.feed(token) if field is not None else token
+                if not text:
+                    continue
+                if not produced:
+                    self.metrics.observe(
+                        "vision.first_token", (time.monotonic() - started) * 1000
+                    )
+                    produced = True
+                yield {"type": "delta", "text": text}
+
+        raw = "".join(parts)
+        analysis: dict[str, Any] = {}
+        if structured:
+            analysis = json.loads(raw) if raw else {}
+            description = analysis.get("description", "")
+        else:
+            description = raw
+        result = self._finish_analysis(request, model, description, analysis, started)
+        self.metrics.observe("vision.stream_total", (time.monotonic() - started) * 1000)
+        yield {"type": "result", "result": result}
+
+    async def _begin_analysis(
+        self,
+        image_data: bytes,
+        prompt: str,
+        detail: Optional[str],
+        user_id: Optional[str],
+        structured: bool,
+        gate: bool,
+    ) -> tuple[Optional[dict[str, Any]], Optional["_VisionRequest"]]:
+        # (result, None) when the cache or the quality gate answers; (None, request) otherwise
+        # Pay for high detail only when the prompt needs fine detail (reading text)
+        detail = detail or select_detail(prompt)
+        scene_cache = self.scene_cache if user_id else None
+        cache_prompt = f"structured:{prompt}" if structured else prompt
+
+        # Same bytes as a recent frame: no need to even decode them
+        digest = hashlib.sha256(image_data).hexdigest()
+        if scene_cache is not None:
+            cached = scene_cache.get_exact(user_id, digest, cache_prompt, detail)
+            if cached is not None:
+                return cached, None
+
+        # Blurry or badly exposed frames get a "hold still" instead of a model call
+        quality = await self.assess_frame(image_data) if gate else None
+        if quality is not None and not quality.ok:
+            return self.rejected_frame(quality, prompt, structured), None
+
+        image = await self.prepare_image(image_data, prompt, detail)
+
+        if scene_cache is not None:
+            cached = scene_cache.get_similar(user_id, image.scene_hash, cache_prompt, detail)
+            if cached is not None:
+                return cached, None
+            scene_cache.miss()
+
+        return None, _VisionRequest(
+            prompt=prompt,
+            structured=structured,
+            detail=detail,
+            user_id=user_id,
+            cache_prompt=cache_prompt,
+            digest=digest,
+            image=image,
+        )
+
+    @staticmethod
+    def _vision_messages(request: "_VisionRequest") -> list[dict[str, Any]]:
+        content: list[dict[str, Any]] = [
+            {"type": "text", "text": request.prompt},
+            {
+                "type": "image_url",
+                "image_url": {"url": request.image.data_url, "detail": request.image.detail},
+            },
+        ]
+        if request.structured:
+            return [
+                {"role": "system", "content": STRUCTURED_VISION_INSTRUCTIONS},
+                {"role": "user", "content": content},
+            ]
+        return [{"role": "user", "content": content}]
+
+    def _finish_analysis(
+        self,
+        request: "_VisionRequest",
+        model: str,
+        description: str,
+        analysis: dict[str, Any],
+        started: float,
+    ) -> dict[str, Any]:
+        image = request.image
+        # Keyed by how the image was sent, to compare raw vs. preprocessed uploads
+        mode = image.detail if self.settings.image_preprocess_enabled else "raw"
+        self.metrics.observe(f"vision.upstream.{mode}", (time.monotonic() - started) * 1000)
+
+        result: dict[str, Any] = {
+            "description": description,
+            "model": model,
+            "prompt": request.prompt,
+            "image": {
+                "bytes_in": image.original_bytes,
+                "bytes_sent": len(image.data),
+                "width": image.width,
+                "height": image.height,
+                "detail": image.detail,
+            },
+        }
+        if request.structured:
+            result["objects"] = [str(o) for o in analysis.get("objects") or []]
+            result["text_detected"] = analysis.get("text_detected") or None
+        scene_cache = self.scene_cache if request.user_id else None
+        if scene_cache is not None and description:
+            scene_cache.put(
+                request.user_id,
+                SceneEntry(
+                    digest=request.digest,
+                    scene_hash=image.scene_hash,
+                    prompt=request.cache_prompt,
+                    detail=request.detail,
+                    result=result,
+                    created_at=time.monotonic(),
+                ),
+            )
+        return result
+
+    async def assess_frame(self, image_data: bytes) -> Optional[FrameQuality]:
+        """
+        Score blur and exposure in a worker thread
+
+        Returns:
+            Measurements, or None if the gate is off or the image can't be decoded
+            (the model gets to try those)
+        """
+        settings = self.settings
+        if not settings.quality_gate_enabled:
+            return None
+        started = time.monotonic()
+        try:
+            quality = await asyncio.to_thread(
+                assess_quality,
+                image_data,
+                settings.quality_min_sharpness,
+                settings.quality_max_dark_fraction,
+                settings.quality_max_bright_fraction,
+                settings.quality_min_contrast,
+            )
+        except ValueError:
+            return None
+        self.metrics.observe("vision.quality_gate", (time.monotonic() - started) * 1000)
+        self.metrics.incr(f"vision.quality.{quality.reason or 'ok'}")
+        return quality
+
+    def rejected_frame(
+        self, quality: FrameQuality, prompt: str, structured: bool = False
+    ) -> dict[str, Any]:
+        """Result returned in place of a model description for an unusable frame"""
+        result: dict[str, Any] = {
+            "description": HOLD_STILL_MESSAGES[quality.reason],
+            "model": "quality_gate",
+            "prompt": prompt,
+            "rejected": quality.reason,
+            "quality": asdict(quality),
+        }
+        if structured:
+            result["objects"] = []
+            result["text_detected"] = None
+        return result
+
+    async def analyze_burst(
+        self,
+        frames: list[bytes],
+        prompt: str = "What do you see in this image?",
+        user_id: Optional[str] = None,
+        structured: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Analyze the sharpest usable frame of a short burst
+
+        Args:
+            frames: Encoded frames captured a moment apart
+            prompt: Question about the scene
+            user_id: Wearer (enables the scene cache)
+            structured: Also return the visible objects and text
+
+        Returns:
+            analyze_image result plus the index of the frame used, or a
+            "hold still" result if no frame is usable
+        """
+        qualities = await asyncio.gather(*(self.assess_frame(data) for data in frames))
+        usable = [
+            (quality.sharpness if quality is not None else 0.0, index)
+            for index, quality in enumerate(qualities)
+            if quality is None or quality.ok
+        ]
+        if not usable:
+            best = max(range(len(frames)), key=lambda index: qualities[index].sharpness)
+            return {**self.rejected_frame(qualities[best], prompt, structured), "frame": best}
+
+        _, best = max(usable)
+        # Already scored: don't gate the chosen frame twice
+        result = await self.analyze_image(
+            frames[best], prompt, user_id=user_id, structured=structured, gate=False
+        )
+        return {**result, "frame": best}
+
+    async def analyze_batch(
+        self,
+        items: list[tuple[bytes, str]],
+        user_id: Optional[str] = None,
+        structured: bool = False,
+        concurrency: int = 4,
+        merge_duplicates: bool = True,
+        max_distance: int = 5,
+        max_distance_high: int = 2,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Analyze several images concurrently, yielding each result as it finishes
+
+        Args:
+            items: (image bytes, prompt) pairs
+            user_id: Wearer (enables the scene cache)
+            structured: Request structured results (objects and text as well)
+            concurrency: Maximum model calls in flight
+            merge_duplicates: Frames with the same prompt whose dHashes are close
+                share one model call
+            max_distance: dHash bits for a merge at low detail
+            max_distance_high: dHash bits at high detail (text)
+
+        Yields:
+            {"index": ..., **result} or {"index": ..., "error": ...}, in completion order;
+            merged frames also carry "merged_with" (index of the analyzed frame)
+        """
+        # Group near-duplicate frames so each group costs one model call
+        leaders: list[int] = []
+        members: dict[int, list[int]] = {}
+        hashes: list[Optional[int]] = [None] * len(items)
+        if merge_duplicates:
+            hashes = await asyncio.gather(
+                *(asyncio.to_thread(compute_scene_hash, data) for data, _ in items)
+            )
+        for index, (_, prompt) in enumerate(items):
+            leader = None
+            if hashes[index] is not None:
+                detail = select_detail(prompt)
+                limit = max_distance_high if detail == "high" else max_distance
+                for candidate in leaders:
+                    if (
+                        items[candidate][1] == prompt
+                        and hashes[candidate] is not None
+                        and hamming_distance(hashes[index], hashes[candidate]) <= limit
+                    ):
+                        leader = candidate
+                        break
+            if leader is None:
+                leaders.append(index)
+                members[index] = [index]
+            else:
+                members[leader].append(index)
+        self.metrics.incr("vision.batch.images", len(items))
+        self.metrics.incr("vision.batch.merged", len(items) - len(leaders))
+
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run(leader: int) -> tuple[int, dict[str, Any]]:
+            data, prompt = items[leader]
+            async with semaphore:
+                try:
+                    return leader, await self.analyze_image(
+                        data, prompt, user_id=user_id, structured=structured
+                    )
+                except Exception as e:
+                    return leader, {"error": str(e)}
+
+        tasks = [asyncio.create_task(run(leader)) for leader in leaders]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                leader, result = await next_done
+                for index in members[leader]:
+                    item = {"index": index, **result}
+                    if index != leader:
+                        item["merged_with"] = leader
+                    yield item
+        finally:
+            # Client went away: stop work that nobody will read
+            for task in tasks:
+                task.cancel()
+
+    async def describe_sequence(
+        self,
+        frames: list[bytes],
+        prompt: str = SEQUENCE_PROMPT,
+        ages: Optional[list[float]] = None,
+    ) -> dict[str, Any]:
+        """
+        Describe what happened across several keyframes in one model call
+
+        Args:
+            frames: Encoded frames, oldest first
+            prompt: Question about the sequence
+            ages: Seconds since each frame was captured (labels the frames)
+
+        Returns:
+            Dictionary with the description, model and frame count
+        """
+        try:
+            # Drop blurred or badly exposed keyframes; answer "hold still" if none are left
+            qualities = await asyncio.gather(*(self.assess_frame(data) for data in frames))
+            kept = [i for i, quality in enumerate(qualities) if quality is None or quality.ok]
+            if not kept:
+                return {**self.rejected_frame(qualities[-1], prompt), "frames": 0}
+            frames = [frames[i] for i in kept]
+            if ages is not None:
+                ages = [ages[i] for i in kept if i < len(ages)]
+
+            # Low detail keeps each frame at a fixed, small token cost
+            images = await asyncio.gather(
+                *(self.prepare_image(data, prompt, "low") for data in frames)
+            )
+            content: list[dict[str, Any]] = [{"type": "text", "text": prompt}]
+            for index, image in enumerate(images):
+                label = f"Frame {index + 1}"
+                if ages is not None and index < len(ages):
+                    label += f" ({ages[index]:.1f}s ago)"
+                content.append({"type": "text", "text": label})
+                content.append(
                     {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                            },
-                        ],
+                        "type": "image_url",
+                        "image_url": {"url": image.data_url, "detail": image.detail},
                     }
+                )
+
+            started = time.monotonic()
+            trace: dict[str, str] = {}
+            description, _ = await self._complete(
+                "describe_sequence",
+                trace,
+                model=self.settings.vision_model,
+                messages=[
+                    {"role": "system", "content": SEQUENCE_INSTRUCTIONS},
+                    {"role": "user", "content": content},
                 ],
                 max_tokens=500,
             )
-
-            description = response.choices[0].message.content or ""
+            self.metrics.observe("vision.upstream.sequence", (time.monotonic() - started) * 1000)
+            self.metrics.incr("vision.sequence.frames", len(frames))
 
             return {
                 "description": description,
-                "model": self.settings.vision_model,
+                "model": trace.get("model", self.settings.vision_model),
                 "prompt": prompt,
+                "frames": len(frames),
             }
 
         except Exception as e:
-            print(f"Error analyzing image: {e}")
+            print(f"Error describing frame sequence: {e}")
             raise
 
+    async def prepare_image(
+        self, image_data: bytes, prompt: str, detail: Optional[str] = None
+    ) -> PreparedImage:
+        """
+        Orient, downscale and recompress an image for upload in a worker thread
+
+        Args:
+            image_data: Raw image bytes
+            prompt: Question about the image (selects the detail level)
+            detail: "low" or "high" to override the selection
+
+        Returns:
+            Prepared image (the raw bytes if preprocessing is off or fails)
+        """
+        settings = self.settings
+        detail = detail or select_detail(prompt)
+        if not settings.image_preprocess_enabled:
+            return await asyncio.to_thread(passthrough, image_data, detail)
+
+        started = time.monotonic()
+        high = detail == "high"
+        try:
+            image = await asyncio.to_thread(
+                preprocess_image,
+                image_data,
+                detail,
+                settings.image_high_max_side if high else settings.image_low_max_side,
+                settings.image_high_quality if high else settings.image_low_quality,
+                settings.image_output_format,
+            )
+        except ValueError as e:
+            print(f"⚠️  Sending image unprocessed: {e}")
+            return passthrough(image_data, detail)
+
+        self.metrics.observe("vision.preprocess", (time.monotonic() - started) * 1000)
+        self.metrics.incr("vision.image.bytes_in", image.original_bytes)
+        self.metrics.incr("vision.image.bytes_sent", len(image.data))
+        if image.original_bytes:
+            self.metrics.set_gauge(
+                "vision.image.last_ratio", round(len(image.data) / image.original_bytes, 3)
+            )
+        return image
+
     async def classify_intent(
         self, text: str, context: Optional[dict[str, Any]] = None
     ) -> dict[str, Any]:
@@ -76,47 +982,36 @@ class VisionService:
         Returns:
             Dictionary with intent type, confidence, and extracted entities
         """
-        try:
-            system_prompt = """You are an intent classifier for Dadd-E, a productivity assistant.
-Classify the user's intent into one of these categories:
-- DESCRIBE_SCENE: User wants to know what's in front of them
-- CHECK_SLACK: User wants to check Slack messages
-- SEND_EMAIL: User wants to send an email
-- SEARCH_DRIVE: User wants to search Google Drive
-- CREATE_TASK: User wants to create a task/note
-- CHECK_CALENDAR: User wants to check calendar
-- GENERAL_QUERY: General question or conversation
-- UNKNOWN: Cannot determine intent
-
-Respond in JSON format:
-{
-  "intent": "INTENT_NAME",
-  "confidence": 0.95,
-  "entities": {"key": "value"}
-}"""
+        # Confident utterances never reach the LLM
+        if self.intent_classifier is not None:
+            local = self.intent_classifier.classify(text)
+            if local is not None:
+                return local
 
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"User said: {text}"},
-            ]
-
-            if context:
-                messages.insert(
-                    1, {"role": "system", "content": f"Context: {context}"}
-                )
-
-            response = await self.client.chat.completions.create(
-                model=self.settings.openai_model,
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.3,
-            )
+        # Then a paraphrase of something the LLM already classified
+        embedding = None
+        if self.intent_cache is not None:
+            try:
+                cached, embedding = await self.intent_cache.lookup(text)
+            except Exception as e:
+                print(f"⚠️  Intent cache lookup failed: {e}")
+                cached = None
+            if cached is not None:
+                return cached
 
-            result = response.choices[0].message.content
-            if result:
-                import json
+        try:
+            if self.intent_batcher is not None:
+                intent_result, fresh = await self.intent_batcher.submit((text, context))
+            else:
+                intent_result, fresh = await self._classify_llm(text, context)
 
-                return json.loads(result)
+            if intent_result is not None:
+                # Learn from each upstream answer once, not from every cache hit
+                if fresh and self.intent_classifier is not None:
+                    self.intent_classifier.record(text, intent_result)
+                if self.intent_cache is not None:
+                    self.intent_cache.store(text, intent_result, embedding)
+                return intent_result
 
             return {
                 "intent": "UNKNOWN",
@@ -132,6 +1027,106 @@ Respond in JSON format:
                 "entities": {},
             }
 
+    async def _classify_llm(
+        self, text: str, context: Optional[dict[str, Any]] = None
+    ) -> tuple[Optional[dict[str, Any]], bool]:
+        """
+        Classify one utterance with the LLM
+
+        Returns:
+            (parsed result or None, True if the answer came from upstream)
+        """
+        messages = [
+            {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"User said: {text}"},
+        ]
+
+        if context:
+            messages.insert(
+                1, {"role": "system", "content": f"Context: {context}"}
+            )
+
+        result, fresh = await self._complete(
+            "classify_intent",
+            model=self.settings.openai_model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0.3,
+        )
+        self._report_classification_cost()
+        return (json.loads(result) if result else None), fresh
+
+    async def _classify_batch(
+        self, items: list[tuple[str, Optional[dict[str, Any]]]]
+    ) -> list[tuple[Optional[dict[str, Any]], bool]]:
+        """
+        Classify several utterances in one LLM request
+
+        The shared system prompt is sent once for the whole batch. Items the
+        model leaves out of its answer are classified individually.
+
+        Args:
+            items: (text, context) pairs
+
+        Returns:
+            One (result, fresh) pair per item, in order
+        """
+        if len(items) == 1:
+            return [await self._classify_llm(*items[0])]
+
+        utterances = []
+        for index, (text, context) in enumerate(items):
+            utterance: dict[str, Any] = {"id": index, "text": text}
+            if context:
+                utterance["context"] = context
+            utterances.append(utterance)
+
+        result, fresh = await self._complete(
+            "classify_intent_batch",
+            model=self.settings.openai_model,
+            messages=[
+                {"role": "system", "content": INTENT_SYSTEM_PROMPT + INTENT_BATCH_INSTRUCTIONS},
+                {"role": "user", "content": json.dumps({"utterances": utterances})},
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+        )
+        if fresh:
+            self.metrics.incr("intent.batch.llm_items", len(items))
+        self._report_classification_cost()
+
+        by_id: dict[int, dict[str, Any]] = {}
+        for entry in json.loads(result).get("results", []) if result else []:
+            try:
+                by_id[int(entry.pop("id"))] = entry
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+
+        results: list[tuple[Optional[dict[str, Any]], bool]] = [
+            (by_id[index], fresh) if index in by_id else (None, False)
+            for index in range(len(items))
+        ]
+        missing = [index for index in range(len(items)) if index not in by_id]
+        if missing:
+            self.metrics.incr("intent.batch.missing", len(missing))
+            retried = await asyncio.gather(*(self._classify_llm(*items[i]) for i in missing))
+            for index, retry in zip(missing, retried):
+                results[index] = retry
+        return results
+
+    def _report_classification_cost(self) -> None:
+        """Publish tokens per classified utterance for batched vs. single requests"""
+        counter = self.metrics.counter
+        for mode, call_type, items in (
+            ("unbatched", "classify_intent", counter("llm.classify_intent.calls")),
+            ("batched", "classify_intent_batch", counter("intent.batch.llm_items")),
+        ):
+            if items:
+                tokens = counter(f"llm.{call_type}.prompt_tokens") + counter(
+                    f"llm.{call_type}.completion_tokens"
+                )
+                self.metrics.set_gauge(f"intent.tokens_per_item.{mode}", round(tokens / items, 1))
+
     async def generate_response(
         self,
         user_message: str,
@@ -150,31 +1145,139 @@ Respond in JSON format:
             Generated response text
         """
         try:
-            default_system = """You are Dadd-E, a helpful productivity assistant.
-You help users with their work by checking messages, sending emails, searching documents,
-and providing information about their surroundings. Be concise and friendly."""
+            messages = self._response_messages(user_message, context, system_prompt)
 
-            messages = [
-                {"role": "system", "content": system_prompt or default_system},
-            ]
+            response_text, _ = await self._complete(
+                "generate_response",
+                model=self.settings.openai_model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=150,
+            )
+
+            return response_text
 
-            if context and context.get("conversation_history"):
-                messages.extend(context["conversation_history"])
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return "I'm sorry, I couldn't process that request."
 
-            messages.append({"role": "user", "content": user_message})
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        context: Optional[dict[str, Any]] = None,
+        system_prompt: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate a conversational response, yielding text as the model produces it
 
-            response = await self.client.chat.completions.create(
+        Args:
+            user_message: User's message
+            context: Conversation context
+            system_prompt: Custom system prompt
+
+        Yields:
+            Response text fragments
+        """
+        started = time.monotonic()
+        produced = False
+        try:
+            messages = self._response_messages(user_message, context, system_prompt)
+
+            chunks = self._stream_completion(
+                "generate_response_stream",
                 model=self.settings.openai_model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=150,
             )
+            async with aclosing(chunks):
+                async for _, chunk in chunks:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if not token:
+                        continue
+                    if not produced:
+                        self.metrics.observe(
+                            "llm.first_token", (time.monotonic() - started) * 1000
+                        )
+                        produced = True
+                    yield token
 
-            return response.choices[0].message.content or ""
+            self.metrics.observe("llm.stream_total", (time.monotonic() - started) * 1000)
 
         except Exception as e:
-            print(f"Error generating response: {e}")
-            return "I'm sorry, I couldn't process that request."
+            print(f"Error streaming response: {e}")
+            if not produced:
+                yield "I'm sorry, I couldn't process that request."
+
+    def _response_messages(
+        self,
+        user_message: str,
+        context: Optional[dict[str, Any]],
+        system_prompt: Optional[str],
+    ) -> list[dict[str, Any]]:
+        """Build the chat messages for generate_response"""
+        default_system = """You are Dadd-E, a helpful productivity assistant.
+You help users with their work by checking messages, sending emails, searching documents,
+and providing information about their surroundings. Be concise and friendly."""
+
+        messages = [
+            {"role": "system", "content": system_prompt or default_system},
+        ]
+
+        summary = context.get("conversation_summary") if context else None
+        if summary:
+            messages.append(
+                {"role": "system", "content": f"Summary of the earlier conversation: {summary}"}
+            )
+
+        if context and context.get("conversation_history"):
+            # Callers may hand over an unbounded history; send only what fits
+            messages.extend(
+                fit_history(
+                    context["conversation_history"],
+                    self.settings.conversation_token_budget,
+                    self.settings.conversation_max_turns,
+                )
+            )
+
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    async def summarize_conversation(
+        self, summary: str, turns: list[dict[str, Any]]
+    ) -> str:
+        """
+        Fold older conversation turns into a rolling summary
+
+        Args:
+            summary: Summary so far (may be empty)
+            turns: Turns to add, oldest first
+
+        Returns:
+            Updated summary
+        """
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        prompt = f"""Update the running summary of a conversation between a user and Dadd-E.
+Keep names, decisions, open requests and facts the user may refer back to. Be brief.
+
+Current summary:
+{summary or "(none)"}
+
+New turns:
+{transcript}
+
+Return only the updated summary."""
+
+        updated, _ = await self._complete(
+            "summarize_conversation",
+            model=self.settings.openai_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=self.settings.conversation_summary_max_tokens,
+        )
+        return updated.strip() or summary
 
     async def decompose_task(self, task_description: str) -> list[dict[str, Any]]:
         """
@@ -184,34 +1287,37 @@ and providing information about their surroundings. Be concise and friendly."""
             task_description: Description of the complex task
 
         Returns:
-            List of subtasks with actions and parameters
+            List of subtasks with IDs, actions, parameters and dependencies
         """
         try:
             prompt = f"""Break down this task into specific subtasks:
 "{task_description}"
 
-Return a JSON array of subtasks, each with:
-- action: The action to take (e.g., "search_drive", "send_email")
+Return a JSON object {{"subtasks": [...]}}, each subtask with:
+- id: Short unique name (e.g. "find_doc")
+- action: One of check_slack, send_email, search_drive, create_task, check_calendar, general_query
 - description: What to do
 - parameters: Required parameters
+- depends_on: IDs of subtasks that must finish first ([] if independent)
+
+Subtasks that don't need each other's results must not depend on each other,
+so they can run at the same time. To use an earlier result, reference it as
+"${{id.path}}": search_drive returns files (name, webViewLink), check_slack
+returns messages (user, text), check_calendar returns events; every subtask
+returns message (its summary).
 
 Example:
-[
-  {{"action": "search_drive", "description": "Find proposal doc", "parameters": {{"query": "proposal"}}}},
-  {{"action": "send_email", "description": "Email the doc to Sai", "parameters": {{"to": "sai", "subject": "Proposal"}}}}
-]"""
+{DECOMPOSE_EXAMPLE}"""
 
-            response = await self.client.chat.completions.create(
+            result, _ = await self._complete(
+                "decompose_task",
                 model=self.settings.openai_model,
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},
                 temperature=0.3,
             )
 
-            result = response.choices[0].message.content
             if result:
-                import json
-
                 parsed = json.loads(result)
                 return parsed.get("subtasks", [])
 
@@ -2,32 +2,86 @@
 Deepgram voice transcription (STT) service
 Using Deepgram SDK v2.12.0 (compatible with omi-sdk)
 """
-import asyncio
 import inspect
+import json
+import time
+from dataclasses import dataclass, field
 from typing import Callable, Union, Awaitable, Optional
 from deepgram import Deepgram
 from app.core.config import get_settings
+from app.services.dispatch import OverflowPolicy, TranscriptDispatcher
+
+
+@dataclass
+class TranscriptEvent:
+    """A transcript hypothesis from Deepgram with its finality flags"""
+
+    text: str
+    is_final: bool = True
+    speech_final: bool = False
+    from_finalize: bool = False
+    confidence: float = 0.0
+    start: float = 0.0  # Audio offset of the segment (seconds)
+    duration: float = 0.0  # Audio length of the segment (seconds)
+    stability: float = 1.0  # Share of words unchanged from the previous interim
+    received_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def utterance_end(self) -> bool:
+        """True when Deepgram considers the speaker's utterance finished"""
+        return self.is_final and (self.speech_final or self.from_finalize)
+
+
+def hypothesis_stability(previous: str, current: str) -> float:
+    """
+    Fraction of the current hypothesis' words that match the previous one as a prefix
+
+    Args:
+        previous: Previous interim transcript (empty if none)
+        current: Current interim transcript
+
+    Returns:
+        Stability between 0.0 (all new) and 1.0 (unchanged)
+    """
+    current_words = current.lower().split()
+    if not current_words:
+        return 0.0
+    previous_words = previous.lower().split()
+    common = 0
+    for old, new in zip(previous_words, current_words):
+        if old != new:
+            break
+        common += 1
+    return common / len(current_words)
 
 
 class VoiceService:
     """Service for real-time voice transcription using Deepgram v2 API"""
 
-    def __init__(self) -> None:
+    def __init__(self, client: Optional[Deepgram] = None) -> None:
+        """
+        Args:
+            client: Shared Deepgram client (a private one is created if omitted)
+        """
         settings = get_settings()
-        self.client = Deepgram(settings.deepgram_api_key)
+        self.client = client or Deepgram(settings.deepgram_api_key)
+        self.settings = settings
         self.connection: Optional[any] = None
+        self.dispatcher: Optional[TranscriptDispatcher] = None
         self.is_listening = False
 
     async def start_transcription(
         self,
-        on_transcript: Union[Callable[[str], None], Callable[[str], Awaitable[None]]],
+        on_transcript: Union[
+            Callable[[TranscriptEvent], None], Callable[[TranscriptEvent], Awaitable[None]]
+        ],
         language: str = "en",
     ) -> None:
         """
         Start real-time transcription
 
         Args:
-            on_transcript: Callback function (sync or async) to handle transcribed text
+            on_transcript: Callback function (sync or async) to handle transcript events
             language: Language code for transcription
         """
         try:
@@ -44,31 +98,65 @@ class VoiceService:
                 "channels": 1,  # Mono
             })
 
+            # Async callbacks run in order on one worker behind a bounded queue;
+            # events are handed over thread-safely from the SDK callback
+            if inspect.iscoroutinefunction(on_transcript):
+                self.dispatcher = TranscriptDispatcher(
+                    on_transcript,
+                    maxsize=self.settings.transcript_queue_size,
+                    policy=OverflowPolicy(self.settings.transcript_queue_policy),
+                    coalesce_interim=self.settings.transcript_coalesce_interim,
+                )
+                self.dispatcher.start()
+                deliver = self.dispatcher.submit
+            else:
+                deliver = on_transcript
+
+            # Last interim hypothesis, used to score stability of the next one
+            last_interim = ""
+
             # Set up event handlers
             def on_message(data: any) -> None:
+                nonlocal last_interim
                 try:
                     # Deepgram v2 SDK response format varies
                     transcript = None
+                    alternative: dict = {}
 
                     # Try different response formats
                     if isinstance(data, dict):
                         # Format 1: data['channel']['alternatives'][0]['transcript']
                         if "channel" in data and "alternatives" in data["channel"]:
-                            transcript = data["channel"]["alternatives"][0]["transcript"]
+                            alternative = data["channel"]["alternatives"][0]
+                            transcript = alternative["transcript"]
                         # Format 2: data['alternatives'][0]['transcript']
                         elif "alternatives" in data:
-                            transcript = data["alternatives"][0]["transcript"]
+                            alternative = data["alternatives"][0]
+                            transcript = alternative["transcript"]
                         # Format 3: data['transcript']
                         elif "transcript" in data:
                             transcript = data["transcript"]
 
                     if transcript and len(transcript) > 0:
-                        print(f"✅ Got transcript: {transcript}")
-                        # Handle both sync and async callbacks
-                        if inspect.iscoroutinefunction(on_transcript):
-                            asyncio.create_task(on_transcript(transcript))
+                        is_final = bool(data.get("is_final", True))
+                        if is_final:
+                            stability = 1.0
+                            last_interim = ""
                         else:
-                            on_transcript(transcript)
+                            stability = hypothesis_stability(last_interim, transcript)
+                            last_interim = transcript
+                        event = TranscriptEvent(
+                            text=transcript,
+                            is_final=is_final,
+                            speech_final=bool(data.get("speech_final", False)),
+                            from_finalize=bool(data.get("from_finalize", False)),
+                            confidence=float(alternative.get("confidence", 0.0)),
+                            start=float(data.get("start", 0.0)),
+                            duration=float(data.get("duration", 0.0)),
+                            stability=stability,
+                        )
+                        print(f"✅ Got transcript: {transcript}")
+                        deliver(event)
                 except (KeyError, IndexError, TypeError) as e:
                     print(f"⚠️  Error parsing transcript: {e}, data: {data}")
 
@@ -113,8 +201,27 @@ class VoiceService:
             except Exception as e:
                 print(f"❌ Error sending audio: {e}")
 
+    async def send_keep_alive(self) -> None:
+        """Keep the Deepgram connection open while no audio is being sent"""
+        if self.connection and self.is_listening:
+            try:
+                self.connection.keep_alive()
+            except Exception as e:
+                print(f"❌ Error sending keep-alive: {e}")
+
+    async def finalize(self) -> None:
+        """Ask Deepgram to flush a final transcript for the audio sent so far"""
+        if self.connection and self.is_listening:
+            try:
+                self.connection.send(json.dumps({"type": "Finalize"}))
+            except Exception as e:
+                print(f"❌ Error sending finalize: {e}")
+
     async def stop_transcription(self) -> None:
         """Stop the transcription connection"""
+        if self.dispatcher:
+            await self.dispatcher.close()
+            print(f"📬 Transcript queue: {self.dispatcher.stats()}")
         if self.connection:
             try:
                 self.connection.finish()
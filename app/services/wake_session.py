@@ -0,0 +1,263 @@
+"""
+Per-connection wake-word session state machine
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+from app.services.voice import TranscriptEvent
+
+
+class WakePhase(str, Enum):
+    """Phases of a voice command"""
+
+    IDLE = "idle"  # Waiting for the wake word
+    ARMED = "armed"  # Wake word heard, no command text yet
+    CAPTURING = "capturing"  # Collecting command text until the utterance ends
+    DISPATCHED = "dispatched"  # Command handed off, waiting for it to finish
+
+
+@dataclass
+class WakeUpdate:
+    """What the caller should do after feeding a transcript"""
+
+    armed: bool = False  # Wake word was just detected
+    superseded: bool = False  # New wake word while a command was in flight
+    command: Optional[str] = None  # Complete command ready for classification
+    timed_out: bool = False  # Session went back to idle without a command
+
+
+def extract_command(text: str, wake_word: str) -> Optional[str]:
+    """
+    Return the text spoken after the wake word
+
+    Args:
+        text: Transcript text
+        wake_word: Wake word to look for
+
+    Returns:
+        Command text (may be empty) or None if the wake word is absent
+    """
+    index = text.lower().rfind(wake_word.lower())
+    if index < 0:
+        return None
+    remainder = text[index + len(wake_word):]
+    return re.sub(r"^[\s,.!?:;-]+", "", remainder).strip()
+
+
+def normalize_command(text: str) -> str:
+    """Lowercase and strip punctuation so equivalent hypotheses compare equal"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class WakeWordSession:
+    """
+    Tracks idle → armed → capturing → dispatched → idle for one connection
+
+    Only final transcript segments contribute command text, and a command is
+    released exactly once, when Deepgram marks the utterance finished or the
+    capture times out. Transcripts that arrive while idle (without the wake
+    word) or while a command is in flight are ignored, unless they repeat the
+    wake word, which supersedes the command in flight.
+    """
+
+    def __init__(self, wake_word: str, command_timeout: float = 8.0) -> None:
+        """
+        Args:
+            wake_word: Wake word that arms the session
+            command_timeout: Seconds of inactivity before an armed/capturing session resets
+        """
+        self.wake_word = wake_word
+        self.command_timeout = command_timeout
+        self.phase = WakePhase.IDLE
+        self.commands_dispatched = 0
+        self.armed_at = 0.0
+        self._parts: list[str] = []
+        self._last_activity = 0.0
+
+    @property
+    def active(self) -> bool:
+        """True while the wake word is in effect"""
+        return self.phase is not WakePhase.IDLE
+
+    def feed(self, event: TranscriptEvent, now: Optional[float] = None) -> WakeUpdate:
+        """
+        Advance the state machine with a transcript event
+
+        Args:
+            event: Transcript event from the voice service
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            Actions for the caller
+        """
+        now = time.monotonic() if now is None else now
+        update = self.tick(now)
+        command_text = extract_command(event.text, self.wake_word)
+
+        if self.phase is WakePhase.DISPATCHED:
+            # Only a new wake word interrupts a command in flight
+            if command_text is None:
+                return update
+            self.phase = WakePhase.IDLE
+            update.superseded = True
+
+        if self.phase is WakePhase.IDLE:
+            if command_text is None:
+                return update
+            self.phase = WakePhase.ARMED
+            self._parts = []
+            self._last_activity = now
+            self.armed_at = now
+            update.armed = True
+
+        if not event.is_final:
+            self._last_activity = now
+            return update
+
+        segment = event.text.strip() if command_text is None else command_text
+        if segment:
+            self._parts.append(segment)
+            self.phase = WakePhase.CAPTURING
+        self._last_activity = now
+
+        if event.utterance_end and self._parts:
+            update.command = self._dispatch()
+        return update
+
+    def candidate(self, event: TranscriptEvent) -> Optional[str]:
+        """
+        Command text that would be dispatched if the utterance ended with this event
+
+        Call after feed(); returns None when no command is being captured.
+        """
+        if self.phase not in (WakePhase.ARMED, WakePhase.CAPTURING):
+            return None
+        parts = list(self._parts)
+        if not event.is_final:
+            command_text = extract_command(event.text, self.wake_word)
+            parts.append(event.text.strip() if command_text is None else command_text)
+        return " ".join(parts).strip() or None
+
+    def tick(self, now: Optional[float] = None) -> WakeUpdate:
+        """
+        Apply the inactivity timeout
+
+        A capture that times out with text is dispatched; an armed session
+        without any command text returns to idle.
+        """
+        now = time.monotonic() if now is None else now
+        update = WakeUpdate()
+        if self.phase not in (WakePhase.ARMED, WakePhase.CAPTURING):
+            return update
+        if now - self._last_activity < self.command_timeout:
+            return update
+
+        if self._parts:
+            update.command = self._dispatch()
+        else:
+            self.phase = WakePhase.IDLE
+            update.timed_out = True
+        return update
+
+    def complete(self, command_id: Optional[int] = None) -> None:
+        """
+        Mark the dispatched command as handled and return to idle
+
+        Args:
+            command_id: Value of commands_dispatched when the command was released;
+                a stale id (the command was superseded) leaves the state untouched
+        """
+        if command_id is not None and command_id != self.commands_dispatched:
+            return
+        if self.phase is WakePhase.DISPATCHED:
+            self.phase = WakePhase.IDLE
+            self._parts = []
+
+    def _dispatch(self) -> str:
+        command = " ".join(self._parts).strip()
+        self._parts = []
+        self.phase = WakePhase.DISPATCHED
+        self.commands_dispatched += 1
+        return command
+
+
+class SpeculativeClassifier:
+    """
+    Starts intent classification on a stable partial command
+
+    When the final command arrives it either reuses the in-flight result (the
+    hypothesis didn't change) or cancels it and classifies the final text.
+    """
+
+    def __init__(
+        self,
+        classify: Callable[[str], Awaitable[dict[str, Any]]],
+        min_stability: float = 1.0,
+        min_words: int = 2,
+    ) -> None:
+        """
+        Args:
+            classify: Coroutine function that classifies a command
+            min_stability: Minimum interim stability before speculating
+            min_words: Minimum command length (words) before speculating
+        """
+        self.classify = classify
+        self.min_stability = min_stability
+        self.min_words = min_words
+        self.hits = 0
+        self.misses = 0
+        self._key: Optional[str] = None
+        self._task: Optional[asyncio.Task[dict[str, Any]]] = None
+
+    def maybe_start(self, text: str, event: TranscriptEvent) -> bool:
+        """
+        Speculatively classify a candidate command if the hypothesis looks settled
+
+        Returns:
+            True if a new speculative classification was started
+        """
+        if not event.is_final and event.stability < self.min_stability:
+            return False
+        if len(text.split()) < self.min_words:
+            return False
+        key = normalize_command(text)
+        if key == self._key:
+            return False
+        self.cancel()
+        self._key = key
+        self._task = asyncio.create_task(self.classify(text))
+        return True
+
+    async def resolve(self, text: str) -> tuple[dict[str, Any], bool]:
+        """
+        Get the classification for the final command
+
+        Returns:
+            (intent result, True if the speculative result was reused)
+        """
+        task, key = self._task, self._key
+        self._task, self._key = None, None
+        if task is not None and key == normalize_command(text):
+            try:
+                result = await task
+                self.hits += 1
+                return result, True
+            except asyncio.CancelledError:
+                # Fall back only if the speculation itself was cancelled, not this caller
+                current = asyncio.current_task()
+                if not task.cancelled() or (current is not None and current.cancelling()):
+                    raise
+        elif task is not None:
+            task.cancel()
+            self.misses += 1
+        return await self.classify(text), False
+
+    def cancel(self) -> None:
+        """Drop any in-flight speculation"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.misses += 1
+        self._task, self._key = None, None
@@ -0,0 +1,160 @@
+"""
+Rolling camera frame buffer with keyframe selection
+"""
+import io
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+
+@dataclass
+class Frame:
+    """One buffered camera frame"""
+
+    timestamp: float  # time.time() when captured
+    data: bytes
+    thumbnail: Optional[np.ndarray]  # small grayscale float32 copy, None if undecodable
+    change: float = 0.0  # mean absolute difference from the previous frame, 0-1
+
+
+def make_thumbnail(data: bytes, size: tuple[int, int] = (32, 24)) -> Optional[np.ndarray]:
+    """
+    Tiny grayscale version of a frame for difference metrics
+
+    JPEGs are decoded at a fraction of full size, so this costs a few
+    milliseconds even for full-resolution frames.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format == "JPEG":
+                image.draft("L", (size[0] * 4, size[1] * 4))
+            small = image.convert("L").resize(size, Image.Resampling.BILINEAR)
+            return np.asarray(small, dtype=np.float32) / 255.0
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def frame_difference(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    """Mean absolute pixel difference of two thumbnails (1.0 if either is missing)"""
+    if a is None or b is None or a.shape != b.shape:
+        return 1.0
+    return float(np.mean(np.abs(a - b)))
+
+
+class FrameBuffer:
+    """
+    Bounded, timestamped history of camera frames
+
+    Frames are kept in a ring buffer capped both by count and by total bytes,
+    so memory stays fixed however long the device streams. Each frame carries
+    a tiny grayscale thumbnail that keyframe selection compares instead of
+    decoding the frames again.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 150,
+        max_bytes: int = 16 * 1024 * 1024,
+        thumbnail_size: tuple[int, int] = (32, 24),
+    ) -> None:
+        """
+        Args:
+            capacity: Maximum frames kept
+            max_bytes: Maximum total encoded bytes kept
+            thumbnail_size: (width, height) of the comparison thumbnails
+        """
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.frames: deque[Frame] = deque(maxlen=capacity)
+        self.total_bytes = 0
+
+    def add(self, data: bytes, timestamp: Optional[float] = None) -> Frame:
+        """
+        Append a frame, evicting the oldest ones beyond the limits
+
+        Args:
+            data: Encoded frame
+            timestamp: Capture time (now when omitted)
+
+        Returns:
+            The buffered frame
+        """
+        thumbnail = make_thumbnail(data, self.thumbnail_size)
+        previous = self.frames[-1].thumbnail if self.frames else None
+        frame = Frame(
+            timestamp=timestamp if timestamp is not None else time.time(),
+            data=data,
+            thumbnail=thumbnail,
+            change=frame_difference(previous, thumbnail) if self.frames else 0.0,
+        )
+
+        if len(self.frames) == self.capacity:
+            self.total_bytes -= len(self.frames[0].data)
+        self.frames.append(frame)
+        self.total_bytes += len(data)
+        while self.total_bytes > self.max_bytes and len(self.frames) > 1:
+            self.total_bytes -= len(self.frames.popleft().data)
+        return frame
+
+    def latest(self) -> Optional[Frame]:
+        """Most recent frame, if any"""
+        return self.frames[-1] if self.frames else None
+
+    def window(self, seconds: float, now: Optional[float] = None) -> list[Frame]:
+        """Frames captured within the last `seconds`, oldest first"""
+        cutoff = (now if now is not None else time.time()) - seconds
+        return [frame for frame in self.frames if frame.timestamp >= cutoff]
+
+    def keyframes(
+        self,
+        seconds: float = 10.0,
+        max_frames: int = 4,
+        min_change: float = 0.08,
+        now: Optional[float] = None,
+    ) -> list[Frame]:
+        """
+        Pick a few representative frames from the recent past
+
+        A frame becomes a keyframe when it differs from the previous keyframe
+        by at least min_change (mean absolute difference), which catches both
+        cuts and slow pans. The oldest and the newest frames of the window are
+        always candidates. If there are too many, the ones that changed the
+        most are kept.
+
+        Args:
+            seconds: How far back to look
+            max_frames: Maximum keyframes returned
+            min_change: Difference that counts as a new view (0-1)
+            now: Reference time (now when omitted)
+
+        Returns:
+            Keyframes, oldest first
+        """
+        frames = self.window(seconds, now)
+        if not frames or max_frames <= 0:
+            return []
+
+        selected = [(frames[0], 1.0)]
+        for frame in frames[1:]:
+            change = frame_difference(selected[-1][0].thumbnail, frame.thumbnail)
+            if change >= min_change:
+                selected.append((frame, change))
+
+        # The current view matters most for "what just happened"
+        last = frames[-1]
+        if selected[-1][0] is not last:
+            selected.append((last, 1.0))
+
+        if len(selected) > max_frames:
+            ranked = sorted(selected, key=lambda item: item[1], reverse=True)[:max_frames]
+            selected = sorted(ranked, key=lambda item: item[0].timestamp)
+        return [frame for frame, _ in selected]
+
+    def clear(self) -> None:
+        """Drop every buffered frame"""
+        self.frames.clear()
+        self.total_bytes = 0
@@ -4,6 +4,7 @@ Omi Device Service - Handles connection and communication with Omi glasses
 import asyncio
 from typing import Callable, Optional
 from omi import listen_to_omi
+from device.frame_buffer import Frame, FrameBuffer
 from device.quiet_decoder import QuietOmiOpusDecoder
 from asyncio import Queue
 
@@ -16,6 +17,7 @@ class OmiDeviceService:
         device_mac: str,
         audio_char_uuid: str = "19B10001-E8F2-537E-4F6C-D104768A1214",
         use_opus_decoder: bool = True,
+        frame_capacity: int = 150,
     ) -> None:
         """
         Initialize Omi device service
@@ -24,11 +26,12 @@ class OmiDeviceService:
             device_mac: MAC address of the Omi device
             audio_char_uuid: UUID for audio characteristic
             use_opus_decoder: Whether to use Opus decoder (False for raw audio)
+            frame_capacity: Camera frames kept for "what just happened" queries
         """
         self.device_mac = device_mac
         self.audio_char_uuid = audio_char_uuid
         self.audio_queue: Queue[bytes] = Queue()
-        self.frame_buffer: Optional[bytes] = None
+        self.frame_buffer = FrameBuffer(capacity=frame_capacity)
         self.is_connected = False
         self.use_opus_decoder = use_opus_decoder
         self.decoder = QuietOmiOpusDecoder() if use_opus_decoder else None
@@ -109,16 +112,31 @@ class OmiDeviceService:
         # Note: The current Omi SDK doesn't expose camera directly
         # This would need to be implemented when camera API is available
         # For now, this is a placeholder
-        return self.frame_buffer
+        frame = self.frame_buffer.latest()
+        return frame.data if frame else None
 
-    def set_frame(self, frame_data: bytes) -> None:
+    def set_frame(self, frame_data: bytes, timestamp: Optional[float] = None) -> None:
         """
-        Set current camera frame (when camera API becomes available)
+        Add a camera frame to the rolling buffer (when camera API becomes available)
 
         Args:
             frame_data: Raw frame data
+            timestamp: Capture time (now when omitted)
         """
-        self.frame_buffer = frame_data
+        self.frame_buffer.add(frame_data, timestamp)
+
+    def recent_keyframes(self, seconds: float = 10.0, max_frames: int = 4) -> list[Frame]:
+        """
+        Representative frames from the last few seconds
+
+        Args:
+            seconds: How far back to look
+            max_frames: Maximum keyframes
+
+        Returns:
+            Keyframes, oldest first
+        """
+        return self.frame_buffer.keyframes(seconds=seconds, max_frames=max_frames)
 
     async def disconnect(self) -> None:
         """Disconnect from Omi device"""
@@ -3,8 +3,10 @@ Omi Device Runtime
 Connects Omi glasses to the Dadd-E FastAPI backend
 """
 import asyncio
+import json
 import os
 import sys
+import time
 from typing import Optional
 import aiohttp
 import websockets
@@ -38,6 +40,8 @@ class DaddERuntime:
         self.user_id = os.getenv("USER_ID", "test_user")
         self.omi_service: Optional[OmiDeviceService] = None
         self.ws_connection: Optional[any] = None
+        # Strong references so fire-and-forget tasks aren't garbage-collected mid-flight
+        self.background_tasks: set[asyncio.Task] = set()
 
     async def start(self) -> None:
         """Start the runtime"""
@@ -105,11 +109,18 @@ class DaddERuntime:
         if not self.ws_connection:
             return
 
+        # Binary audio frames of the spoken reply being received
+        reply_audio = bytearray()
+        reply_format = "mp3"
+
         try:
             async for message in self.ws_connection:
-                # Parse JSON message
-                import json
+                # Binary frames carry reply audio between audio_start / audio_end
+                if isinstance(message, bytes):
+                    reply_audio.extend(message)
+                    continue
 
+                # Parse JSON message
                 data = json.loads(message)
                 msg_type = data.get("type", "")
 
@@ -129,6 +140,30 @@ class DaddERuntime:
                     intent = data.get("intent", "")
                     confidence = data.get("confidence", 0)
                     print(f"🎯 Intent: {intent} (confidence: {confidence:.2f})")
+                    if intent == "describe_scene":
+                        # Answer from the last few seconds of camera frames (the backend
+                        # leaves this intent to the device)
+                        task = asyncio.create_task(
+                            self.describe_recent_activity(data.get("text", ""))
+                        )
+                        self.background_tasks.add(task)
+                        task.add_done_callback(self.background_tasks.discard)
+
+                elif msg_type == "action_result":
+                    print(f"✅ {data.get('message', '')}")
+
+                elif msg_type == "audio_start":
+                    reply_audio.clear()
+                    reply_format = data.get("format", "mp3")
+                    print(f"🔊 Speaking: {data.get('text', '')}")
+
+                elif msg_type == "audio_end":
+                    if reply_audio:
+                        await self.play_audio(bytes(reply_audio), suffix=f".{reply_format}")
+                    reply_audio.clear()
+
+                elif msg_type == "latency":
+                    print(f"⏱️  Latency: {data.get('stages_ms', {})}")
 
                 elif msg_type == "error":
                     print(f"❌ Error: {data.get('message', 'Unknown error')}")
@@ -153,9 +188,6 @@ class DaddERuntime:
             tts_params: Parameters for TTS (text, voice, speed)
         """
         try:
-            import subprocess
-            import tempfile
-
             # Call TTS API
             async with aiohttp.ClientSession() as session:
                 async with session.post(
@@ -164,18 +196,7 @@ class DaddERuntime:
                 ) as response:
                     if response.status == 200:
                         audio_data = await response.read()
-
-                        # Save to temp file
-                        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                            temp_file.write(audio_data)
-                            temp_path = temp_file.name
-
-                        # Play using macOS afplay (built-in)
-                        subprocess.run(["afplay", temp_path], check=True)
-
-                        # Clean up
-                        import os
-                        os.unlink(temp_path)
+                        await self.play_audio(audio_data)
                     else:
                         error_text = await response.text()
                         print(f"❌ TTS failed: HTTP {response.status} - {error_text}")
@@ -183,6 +204,32 @@ class DaddERuntime:
         except Exception as e:
             print(f"❌ Error with TTS: {e}")
 
+    async def play_audio(self, audio_data: bytes, suffix: str = ".mp3") -> None:
+        """
+        Play an audio clip without blocking the message loop
+
+        Args:
+            audio_data: Encoded audio bytes
+            suffix: File extension for the player
+        """
+        import subprocess
+        import tempfile
+
+        try:
+            # Save to temp file
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+                temp_file.write(audio_data)
+                temp_path = temp_file.name
+
+            # Play using macOS afplay (built-in)
+            await asyncio.to_thread(subprocess.run, ["afplay", temp_path], check=True)
+
+            # Clean up
+            os.unlink(temp_path)
+
+        except Exception as e:
+            print(f"❌ Error playing audio: {e}")
+
     async def capture_and_analyze_scene(self) -> None:
         """Capture frame and send for vision analysis"""
         if not self.omi_service:
@@ -191,15 +238,23 @@ class DaddERuntime:
         try:
             # Capture frame (placeholder - needs camera API)
             frame = await self.omi_service.capture_frame()
+            # The last second of frames: the backend analyzes the sharpest one
+            burst = [f.data for f in self.omi_service.frame_buffer.window(1.0)][-4:]
 
             if frame:
                 # Send to vision API
                 async with aiohttp.ClientSession() as session:
                     form_data = aiohttp.FormData()
-                    form_data.add_field("image", frame, filename="frame.jpg")
+                    if len(burst) > 1:
+                        endpoint = "burst"
+                        for index, data in enumerate(burst):
+                            form_data.add_field("images", data, filename=f"frame{index}.jpg")
+                    else:
+                        endpoint = "describe"
+                        form_data.add_field("image", frame, filename="frame.jpg")
 
                     async with session.post(
-                        f"{self.backend_url}/vision/describe",
+                        f"{self.backend_url}/vision/{endpoint}",
                         params={"user_id": self.user_id},
                         data=form_data,
                     ) as response:
@@ -212,6 +267,91 @@ class DaddERuntime:
         except Exception as e:
             print(f"❌ Error analyzing scene: {e}")
 
+    async def describe_recent_activity(self, question: str = "", seconds: float = 10.0) -> None:
+        """
+        Send a few keyframes from the last seconds in one vision request and speak the answer
+
+        Args:
+            question: What the user asked (default: what just happened)
+            seconds: How far back to look
+        """
+        if not self.omi_service:
+            return
+
+        keyframes = self.omi_service.recent_keyframes(seconds=seconds)
+        if not keyframes:
+            print("⚠️  No recent frames (camera API not yet implemented)")
+            await self.speak_tts_response({"text": "I can't see anything right now."})
+            return
+
+        try:
+            now = time.time()
+            form_data = aiohttp.FormData()
+            for index, frame in enumerate(keyframes):
+                form_data.add_field("images", frame.data, filename=f"keyframe{index}.jpg")
+                form_data.add_field("ages", f"{now - frame.timestamp:.1f}")
+            if question:
+                form_data.add_field("prompt", question)
+
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.backend_url}/vision/sequence",
+                    params={"user_id": self.user_id},
+                    data=form_data,
+                ) as response:
+                    result = await response.json()
+                    description = result.get("description", "")
+                    print(f"👁️  Recent ({len(keyframes)} keyframes): {description}")
+
+            if description:
+                await self.speak_tts_response({"text": description})
+
+        except Exception as e:
+            print(f"❌ Error describing recent activity: {e}")
+
+    async def analyze_frames(
+        self, frames: list[bytes], prompts: Optional[list[str]] = None
+    ) -> list[dict]:
+        """
+        Send several frames in one request to /vision/batch
+
+        Args:
+            frames: Encoded frames
+            prompts: One prompt per frame (default: scene description)
+
+        Returns:
+            Per-frame results, ordered by frame index
+        """
+        results: list[dict] = []
+        try:
+            form_data = aiohttp.FormData()
+            for index, frame in enumerate(frames):
+                form_data.add_field("images", frame, filename=f"frame{index}.jpg")
+            for prompt in prompts or []:
+                form_data.add_field("prompts", prompt)
+
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.backend_url}/vision/batch",
+                    params={"user_id": self.user_id},
+                    data=form_data,
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        print(f"❌ Batch vision failed: HTTP {response.status} - {error_text}")
+                        return results
+                    # One JSON object per line, as each frame finishes
+                    async for line in response.content:
+                        if line.strip():
+                            result = json.loads(line)
+                            print(f"👁️  Frame {result['index']}: {result.get('description', '')}")
+                            results.append(result)
+
+        except Exception as e:
+            print(f"❌ Error analyzing frames: {e}")
+
+        return sorted(results, key=lambda result: result["index"])
+
 
 async def main() -> None:
     """Main entry point"""